@@ -3,29 +3,61 @@ import os
 import pandas as pd
 from datetime import datetime
 import time
+import uuid
 from src.data_loader import get_data, clean_data, validate_data_for_dashboard
 from src.feature_eng import feature_engineering
+from src.pipeline import get_dashboard_llm, prewarm_llm_clients, start_speculative_generation, cancel_speculative_generation, resolve_dashboard_code, correct_dashboard_code
+from src.stream_guard import StreamAborted
+from src.code_verifier import validate_dashboard_code, verify_dashboard_code
 from src.prompt_builder import prompt_generator
-from langchain_anthropic import ChatAnthropic
-from dotenv import load_dotenv
-
-load_dotenv()
-os.environ["ANTHROPIC_API_KEY"] = os.getenv('ANTHROPIC_API_KEY')
+from src.session_memo import content_hash, forget, is_fresh, memoize
+from src.job_queue import cancel as cancel_job, queue_position, wait as wait_for_job
+from src.worker import ensure_workers, load_job_data, submit_dashboard_job
+from src.telemetry import load_calls, summarize as summarize_calls
+from src.rate_limiter import set_session as set_llm_session
+from src.cancellation import start_run
+from src.schema_index import add_dashboard
+from src.baseline_dashboard import build_baseline_dashboard
+from src.latency_budget import KEPT_DRAFT, SKIPPED_CORRECTION, SKIPPED_FEATURE_ENGINEERING, LatencyBudget, default_budget_seconds
 
 st.set_page_config(page_title="AUTO-DASH Generator", layout="wide")
 
+# Opens the LLM connections while the user picks a file and while the upload is parsed
+prewarm_llm_clients()
+
+# LLM calls from all sessions share one limiter, which serves sessions in turn
+queue_note = st.empty()
+set_llm_session(
+    st.session_state.setdefault("session_id", uuid.uuid4().hex),
+    on_wait=lambda position: queue_note.empty() if position is None else queue_note.info(
+        f"🚦 The wizards are busy with other spells: {position} request(s) ahead of yours"),
+)
+# Each rerun supersedes the previous one: its leftover LLM calls and feature code are stopped
+start_run(st.session_state["session_id"])
+
 st.title("🚀 AUTO-DASH: Your Personal Dashboard Wizard")
 st.write("Upload a CSV file, and watch as we conjure up an interactive dashboard just for you!")
 
 uploaded_file = st.file_uploader("📂 Choose your data potion (CSV file)", type="csv")
 
+speculative_mode = st.sidebar.checkbox("⚡ Draft the dashboard while features are being engineered", value=True)
+sectioned_mode = st.sidebar.checkbox("🧩 Write the layout, KPIs and charts in parallel", value=False)
+background_jobs = st.sidebar.checkbox("🏭 Build dashboards in background workers (keeps the app snappy for everyone)", value=False)
+budget_seconds = st.sidebar.number_input("⏱️ Time-to-dashboard budget in seconds (0 = no limit); optional steps are dropped to meet it",
+                                         min_value=0, value=int(default_budget_seconds()), step=5)
+
 if uploaded_file is not None:
     with st.spinner("🧪 Brewing your data..."):
         temp_file_path = "Staging_Data/temp_data.csv"
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # Streamlit reruns this script on every interaction; each stage is only redone when its inputs change
+        upload_hash = content_hash(uploaded_file.getbuffer())
         
-        data = get_data(temp_file_path)
+        def load_upload():
+            with open(temp_file_path, "wb") as f:
+                f.write(uploaded_file.getbuffer())
+            return get_data(temp_file_path)
+        
+        data = memoize(st.session_state, "load", upload_hash, load_upload)
         
         if data is not None:
             st.success("✨ Data successfully summoned!")
@@ -35,71 +67,207 @@ if uploaded_file is not None:
                 st.dataframe(data.head())
             
             if validate_data_for_dashboard(data):
-                cleaned_data = clean_data(data)
+                cleaned_data = memoize(st.session_state, "clean", upload_hash, lambda: clean_data(data))
                 if cleaned_data is not None:
                     st.success("🧼 Data cleaning spell complete!")
                     
                     with st.expander("🔍 Inspect your squeaky clean data"):
                         st.dataframe(cleaned_data.head())
                     
+                    # Built from the data profile alone within a second, and saved as gendb.py with its data so it
+                    # can be launched while the LLM works on the real one, which replaces it when ready
+                    def build_baseline():
+                        baseline_start = time.time()
+                        code = build_baseline_dashboard(cleaned_data)
+                        cleaned_data.to_csv("Staging_Data/engineered_data.csv", index=False)
+                        st.session_state.pop("staged_data_key", None)
+                        with open("gendb.py", "w", encoding='utf-8') as f:
+                            f.write(code)
+                        return code, round(time.time() - baseline_start, 2)
+                    
+                    baseline_code, baseline_seconds = memoize(st.session_state, "baseline", upload_hash, build_baseline)
+                    st.info(f"⚡ An instant baseline dashboard was ready in {baseline_seconds}s and saved as gendb.py: run `python gendb.py` "
+                            "to explore it while the wizards craft yours (theirs replaces it when done).")
+                    with st.expander("👀 Peek at the baseline dashboard code"):
+                        st.code(baseline_code, language="python")
+                    use_baseline = st.checkbox("😌 The baseline is good enough for me, skip the AI dashboard", value=False)
+                    
                     perform_fe = st.radio("🧙‍♂️ Shall we enhance your data with some feature engineering magic?", ("Yes, please!", "No, thanks"), index=1)
                     
+                    start_time = time.time()
+                    # Counted from the upload, not from this rerun: each interaction reruns the script
+                    budget = LatencyBudget(budget_seconds, memoize(st.session_state, "budget start", upload_hash, time.time))
+                    llm = get_dashboard_llm()
+                    speculative_future = None
+                    run_log = []
+                    
+                    benchmark_fe = False
                     if perform_fe == "Yes, please!":
-                        with st.spinner("🎩 Pulling new features out of the hat..."):
-                            engineered_data, generated_code = feature_engineering(cleaned_data)
+                        benchmark_fe = st.checkbox("📏 Stress-test the new features on synthetic data (10k to 10M rows) before applying them")
+                    data_key = (upload_hash, perform_fe, benchmark_fe)
+                    reused_dashboard = False
+                    
+                    def show_feature_engineering(engineered_data, generated_code, benchmark_report):
+                        if benchmark_report is not None:
+                            with st.expander("📏 Feature code scaling report"):
+                                st.dataframe(pd.DataFrame(benchmark_report["sizes"]))
+                                st.write(f"Scaling exponent: {benchmark_report['exponent']} · projected time at 50M rows: {benchmark_report['projected_seconds']}s")
+                            if not benchmark_report["accepted"]:
+                                st.warning(f"🐢 Feature code rejected before touching your data: {benchmark_report['reason']}")
                         
                         if generated_code:
                             st.success("🌟 Feature engineering enchantment successful!")
                             with st.expander("🔮 Gaze upon your enhanced data"):
                                 st.dataframe(engineered_data.head())
+                            return engineered_data
+                        st.info("🤔 Hmm, it seems your data was already quite magical. No new features added.")
+                        return cleaned_data
+                    
+                    if use_baseline:
+                        # A background job building the AI dashboard is no longer wanted
+                        if st.session_state.get("active_job") is not None:
+                            cancel_job(st.session_state.pop("active_job"))
+                        engineered_data = cleaned_data
+                        # Checked like an AI dashboard, but nothing corrects it
+                        findings = verify_dashboard_code(baseline_code, cleaned_data.columns)
+                        corrected_code, degradations = baseline_code, []
+                        run_log = [{"stage": "baseline", "seconds": baseline_seconds, "cache_hit": False, "attempts": 0, "coalesced": False}]
+                        data_key = (upload_hash, "baseline")
+                        data_changed = st.session_state.get("staged_data_key") != data_key
+                        output_path = "Staging_Data/engineered_data.csv"
+                        if data_changed:
+                            engineered_data.to_csv(output_path, index=False)
+                    elif background_jobs:
+                        ensure_workers()
+                        job_id = memoize(st.session_state, "job", (*data_key, sectioned_mode),
+                                         lambda: submit_dashboard_job(cleaned_data, perform_fe == "Yes, please!", benchmark_fe, sectioned_mode,
+                                                                      budget_seconds))
+                        # A job for other data or options is no longer wanted; free its worker
+                        previous_job = st.session_state.get("active_job")
+                        if previous_job not in (None, job_id):
+                            cancel_job(previous_job)
+                        st.session_state["active_job"] = job_id
+                        job_status = st.empty()
+                        
+                        def show_job_status(job):
+                            if job["status"] == "queued":
+                                job_status.info(f"🕰️ Waiting for a free worker: {queue_position(job['id'])} job(s) ahead of yours")
+                            else:
+                                job_status.info(f"⚙️ {job['progress'] or 'Starting'}...")
+                        
+                        with st.spinner("🏭 Our background workers are conjuring your dashboard..."):
+                            job = wait_for_job(job_id, on_poll=show_job_status)
+                        job_status.empty()
+                        if job["status"] == "cancelled":
+                            # Superseded earlier and now wanted again: queue it afresh
+                            forget(st.session_state, "job", (*data_key, sectioned_mode))
+                            st.rerun()
+                        if job["status"] == "failed":
+                            forget(st.session_state, "job", (*data_key, sectioned_mode))
+                            st.error(f"🌀 The background spell fizzled: {job['error']}")
+                            st.stop()
+                        
+                        result = job["result"]
+                        degradations = result.get("degradations", [])
+                        # The job's data file is deleted once read, so the data is kept with the session
+                        engineered_data = memoize(st.session_state, "job data", job_id, lambda: load_job_data(result))
+                        if engineered_data is None:
+                            # Read by an earlier rerun whose copy has since been dropped: queue the job afresh
+                            forget(st.session_state, "job data", job_id)
+                            forget(st.session_state, "job", (*data_key, sectioned_mode))
+                            st.rerun()
+                        if SKIPPED_FEATURE_ENGINEERING in degradations:
+                            st.warning("⏱️ No time for feature engineering within your budget, so we went with your data as it is.")
+                        elif perform_fe == "Yes, please!":
+                            engineered_data = show_feature_engineering(engineered_data, result["generated_code"], result["benchmark_report"])
                         else:
-                            st.info("🤔 Hmm, it seems your data was already quite magical. No new features added.")
-                            engineered_data = cleaned_data
+                            st.info("👍 Keeping it simple, I see. No feature engineering performed.")
+                        reused_draft = result["reused_draft"]
+                        if reused_draft and KEPT_DRAFT not in degradations:
+                            st.info("⚡ The dashboard drafted during feature engineering already covers your data, so we kept it.")
+                        corrected_code, findings, run_log = result["code"], result["findings"], result["run_log"]
+                        data_changed = st.session_state.get("staged_data_key") != data_key
+                        output_path = "Staging_Data/engineered_data.csv"
+                        if data_changed:
+                            engineered_data.to_csv(output_path, index=False)
                     else:
-                        st.info("👍 Keeping it simple, I see. No feature engineering performed.")
-                        engineered_data = cleaned_data
-                    
-                    output_path = "Staging_Data/engineered_data.csv"
-                    engineered_data.to_csv(output_path, index=False)
+                        run_fe = perform_fe == "Yes, please!"
+                        if run_fe:
+                            fe_key = (upload_hash, benchmark_fe)
+                            # Decided once per data and budget, so a rerun does not redo a dropped step
+                            run_fe = is_fresh(st.session_state, "feature engineering", fe_key) or memoize(
+                                st.session_state, "feature engineering plan", (*fe_key, budget_seconds),
+                                lambda: budget.allow(SKIPPED_FEATURE_ENGINEERING, "feature engineering", "generation", "correction (patch)"))
+                            if not run_fe:
+                                budget.degrade(SKIPPED_FEATURE_ENGINEERING)
+                                st.warning("⏱️ No time for feature engineering within your budget, so we went with your data as it is.")
+                                engineered_data = cleaned_data
+                        if run_fe:
+                            if speculative_mode and not is_fresh(st.session_state, "feature engineering", fe_key):
+                                speculative_future = start_speculative_generation(llm, cleaned_data, run_log, sectioned=sectioned_mode,
+                                                                                  budget=budget)
+                            with st.spinner("🎩 Pulling new features out of the hat..."):
+                                engineered_data, generated_code, benchmark_report = memoize(
+                                    st.session_state, "feature engineering", fe_key,
+                                    lambda: feature_engineering(cleaned_data, benchmark=benchmark_fe, run_log=run_log))
+                            engineered_data = show_feature_engineering(engineered_data, generated_code, benchmark_report)
+                        elif perform_fe != "Yes, please!":
+                            st.info("👍 Keeping it simple, I see. No feature engineering performed.")
+                            engineered_data = cleaned_data
+                        
+                        data_key = (*data_key, run_fe)
+                        data_changed = st.session_state.get("staged_data_key") != data_key
+                        output_path = "Staging_Data/engineered_data.csv"
+                        if data_changed:
+                            engineered_data.to_csv(output_path, index=False)
+                        
+                        # The dashboard only depends on the prompt, so same-schema data reuses it
+                        dashboard_prompt = memoize(st.session_state, "prompt", data_key, lambda: prompt_generator(budget.profile_data(engineered_data)))
+                        dashboard_key = content_hash(dashboard_prompt, sectioned_mode)
+                        reused_dashboard = is_fresh(st.session_state, "correction", dashboard_key)
+                        if reused_dashboard and speculative_future is not None:
+                            cancel_speculative_generation(speculative_future)
+                        
+                        live_code = st.empty()
+                        show_live_code = lambda text: live_code.code(text, language="python")
+                        
+                        try:
+                            with st.spinner("🎨 Crafting your custom dashboard masterpiece..."):
+                                dashboard_code, reused_draft = memoize(
+                                    st.session_state, "generation", dashboard_key,
+                                    lambda: resolve_dashboard_code(llm, engineered_data, cleaned_data, speculative_future, run_log,
+                                                                   on_update=show_live_code, sectioned=sectioned_mode, budget=budget))
+                            
+                            if reused_draft and KEPT_DRAFT not in budget.degradations:
+                                st.info("⚡ The dashboard drafted during feature engineering already covers your data, so we kept it.")
+                            
+                            with st.spinner("🔍 Giving your dashboard code a final polish..."):
+                                # The run log is kept with the result, so a rerun still shows where the time went
+                                corrected_code, findings, run_log, degradations = memoize(
+                                    st.session_state, "correction", dashboard_key,
+                                    lambda: (*correct_dashboard_code(llm, engineered_data, dashboard_code, run_log, on_update=show_live_code,
+                                                                     budget=budget), run_log, budget.degradations))
+                        except StreamAborted as e:
+                            st.error(f"🌀 The dashboard spirits kept wandering off course, so we stopped them early: {str(e)}")
+                            st.stop()
+                        live_code.empty()
                     
-                    start_time = time.time()
+                    if use_baseline and findings:
+                        with st.expander(f"⚠️ {len(findings)} issue(s) found by our local check in the baseline dashboard"):
+                            st.markdown("\n".join(f"- {finding}" for finding in findings))
+                    elif use_baseline:
+                        st.info("✅ The baseline dashboard passed our local checks.")
+                    elif findings and SKIPPED_CORRECTION in degradations:
+                        with st.expander(f"⚠️ {len(findings)} issue(s) found by our local check were left unfixed to stay within your budget"):
+                            st.markdown("\n".join(f"- {finding}" for finding in findings))
+                    elif findings:
+                        with st.expander(f"🩹 Fixed {len(findings)} issue(s) found by our local check"):
+                            st.markdown("\n".join(f"- {finding}" for finding in findings))
+                    else:
+                        st.info("✅ Your dashboard passed our local checks, so we skipped the extra polish pass.")
                     
-                    with st.spinner("🧙‍♂️ Summoning the dashboard spirits..."):
-                        dashboard_prompt = prompt_generator(engineered_data)
-                        
-                        llm = ChatAnthropic(
-                            model="claude-3-5-sonnet-20240620",
-                            temperature=0,
-                            max_tokens=8192,
-                            max_retries=2,
-                        )
-                    
-                    with st.spinner("🎨 Crafting your custom dashboard masterpiece..."):
-                        response = llm.invoke(dashboard_prompt)
-                        dashboard_code = response.content if hasattr(response, 'content') else str(response)
-                    
-                    with st.spinner("🔍 Giving your dashboard code a final polish..."):
-                        correction_prompt = f"""
-                        Review and correct the following Python code for a Dash dashboard. 
-                        Make sure:
-                        1. The charts are interacting with each other.
-                        2. Filter has a select all feature (by default).
-                        3. Reset Filters button should be working properly
-
-                        The code should work with a pandas DataFrame named 'df' that contains the following columns:
-                        {', '.join(engineered_data.columns)}
-
-                        Here's the code to review:
-
-                        {dashboard_code}
-
-                        If you find any errors or potential improvements, provide ONLY the corrected version of the entire code. 
-                        Do not include any explanations, comments, or anything other than the Python code itself.
-                        If the code looks correct and doesn't need changes, return the original code as is.
-                        """
-
-                        correction_response = llm.invoke(correction_prompt)
-                        corrected_code = correction_response.content if hasattr(correction_response, 'content') else str(correction_response)
+                    if degradations:
+                        st.warning(f"⏱️ To keep within your {budget_seconds}s budget we " + "; ".join(degradations) + ".")
 
                     end_time = time.time()
                     execution_time = round(end_time - start_time, 2)
@@ -111,10 +279,35 @@ if uploaded_file is not None:
                     output_filename = "gendb.py"
                     output_path = output_filename
                     
+                    validation_start = time.time()
+                    validation_errors = validate_dashboard_code(corrected_code, list(engineered_data.columns))
+                    validation_ms = round((time.time() - validation_start) * 1000, 1)
+                    
                     try:
                         with open(output_path, "w", encoding='utf-8') as f:
                             f.write(corrected_code)
-                        st.success(f"🎉 Voila! Your dashboard is ready in just {execution_time} seconds! Let's take it for a spin!")
+                        # The validator can still be wrong, so its findings are shown rather than blocking the dashboard
+                        if validation_errors:
+                            with st.expander(f"⚠️ {len(validation_errors)} possible problem(s) found by the validator in {validation_ms} ms"):
+                                st.markdown("\n".join(f"- {error}" for error in validation_errors))
+                        adapted_from = next((call for call in run_log if call["stage"] == "schema reuse"), None)
+                        cache_hits = sum(1 for call in run_log if call["cache_hit"])
+                        cache_note = f" ({cache_hits} of {len(run_log)} LLM calls served from cache ⚡)" if cache_hits else ""
+                        if use_baseline:
+                            cache_note = " (instant baseline, no LLM calls 🧮)"
+                        elif reused_dashboard:
+                            cache_note = " (reused from earlier in this session ♻️)"
+                        elif adapted_from:
+                            cache_note = f" (adapted from a stored dashboard with a {adapted_from['similarity']:.0%} similar schema ♻️)"
+                        if not use_baseline and not findings:
+                            # Verified dashboards are stored, once per distinct code, so later uploads with a similar schema
+                            # can skip the LLM; an adapted corpus dashboard is stored with the schema it was verified on
+                            add_dashboard(corrected_code, engineered_data)
+                        st.success(f"🎉 Voila! Your dashboard is ready in just {execution_time} seconds{cache_note}! Let's take it for a spin!")
+                        with st.expander("⏱️ Where the time went"):
+                            st.dataframe(pd.DataFrame(run_log))
+                            st.caption("Per stage and model across all recorded runs")
+                            st.dataframe(summarize_calls(load_calls()))
                     except Exception as e:
                         st.error(f"Oops! We hit a snag while saving your dashboard: {str(e)}")
                     
@@ -122,8 +315,10 @@ if uploaded_file is not None:
                     with st.expander("Click to reveal the magic"):
                         st.code(corrected_code, language="python")
                     
-                    data_path = os.path.join(output_directory, "data.csv")
-                    engineered_data.to_csv(data_path, index=False)
+                    if data_changed:
+                        data_path = os.path.join(output_directory, "data.csv")
+                        engineered_data.to_csv(data_path, index=False)
+                        st.session_state["staged_data_key"] = data_key
                     
                     st.subheader("🏃‍♂️ Run Your Dashboard")
                     st.info("""
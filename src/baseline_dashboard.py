@@ -0,0 +1,169 @@
+import logging
+import re
+import time
+
+from src.dashboard_sections import build_contract, stitch_sections
+
+# KPIs of columns with these words in their names are averaged rather than summed
+MEAN_WORDS = {"age", "avg", "average", "mean", "rate", "ratio", "pct", "percent", "percentage", "score",
+              "rating", "price", "margin", "temperature"}
+CHARTS_PER_ROW = 2
+
+
+def _title(column):
+    return re.sub(r"[_\s]+", " ", str(column)).strip().title()
+
+
+def _aggregation(column):
+    words = set(re.split(r"[^0-9a-z]+", re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", str(column)).lower()))
+    return "mean" if words & MEAN_WORDS else "sum"
+
+
+def _chart_specs(contract):
+    """(title, figure expression) per chart: a trend over time, breakdowns by the filters, then distributions."""
+    date = contract["date_column"]
+    kpis = [kpi["column"] for kpi in contract["kpis"]]
+    filters = [item["column"] for item in contract["filters"]]
+    specs = []
+    if date is not None:
+        period = f"dff[{date!r}].dt.to_period('M').dt.to_timestamp()"
+        if kpis:
+            k, agg = kpis[0], _aggregation(kpis[0])
+            specs.append((f"{_title(k)} by Month",
+                          f"px.line(dff.groupby({period})[{k!r}].{agg}().reset_index(), x={date!r}, y={k!r}, markers=True)"))
+        else:
+            specs.append(("Records by Month",
+                          f"px.line(dff.groupby({period}).size().reset_index(name='count'), x={date!r}, y='count', markers=True)"))
+    for i, column in enumerate(filters[:2]):
+        if kpis and i == 0:
+            k, agg = kpis[0], _aggregation(kpis[0])
+            specs.append((f"{_title(k)} by {_title(column)}",
+                          f"px.bar(dff.groupby({column!r})[{k!r}].{agg}().reset_index(), x={column!r}, y={k!r})"))
+        else:
+            specs.append((f"Share by {_title(column)}",
+                          f"px.pie(dff.groupby({column!r}).size().reset_index(name='count'), names={column!r}, values='count', hole=0.4)"))
+    for column in kpis:
+        specs.append((f"Distribution of {_title(column)}", f"px.histogram(dff, x={column!r}, nbins=30)"))
+    if len(kpis) >= 2:
+        specs.append((f"{_title(kpis[1])} vs {_title(kpis[0])}", f"px.scatter(dff, x={kpis[0]!r}, y={kpis[1]!r})"))
+    return specs[:len(contract["charts"])]
+
+
+def _layout_function(contract):
+    filters = []
+    for item in contract["filters"]:
+        column = item["column"]
+        filters.append(
+            f"dbc.Col([html.Label({_title(column)!r}), dcc.Dropdown(id={item['id']!r}, "
+            f"options=[{{'label': 'Select All', 'value': 'ALL'}}] + [{{'label': str(v), 'value': v}} "
+            f"for v in sorted(df[{column!r}].dropna().unique(), key=str)], value=['ALL'], multi=True)])")
+    if contract["date_range"]:
+        column = contract["date_column"]
+        filters.append(
+            f"dbc.Col([html.Label({_title(column)!r}), dcc.DatePickerRange(id={contract['date_range']!r}, "
+            f"start_date=df[{column!r}].min(), end_date=df[{column!r}].max())])")
+    filters.append(f"dbc.Col(html.Button('Reset Filters', id={contract['reset_button']!r}, n_clicks=0, "
+                   f"className='btn btn-outline-secondary mt-4'), width='auto')")
+    kpis = [f"dbc.Col(dbc.Card(dbc.CardBody(id={kpi['id']!r})))" for kpi in contract["kpis"]]
+    charts = [f"dbc.Col(dcc.Graph(id={chart!r}), md={12 // CHARTS_PER_ROW})" for chart in contract["charts"]]
+    filter_row = ",\n            ".join(filters)
+    rows = [f"dbc.Row([\n            {filter_row},\n        ], className='mb-3')"]
+    if kpis:
+        rows.append(f"dbc.Row([{', '.join(kpis)}], className='mb-3')")
+    for i in range(0, len(charts), CHARTS_PER_ROW):
+        rows.append(f"dbc.Row([{', '.join(charts[i:i + CHARTS_PER_ROW])}], className='mb-3')")
+    body = ",\n        ".join(["html.H1('Dashboard', className='my-3')"] + rows)
+    return f"def build_layout(df):\n    return dbc.Container([\n        {body},\n    ], fluid=True)"
+
+
+def _filtered(contract):
+    return "filter_data(df, *inputs)" if contract["inputs"] else "df"
+
+
+def _kpi_function(contract, inputs):
+    if not contract["kpis"]:
+        return "def register_kpi_callbacks(app, df):\n    pass"
+    outputs = ", ".join(f"Output({kpi['id']!r}, 'children')" for kpi in contract["kpis"])
+    cards = []
+    for kpi in contract["kpis"]:
+        column, agg = kpi["column"], _aggregation(kpi["column"])
+        title = f"{'Average' if agg == 'mean' else 'Total'} {_title(column)}"
+        cards.append(f"card({title!r}, dff[{column!r}].{agg}(), "
+                     f"None if previous is None else previous[{column!r}].{agg}())")
+    if contract["date_column"] is not None:
+        previous = [
+            "        previous = None",
+            "        if inputs[0] and inputs[1]:",
+            "            offset = pd.DateOffset(months=6)",
+            "            previous = filter_data(df, pd.to_datetime(inputs[0]) - offset, pd.to_datetime(inputs[1]) - offset, *inputs[2:])",
+        ]
+    else:
+        previous = ["        previous = None"]
+    lines = [
+        "def register_kpi_callbacks(app, df):",
+        "",
+        "    def card(title, value, previous_value):",
+        "        body = [html.H6(title, className='text-muted'), html.H3(f'{value:,.2f}')]",
+        "        if previous_value:",
+        "            change = (value - previous_value) / abs(previous_value) * 100",
+        "            body.append(html.Span(f\"{'▲' if change >= 0 else '▼'} {abs(change):.1f}% vs 6 months earlier\",",
+        "                                  style={'color': 'green' if change >= 0 else 'red'}))",
+        "        return body",
+        "",
+        f"    @app.callback({outputs}, {inputs})",
+        "    def update_kpis(*inputs):",
+        f"        dff = {_filtered(contract)}",
+        *previous,
+        f"        return [{', '.join(cards)}]",
+    ]
+    return "\n".join(lines)
+
+
+def _chart_function(contract, inputs, specs):
+    lines = ["def register_chart_callbacks(app, df):"]
+    for i, (chart, (title, figure)) in enumerate(zip(contract["charts"], specs)):
+        lines += [
+            "",
+            f"    @app.callback(Output({chart!r}, 'figure'), {inputs})",
+            f"    def update_chart_{i + 1}(*inputs):",
+            f"        dff = {_filtered(contract)}",
+            f"        fig = {figure}",
+            f"        fig.update_layout(title={title!r}, template='plotly_white', margin=dict(l=20, r=20, t=50, b=20))",
+            "        return fig",
+        ]
+    return "\n".join(lines)
+
+
+def build_baseline_dashboard(data):
+    """Build a dashboard for the data without an LLM, from its profile alone.
+
+    Uses the same contract and skeleton as the sectioned generation: KPI cards
+    for the numeric columns (with the change against 6 months earlier when
+    there is a date column), dropdown filters for the low-cardinality
+    categoricals, a date range picker, a reset button, and trend, breakdown
+    and distribution charts. It takes well under a second, so it can be shown
+    while the LLM writes the real dashboard.
+
+    Args:
+        data (pd.DataFrame): Data the dashboard is built for
+
+    Returns:
+        str: Dashboard code
+    """
+    start = time.perf_counter()
+    contract = build_contract(data)
+    specs = _chart_specs(contract)
+    if not specs:
+        specs = [(f"Distribution of {_title(data.columns[0])}", f"px.histogram(dff, x={str(data.columns[0])!r})")]
+    contract = {**contract, "charts": contract["charts"][:len(specs)]}
+    # Without filters the callbacks still need an input to run on page load
+    inputs = ", ".join(f"Input({component_id!r}, {prop!r})" for component_id, prop in contract["inputs"]) \
+        or f"Input({contract['reset_button']!r}, 'n_clicks')"
+    sections = {
+        "layout": _layout_function(contract),
+        "kpis": _kpi_function(contract, inputs),
+        "charts": _chart_function(contract, inputs, specs),
+    }
+    code = stitch_sections(contract, sections)
+    logging.info(f"Baseline dashboard built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return code
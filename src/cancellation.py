@@ -0,0 +1,89 @@
+import contextvars
+import logging
+import threading
+import time
+
+POLL_SECONDS = 0.2
+
+
+class Cancelled(BaseException):
+    """Raised in work belonging to a superseded run.
+
+    A BaseException, like asyncio.CancelledError, so the `except Exception`
+    handlers that turn failures into fallbacks do not swallow it.
+    """
+
+
+class CancelToken:
+    """Flag shared by all the work of one pipeline run.
+
+    A token with a parent is also cancelled when its parent is, so part of a
+    run (e.g. a speculative draft) can be stopped on its own.
+    """
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self.parent = parent
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+
+# The token of the run the current thread works for; copied into executor threads with the context
+current_token = contextvars.ContextVar("cancel_token", default=None)
+
+_runs = {}
+_runs_lock = threading.Lock()
+
+
+def start_run(session_id):
+    """Start a new run for a session, cancelling the session's previous run.
+
+    The new token becomes the current one in this context, so LLM calls and
+    background work started from here are cancelled when the next run starts.
+
+    Returns:
+        CancelToken: The new run's token
+    """
+    token = CancelToken()
+    with _runs_lock:
+        previous = _runs.get(session_id)
+        _runs[session_id] = token
+    if previous is not None and not previous.cancelled:
+        previous.cancel()
+        logging.info(f"Cancelled the previous run of session {session_id[:8]}")
+    current_token.set(token)
+    return token
+
+
+def run_with_token(token, fn, *args, **kwargs):
+    """Call `fn` with `token` as the current token; meant for a copied context, e.g. an executor task."""
+    current_token.set(token)
+    return fn(*args, **kwargs)
+
+
+def is_cancelled():
+    """Return True if the current run has been superseded."""
+    token = current_token.get()
+    return token is not None and token.cancelled
+
+
+def check():
+    """Raise Cancelled if the current run has been superseded."""
+    if is_cancelled():
+        raise Cancelled("Superseded by a newer run")
+
+
+def join_process(process, timeout=None):
+    """Wait for a process like `process.join(timeout)`, terminating it if the run is cancelled."""
+    deadline = None if timeout is None else time.time() + timeout
+    while process.is_alive() and (deadline is None or time.time() < deadline):
+        if is_cancelled():
+            process.terminate()
+            process.join()
+            raise Cancelled("Superseded by a newer run")
+        process.join(POLL_SECONDS if deadline is None else min(POLL_SECONDS, max(0.0, deadline - time.time())))
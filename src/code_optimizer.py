@@ -0,0 +1,367 @@
+import ast
+import copy
+import logging
+import re
+
+# Rough per-row cost (in microseconds) of the row-wise patterns we cannot
+# vectorize automatically. Used to give an order-of-magnitude estimate only.
+ROW_COST_US = {
+    "apply_axis1": 25.0,
+    "iterrows": 60.0,
+    "itertuples": 5.0,
+    "series_apply": 1.5,
+    "python_loop": 10.0,
+}
+
+DATE_PARTS = {
+    "year", "month", "day", "hour", "minute", "second", "quarter",
+    "dayofweek", "day_of_week", "dayofyear", "day_of_year", "weekday", "date",
+}
+STRING_METHODS = {
+    "upper", "lower", "strip", "lstrip", "rstrip", "title", "capitalize",
+    "startswith", "endswith", "replace", "split",
+}
+DATE_METHODS = {"strftime", "isoformat", "normalize"}
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+def extract_code(text):
+    """Pull the Python code out of an LLM response.
+
+    Args:
+        text (str): Raw response, possibly with markdown fences and prose
+
+    Returns:
+        str: The code inside the fenced blocks, or the text itself
+    """
+    blocks = re.findall(r"```(?:python|py)?\s*\n(.*?)```", text, flags=re.DOTALL)
+    if blocks:
+        return "\n\n".join(block.strip() for block in blocks)
+    return text.strip()
+
+
+class _RowVectorizer(ast.NodeTransformer):
+    """Rewrite the body of a row-wise lambda into an equivalent column expression."""
+
+    def __init__(self, var, frame=None, series=None):
+        self.var = var
+        self.frame = frame
+        self.series = series
+
+    def _column(self, node):
+        # row['col'] / row.col in frame mode, x in series mode
+        if self.frame is not None and isinstance(node, ast.Subscript):
+            if isinstance(node.value, ast.Name) and node.value.id == self.var:
+                key = node.slice
+                if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                    return ast.Subscript(value=copy.deepcopy(self.frame), slice=key, ctx=ast.Load())
+                raise _NotVectorizable("dynamic row key")
+        if self.frame is not None and isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name) and node.value.id == self.var:
+                if node.attr in ("name", "index"):
+                    raise _NotVectorizable("row label")
+                return ast.Subscript(value=copy.deepcopy(self.frame), slice=ast.Constant(node.attr), ctx=ast.Load())
+        if self.series is not None and isinstance(node, ast.Name) and node.id == self.var:
+            return copy.deepcopy(self.series)
+        return None
+
+    def visit_Name(self, node):
+        if node.id == self.var:
+            column = self._column(node)
+            if column is None:
+                raise _NotVectorizable("row used as a whole")
+            return column
+        return node
+
+    def visit_Subscript(self, node):
+        column = self._column(node)
+        if column is not None:
+            return column
+        raise _NotVectorizable("subscript")
+
+    def visit_Attribute(self, node):
+        column = self._column(node)
+        if column is not None:
+            return column
+        if node.attr in DATE_PARTS:
+            value = self.visit(node.value)
+            return ast.Attribute(
+                value=ast.Attribute(value=value, attr="dt", ctx=ast.Load()),
+                attr=node.attr, ctx=ast.Load(),
+            )
+        raise _NotVectorizable(f"attribute {node.attr}")
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id == "str" and len(node.args) == 1:
+            return self._as_str(self.visit(node.args[0]))
+        if isinstance(node.func, ast.Name) and node.func.id == "len" and len(node.args) == 1:
+            return self._accessor_call(self.visit(node.args[0]), "str", "len", [], [])
+        if isinstance(node.func, ast.Attribute):
+            method = node.func.attr
+            args = [self.visit(arg) for arg in node.args]
+            keywords = [ast.keyword(arg=kw.arg, value=self.visit(kw.value)) for kw in node.keywords]
+            if method in STRING_METHODS:
+                return self._accessor_call(self.visit(node.func.value), "str", method, args, keywords)
+            if method in DATE_METHODS:
+                return self._accessor_call(self.visit(node.func.value), "dt", method, args, keywords)
+        raise _NotVectorizable("call")
+
+    def visit_JoinedStr(self, node):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                if value.value:
+                    parts.append(value)
+            elif isinstance(value, ast.FormattedValue) and value.format_spec is None and value.conversion == -1:
+                parts.append(self._as_str(self.visit(value.value)))
+            else:
+                raise _NotVectorizable("formatted value")
+        if not parts:
+            return ast.Constant("")
+        expr = parts[0]
+        for part in parts[1:]:
+            expr = ast.BinOp(left=expr, op=ast.Add(), right=part)
+        return expr
+
+    @staticmethod
+    def _is_condition(node):
+        # Expressions whose column form is a boolean Series, so &, | and ~ mean and, or and not
+        if isinstance(node, ast.Compare):
+            return True
+        if isinstance(node, ast.BoolOp):
+            return all(_RowVectorizer._is_condition(value) for value in node.values)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return _RowVectorizer._is_condition(node.operand)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            return node.func.attr in ("startswith", "endswith")
+        return isinstance(node, ast.Constant) and isinstance(node.value, bool)
+
+    def visit_BoolOp(self, node):
+        # On other values `and`/`or` return an operand, which the bitwise operators do not
+        if not self._is_condition(node):
+            raise _NotVectorizable("boolean operator on non-boolean values")
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        values = [self.visit(value) for value in node.values]
+        expr = values[0]
+        for value in values[1:]:
+            expr = ast.BinOp(left=expr, op=op, right=value)
+        return expr
+
+    def visit_UnaryOp(self, node):
+        if isinstance(node.op, ast.Not):
+            # ~ on integers is bitwise, not logical
+            if not self._is_condition(node.operand):
+                raise _NotVectorizable("not on a non-boolean value")
+            return ast.UnaryOp(op=ast.Invert(), operand=self.visit(node.operand))
+        operand = self.visit(node.operand)
+        return ast.UnaryOp(op=node.op, operand=operand)
+
+    def visit_Compare(self, node):
+        left = self.visit(node.left)
+        comparisons = []
+        for op, right in zip(node.ops, node.comparators):
+            right = self.visit(right)
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+                    raise _NotVectorizable("membership test")
+                expr = ast.Call(
+                    func=ast.Attribute(value=left, attr="isin", ctx=ast.Load()),
+                    args=[ast.List(elts=list(right.elts), ctx=ast.Load())], keywords=[],
+                )
+                if isinstance(op, ast.NotIn):
+                    expr = ast.UnaryOp(op=ast.Invert(), operand=expr)
+            elif isinstance(op, (ast.Is, ast.IsNot)):
+                raise _NotVectorizable("identity test")
+            else:
+                expr = ast.Compare(left=left, ops=[op], comparators=[right])
+            comparisons.append(expr)
+            left = right
+        expr = comparisons[0]
+        for comparison in comparisons[1:]:
+            expr = ast.BinOp(left=expr, op=ast.BitAnd(), right=comparison)
+        return expr
+
+    def visit_IfExp(self, node):
+        where = ast.Call(
+            func=ast.Attribute(value=ast.Name(id="np", ctx=ast.Load()), attr="where", ctx=ast.Load()),
+            args=[self.visit(node.test), self.visit(node.body), self.visit(node.orelse)],
+            keywords=[],
+        )
+        # np.where returns a bare array; a Series keeps the index and any .str/.dt calls chained after the apply
+        receiver = self.frame if self.frame is not None else self.series
+        return ast.Call(
+            func=ast.Attribute(value=ast.Name(id="pd", ctx=ast.Load()), attr="Series", ctx=ast.Load()),
+            args=[where],
+            keywords=[ast.keyword(arg="index", value=ast.Attribute(value=copy.deepcopy(receiver), attr="index", ctx=ast.Load()))],
+        )
+
+    def visit_Lambda(self, node):
+        raise _NotVectorizable("nested lambda")
+
+    def visit_ListComp(self, node):
+        raise _NotVectorizable("comprehension")
+
+    visit_SetComp = visit_DictComp = visit_GeneratorExp = visit_ListComp
+
+    @staticmethod
+    def _as_str(expr):
+        if isinstance(expr, ast.Constant):
+            return ast.Constant(str(expr.value))
+        # map(str) rather than astype(str), which leaves missing values missing instead of 'nan' as str() does
+        return ast.Call(
+            func=ast.Attribute(value=expr, attr="map", ctx=ast.Load()),
+            args=[ast.Name(id="str", ctx=ast.Load())], keywords=[],
+        )
+
+    @staticmethod
+    def _accessor_call(value, accessor, method, args, keywords):
+        return ast.Call(
+            func=ast.Attribute(
+                value=ast.Attribute(value=value, attr=accessor, ctx=ast.Load()),
+                attr=method, ctx=ast.Load(),
+            ),
+            args=args, keywords=keywords,
+        )
+
+
+def _is_row_wise(call):
+    for kw in call.keywords:
+        if kw.arg == "axis":
+            return isinstance(kw.value, ast.Constant) and kw.value.value in (1, "columns")
+    return False
+
+
+def _is_simple_series(node):
+    if isinstance(node, ast.Subscript):
+        return isinstance(node.value, ast.Name) and isinstance(node.slice, ast.Constant)
+    if isinstance(node, ast.Attribute):
+        return isinstance(node.value, ast.Name)
+    return False
+
+
+class _FeatureCodeOptimizer(ast.NodeTransformer):
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self.findings = []
+
+    def _flag(self, node, pattern, message):
+        finding = {
+            "line": getattr(node, "lineno", None),
+            "pattern": pattern,
+            "message": message,
+            "rewritten": False,
+            "estimated_seconds": None,
+        }
+        if self.n_rows is not None and pattern in ROW_COST_US:
+            finding["estimated_seconds"] = round(self.n_rows * ROW_COST_US[pattern] / 1e6, 3)
+        self.findings.append(finding)
+
+    def _rewritten(self, node, pattern, message):
+        self.findings.append({
+            "line": getattr(node, "lineno", None),
+            "pattern": pattern,
+            "message": message,
+            "rewritten": True,
+            "estimated_seconds": 0.0,
+        })
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.func, ast.Attribute):
+            return node
+        method = node.func.attr
+        receiver = node.func.value
+
+        if method in ("iterrows", "itertuples"):
+            self._flag(node, method, f"'.{method}()' walks the frame row by row in Python")
+            return node
+        if method not in ("apply", "map") or not node.args:
+            return node
+
+        func = node.args[0]
+        row_wise = method == "apply" and _is_row_wise(node)
+        pattern = "apply_axis1" if row_wise else "series_apply"
+        extra = [kw for kw in node.keywords if kw.arg != "axis"]
+        if not isinstance(func, ast.Lambda) or len(func.args.args) != 1 or extra or len(node.args) > 1:
+            if row_wise or isinstance(func, ast.Lambda):
+                self._flag(node, pattern, f"'.{method}()' with a Python function could not be vectorized")
+            return node
+
+        var = func.args.args[0].arg
+        if row_wise and isinstance(receiver, ast.Name):
+            vectorizer = _RowVectorizer(var, frame=receiver)
+        elif not row_wise and _is_simple_series(receiver):
+            vectorizer = _RowVectorizer(var, series=receiver)
+        else:
+            self._flag(node, pattern, f"'.{method}()' on a complex expression could not be vectorized")
+            return node
+
+        try:
+            expr = vectorizer.visit(copy.deepcopy(func.body))
+        except _NotVectorizable as e:
+            self._flag(node, pattern, f"'.{method}()' lambda could not be vectorized ({e})")
+            return node
+        self._rewritten(node, pattern, f"'.{method}()' lambda rewritten as a vectorized expression")
+        return ast.copy_location(expr, node)
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        target = node.iter
+        # iterrows/itertuples loops are already flagged by visit_Call
+        if isinstance(target, ast.Call) and isinstance(target.func, ast.Attribute) \
+                and target.func.attr in ("iterrows", "itertuples"):
+            return node
+        uses_indexer = any(
+            isinstance(sub, ast.Attribute) and sub.attr in ("loc", "iloc", "at", "iat")
+            for sub in ast.walk(node)
+        )
+        over_rows = isinstance(target, ast.Call) and isinstance(target.func, ast.Name) \
+            and target.func.id == "range" and any(
+                isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) and arg.func.id == "len"
+                for arg in target.args
+            )
+        if uses_indexer or over_rows:
+            self._flag(node, "python_loop", "Python loop over rows with per-element indexing")
+        return node
+
+
+def optimize_feature_code(code, n_rows=None):
+    """Vectorize common row-wise pandas patterns in generated feature code.
+
+    Rewrites `apply`/`map` lambdas built from column access, string
+    concatenation, date parts and conditionals into column expressions
+    (`np.where` for conditionals). Patterns that cannot be rewritten are
+    returned as findings with an estimated cost for `n_rows` rows.
+
+    Args:
+        code (str): Generated feature-engineering code
+        n_rows (int): Number of rows the code will run on, for cost estimates
+
+    Returns:
+        str: The (possibly rewritten) code
+        list: Findings, one dict per detected pattern
+    """
+    code = extract_code(code)
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        logging.error(f"Could not parse feature code for optimization: {str(e)}")
+        return code, []
+
+    optimizer = _FeatureCodeOptimizer(n_rows)
+    tree = optimizer.visit(tree)
+    ast.fix_missing_locations(tree)
+
+    rewritten = [f for f in optimizer.findings if f["rewritten"]]
+    if rewritten:
+        code = ast.unparse(tree)
+        logging.info(f"Vectorized {len(rewritten)} row-wise pattern(s) in feature code")
+    for finding in optimizer.findings:
+        if not finding["rewritten"]:
+            cost = finding["estimated_seconds"]
+            estimate = f" (estimated {cost}s on {n_rows} rows)" if cost is not None else ""
+            logging.warning(f"Line {finding['line']}: {finding['message']}{estimate}")
+    return code, optimizer.findings
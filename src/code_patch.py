@@ -0,0 +1,88 @@
+import ast
+import logging
+import re
+
+from src.code_optimizer import extract_code
+
+EDIT_FORMAT = """<<<<<<< SEARCH
+lines copied exactly from the code
+=======
+the lines that replace them
+>>>>>>> REPLACE"""
+
+EDIT_BLOCK = re.compile(
+    r"^<{5,9} SEARCH[ \t]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} REPLACE[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+
+class PatchError(Exception):
+    """Raised when edits cannot be applied unambiguously."""
+
+
+def parse_edits(text):
+    """Extract search/replace edits from an LLM response.
+
+    Args:
+        text (str): Response containing blocks in EDIT_FORMAT
+
+    Returns:
+        list: (search, replace) pairs in the order given
+    """
+    return [(search, replace) for search, replace in EDIT_BLOCK.findall(text)]
+
+
+def _normalize(lines):
+    return [line.rstrip() for line in lines]
+
+
+def _apply_one(code, search, replace):
+    if not search.strip():
+        raise PatchError("empty SEARCH block")
+    count = code.count(search)
+    if count == 1:
+        return code.replace(search, replace, 1)
+    if count > 1:
+        raise PatchError(f"SEARCH block matches {count} places: {search.strip().splitlines()[0]!r}")
+
+    # Tolerate differences in trailing whitespace, which models often drop
+    lines = code.split("\n")
+    search_lines = _normalize(search.rstrip("\n").split("\n"))
+    normalized = _normalize(lines)
+    matches = [i for i in range(len(lines) - len(search_lines) + 1)
+               if normalized[i:i + len(search_lines)] == search_lines]
+    if len(matches) != 1:
+        first_line = search.strip().splitlines()[0]
+        raise PatchError(f"SEARCH block {'not found' if not matches else 'is ambiguous'}: {first_line!r}")
+    start = matches[0]
+    replacement = replace.rstrip("\n").split("\n") if replace.strip() else []
+    return "\n".join(lines[:start] + replacement + lines[start + len(search_lines):])
+
+
+def apply_edits(code, edits):
+    """Apply search/replace edits to code, in order.
+
+    The edits are applied to the text as given, markdown fences included;
+    only the code inside the fences has to parse.
+
+    Args:
+        code (str): Original code, possibly fenced as the LLM returned it
+        edits (list): (search, replace) pairs from `parse_edits`
+
+    Returns:
+        str: Patched code
+
+    Raises:
+        PatchError: If there are no edits, a search block does not match
+            exactly once, or the result is not valid Python
+    """
+    if not edits:
+        raise PatchError("response contains no edits")
+    for search, replace in edits:
+        code = _apply_one(code, search, replace)
+    try:
+        ast.parse(extract_code(code))
+    except SyntaxError as e:
+        raise PatchError(f"patched code has a syntax error at line {e.lineno}: {e.msg}")
+    logging.info(f"Applied {len(edits)} edit(s)")
+    return code
@@ -0,0 +1,455 @@
+import argparse
+import ast
+import csv
+import logging
+import re
+import time
+
+from src.code_optimizer import extract_code
+
+# Variables that hold the dashboard data or a filtered copy of it
+FRAME_NAME = re.compile(r"^(df|dff|data|.*_df|df_.*|filtered.*)$")
+# Plotly Express keywords that take column names
+PX_COLUMN_KEYWORDS = ("x", "y", "color", "names", "values", "size", "facet_row", "facet_col", "hover_name", "path")
+# Columns pandas creates itself (value_counts / size / reset_index)
+IMPLICIT_COLUMNS = {"count", "index", "proportion", "size", "level_0"}
+DEPENDENCY_CLASSES = ("Output", "Input", "State")
+# DataFrame attributes that are not columns when read as `df.<attr>`
+FRAME_ATTRIBUTES = {
+    "columns", "index", "shape", "dtypes", "empty", "size", "values", "loc", "iloc", "at", "iat",
+    "T", "ndim", "str", "dt", "cat", "plot", "style", "name", "axes", "attrs",
+}
+STAGED_DATA_PATH = "Staging_Data/engineered_data.csv"
+
+
+def _call_name(node):
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def _keyword(node, name):
+    for kw in node.keywords:
+        if kw.arg == name:
+            return kw.value
+    return None
+
+
+def _string(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _is_empty(node):
+    return node is None or (isinstance(node, ast.Constant) and node.value is None) or \
+        (isinstance(node, (ast.List, ast.Tuple)) and not node.elts)
+
+
+def _option_values(options):
+    # The literal values of a literal options list, or None when they are built at runtime
+    if not isinstance(options, (ast.List, ast.Tuple)):
+        return None
+    values = set()
+    for option in options.elts:
+        if isinstance(option, ast.Dict):
+            option = next((v for k, v in zip(option.keys, option.values) if _string(k) == "value"), None)
+        if not isinstance(option, ast.Constant):
+            return None
+        values.add(option.value)
+    return values
+
+
+def _selects_all(dropdown):
+    """Whether a Dropdown's default value selects every option.
+
+    That is a 'ALL' entry, the literal option values, or an expression over
+    the same data as the options (e.g. `df['region'].unique().tolist()`)
+    that does not pick single elements out of it.
+    """
+    value = _keyword(dropdown, "value")
+    elements = value.elts if isinstance(value, (ast.List, ast.Tuple)) else [value]
+    if any(isinstance(element, ast.Constant) and str(element.value).upper() == "ALL" for element in elements):
+        return True
+    if all(isinstance(element, ast.Constant) for element in elements):
+        options = _option_values(_keyword(dropdown, "options"))
+        return options is not None and {element.value for element in elements} == options
+    for node in ast.walk(value):
+        # df.col.unique()[0], [-1] or [:3] is one or a few options, unlike df['col']
+        if isinstance(node, ast.Subscript) and _string(node.slice) is None \
+                and isinstance(node.slice, (ast.Constant, ast.UnaryOp, ast.Slice)):
+            return False
+        if isinstance(node, ast.Attribute) and node.attr in ("iloc", "iat", "at", "loc", "first", "head"):
+            return False
+    return True
+
+
+def collect_components(tree):
+    """Map every literal component id in the code to its component type."""
+    components = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            component_id = _string(_keyword(node, "id"))
+            if component_id is not None:
+                components[component_id] = _call_name(node)
+    return components
+
+
+def collect_dependencies(tree):
+    """List the (kind, component id, property, line) of every callback Output/Input/State."""
+    dependencies = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and _call_name(node) in DEPENDENCY_CLASSES and node.args:
+            component_id = _string(node.args[0])
+            prop = _string(node.args[1]) if len(node.args) > 1 else _string(_keyword(node, "component_property"))
+            if component_id is not None:
+                dependencies.append((_call_name(node), component_id, prop, node.lineno))
+    return dependencies
+
+
+def local_frames(tree):
+    """Names bound to a DataFrame built by the code itself, e.g. `kpi_df = pd.DataFrame({...})`."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call) and _call_name(node.value) == "DataFrame":
+            names.update(target.id for target in node.targets if isinstance(target, ast.Name))
+    return names
+
+
+def _is_data_frame(node, local):
+    # A variable holding the loaded data or a filtered copy of it
+    return isinstance(node, ast.Name) and FRAME_NAME.match(node.id) is not None and node.id not in local
+
+
+def collect_column_references(tree):
+    """Find the column names the code reads and the ones it creates.
+
+    Only frames holding the loaded data are checked: DataFrames the code
+    builds itself are skipped, and so are Plotly Express calls on any other
+    data frame, or on literal lists of values.
+
+    Returns:
+        list: (column, line) pairs read from a DataFrame or passed to Plotly Express
+        set: Columns created by the code itself (assignments, renames, aggregations)
+    """
+    reads = []
+    created = set(IMPLICIT_COLUMNS)
+    local = local_frames(tree)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Subscript) and _is_data_frame(node.value, local):
+            keys = node.slice.elts if isinstance(node.slice, (ast.List, ast.Tuple)) else [node.slice]
+            for key in keys:
+                column = _string(key)
+                if column is None:
+                    continue
+                if isinstance(node.ctx, ast.Store):
+                    created.add(column)
+                else:
+                    reads.append((column, node.lineno))
+        elif isinstance(node, ast.Call):
+            name = _call_name(node)
+            if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name) \
+                    and node.func.value.id == "px":
+                frame = node.args[0] if node.args else _keyword(node, "data_frame")
+                if _is_data_frame(frame, local):
+                    for keyword in PX_COLUMN_KEYWORDS:
+                        column = _string(_keyword(node, keyword))
+                        if column is not None:
+                            reads.append((column, node.lineno))
+            elif name in ("agg", "assign", "aggregate"):
+                created.update(kw.arg for kw in node.keywords if kw.arg)
+            elif name in ("reset_index", "to_frame"):
+                column = _string(_keyword(node, "name")) or (_string(node.args[0]) if node.args else None)
+                if column:
+                    created.add(column)
+            elif name == "rename":
+                mapping = _keyword(node, "columns")
+                if isinstance(mapping, ast.Dict):
+                    created.update(_string(v) for v in mapping.values if _string(v))
+            elif name in ("melt",):
+                for keyword in ("var_name", "value_name"):
+                    column = _string(_keyword(node, keyword))
+                    if column:
+                        created.add(column)
+    return reads, created
+
+
+def frame_attribute_columns(tree):
+    """Columns read as attributes, e.g. `df.supplier_name.unique()`."""
+    called = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    local = local_frames(tree)
+    reads = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and _is_data_frame(node.value, local) and isinstance(node.ctx, ast.Load) \
+                and id(node) not in called and node.attr not in FRAME_ATTRIBUTES:
+            reads.append((node.attr, node.lineno))
+    return reads
+
+
+def build_component_graph(tree):
+    """Build the layout component tree from the literal ids in the code.
+
+    Returns:
+        dict: Component id -> {"type", "parent", "line"}, where parent is the
+            id of the closest enclosing component that has one
+        list: (id, line) of ids defined more than once inside `app.layout`
+    """
+    graph = {}
+    duplicates = []
+    layout_nodes = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Attribute) and target.attr == "layout" for target in node.targets
+        ):
+            layout_nodes.update(id(sub) for sub in ast.walk(node.value))
+
+    def visit(node, parent):
+        if isinstance(node, ast.Call):
+            component_id = _string(_keyword(node, "id"))
+            if component_id is not None:
+                if component_id in graph:
+                    if id(node) in layout_nodes and graph[component_id]["in_layout"]:
+                        duplicates.append((component_id, node.lineno))
+                else:
+                    graph[component_id] = {"type": _call_name(node), "parent": parent,
+                                           "line": node.lineno, "in_layout": id(node) in layout_nodes}
+                parent = component_id
+        for child in ast.iter_child_nodes(node):
+            visit(child, parent)
+
+    visit(tree, None)
+    return graph, duplicates
+
+
+def _return_sizes(function):
+    """Tuple sizes of the function's own return statements (None when not a literal tuple)."""
+    sizes = []
+    stack = list(function.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            continue
+        if isinstance(node, ast.Return) and node.value is not None:
+            sizes.append(len(node.value.elts) if isinstance(node.value, (ast.Tuple, ast.List)) else None)
+        stack.extend(ast.iter_child_nodes(node))
+    return sizes
+
+
+def build_callback_graph(tree):
+    """Describe every `@callback` / `@app.callback` function and its dependencies.
+
+    Returns:
+        list: One dict per callback with its name, line, outputs, inputs and
+            states as (id, property) pairs, the ids of outputs that allow
+            duplicates, its parameter count and the sizes of its returns
+    """
+    callbacks = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            if not (isinstance(decorator, ast.Call) and _call_name(decorator) == "callback"):
+                continue
+            dependencies = {kind: [] for kind in DEPENDENCY_CLASSES}
+            allow_duplicate = set()
+            for sub in ast.walk(decorator):
+                if isinstance(sub, ast.Call) and _call_name(sub) in DEPENDENCY_CLASSES and sub.args:
+                    component_id = _string(sub.args[0])
+                    prop = _string(sub.args[1]) if len(sub.args) > 1 else None
+                    if component_id is None:
+                        continue
+                    dependencies[_call_name(sub)].append((component_id, prop))
+                    flag = _keyword(sub, "allow_duplicate")
+                    if isinstance(flag, ast.Constant) and flag.value is True:
+                        allow_duplicate.add((component_id, prop))
+            callbacks.append({
+                "name": node.name,
+                "line": node.lineno,
+                "outputs": dependencies["Output"],
+                "inputs": dependencies["Input"],
+                "states": dependencies["State"],
+                "allow_duplicate": allow_duplicate,
+                "params": None if node.args.vararg else len(node.args.args),
+                "returns": _return_sizes(node),
+            })
+    return callbacks
+
+
+def _find_cycle(callbacks):
+    """Return the names of callbacks forming a dependency cycle between different callbacks, or None."""
+    edges = {}
+    for i, source in enumerate(callbacks):
+        outputs = set(source["outputs"])
+        edges[i] = [j for j, target in enumerate(callbacks) if j != i and outputs.intersection(target["inputs"])]
+
+    state = {}
+
+    def visit(i, path):
+        state[i] = "active"
+        for j in edges[i]:
+            if state.get(j) == "active":
+                return path[path.index(j):] + [j]
+            if j not in state:
+                cycle = visit(j, path + [j])
+                if cycle:
+                    return cycle
+        state[i] = "done"
+        return None
+
+    for i in edges:
+        if i not in state:
+            cycle = visit(i, [i])
+            if cycle:
+                return [callbacks[j]["name"] for j in cycle]
+    return None
+
+
+def load_staged_columns(path=STAGED_DATA_PATH):
+    """Read the column names of the staged data without loading it."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def _parse(code):
+    try:
+        return ast.parse(extract_code(code)), None
+    except SyntaxError as e:
+        return None, f"Line {e.lineno}: syntax error ({e.msg})"
+
+
+def validate_dashboard_code(code, columns=None):
+    """Find errors that would make generated Dash code fail at runtime.
+
+    Builds the layout component graph and the callback dependency graph and
+    checks that every callback id exists, no output is claimed by two
+    callbacks, callbacks do not depend on each other in a cycle, callback
+    signatures and returns match their dependencies, and every column
+    referenced exists in the schema.
+
+    Args:
+        code (str): Generated dashboard code
+        columns (list): Columns of the data; the staged data's header when None
+
+    Returns:
+        list: Errors as human-readable strings; empty if the code is valid
+    """
+    tree, error = _parse(code)
+    if error:
+        return [error]
+    if columns is None:
+        columns = load_staged_columns()
+
+    errors = []
+    components, duplicates = build_component_graph(tree)
+    for component_id, line in duplicates:
+        errors.append(f"Line {line}: id '{component_id}' is used by more than one component in the layout")
+
+    callbacks = build_callback_graph(tree)
+    for callback in callbacks:
+        for kind, dependencies in (("Output", callback["outputs"]), ("Input", callback["inputs"]), ("State", callback["states"])):
+            for component_id, prop in dependencies:
+                if component_id not in components:
+                    errors.append(f"Line {callback['line']}: callback {kind}('{component_id}', '{prop}') "
+                                  f"refers to an id that is not in the layout")
+        expected = len(callback["inputs"]) + len(callback["states"])
+        if callback["params"] is not None and callback["params"] != expected:
+            errors.append(f"Line {callback['line']}: callback '{callback['name']}' takes {callback['params']} "
+                          f"argument(s) but has {expected} Input/State dependencies")
+        n_outputs = len(callback["outputs"])
+        if n_outputs > 1:
+            for size in callback["returns"]:
+                if size is not None and size != n_outputs:
+                    errors.append(f"Line {callback['line']}: callback '{callback['name']}' returns {size} "
+                                  f"value(s) for {n_outputs} outputs")
+                    break
+
+    claimed = {}
+    for callback in callbacks:
+        for output in callback["outputs"]:
+            if output in callback["allow_duplicate"]:
+                continue
+            if output in claimed:
+                errors.append(f"Line {callback['line']}: Output('{output[0]}', '{output[1]}') is already "
+                              f"updated by callback '{claimed[output]}'")
+            else:
+                claimed[output] = callback["name"]
+
+    cycle = _find_cycle(callbacks)
+    if cycle:
+        errors.append(f"Callbacks depend on each other in a cycle: {' -> '.join(cycle)}")
+
+    reads, created = collect_column_references(tree)
+    reads.extend(frame_attribute_columns(tree))
+    known = set(map(str, columns)) | created
+    missing = {}
+    for column, line in reads:
+        if column not in known:
+            missing.setdefault(column, line)
+    for column, line in missing.items():
+        errors.append(f"Line {line}: column '{column}' does not exist in the DataFrame")
+    return errors
+
+
+def verify_dashboard_code(code, columns):
+    """Check generated dashboard code locally, without an LLM.
+
+    Runs `validate_dashboard_code`, then checks the dashboard requirements:
+    a reset button wired to a callback, and every dropdown filter defaulting
+    to all of its options ('ALL', or every option value).
+
+    Args:
+        code (str): Generated dashboard code
+        columns (list): Columns of the DataFrame the dashboard runs on
+
+    Returns:
+        list: Findings as human-readable strings; empty if all checks pass
+    """
+    findings = validate_dashboard_code(code, columns)
+    tree, error = _parse(code)
+    if error:
+        return findings
+
+    components = collect_components(tree)
+    dependencies = collect_dependencies(tree)
+    input_ids = {component_id for kind, component_id, _, _ in dependencies if kind == "Input"}
+    reset_buttons = [cid for cid, ctype in components.items() if ctype == "Button" and "reset" in cid.lower()]
+    if not reset_buttons:
+        findings.append("There is no Reset Filters button (a Button whose id contains 'reset')")
+    elif not input_ids.intersection(reset_buttons):
+        findings.append(f"Reset button '{reset_buttons[0]}' is not an Input of any callback")
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and _call_name(node) == "Dropdown":
+            component_id = _string(_keyword(node, "id")) or "dropdown"
+            if _is_empty(_keyword(node, "value")):
+                findings.append(f"Line {node.lineno}: filter '{component_id}' has no default value; it should select all by default")
+            elif not _selects_all(node):
+                findings.append(f"Line {node.lineno}: filter '{component_id}' defaults to "
+                                f"{ast.unparse(_keyword(node, 'value'))}; it should select all by default (e.g. value=['ALL'])")
+
+    logging.info(f"Local dashboard check: {len(findings)} finding(s)")
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate generated Dash dashboards without running them")
+    parser.add_argument("files", nargs="+", help="Dashboard files to validate")
+    parser.add_argument("--data", default=STAGED_DATA_PATH, help="CSV whose header is the schema")
+    args = parser.parse_args()
+
+    columns = load_staged_columns(args.data)
+    for path in args.files:
+        with open(path, encoding="utf-8") as f:
+            code = f.read()
+        start = time.perf_counter()
+        errors = validate_dashboard_code(code, columns)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{path}: {len(errors)} error(s) in {elapsed_ms:.1f} ms")
+        for error in errors:
+            print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import ast
+import json
+import logging
+import re
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src import cancellation, rate_limiter
+from src.code_optimizer import extract_code
+from src.code_verifier import validate_dashboard_code
+
+DATA_PATH = "C:/Users/aditya/Desktop/2024/auto-dash/Staging_Data/engineered_data.csv"
+MAX_FILTERS = 3
+MAX_KPIS = 4
+N_CHARTS = 4
+# Categoricals with more distinct values than this make poor filters
+MAX_FILTER_CATEGORIES = 20
+
+# Each section is a function the LLM writes; the skeleton around them is built locally
+SECTIONS = {
+    "layout": ("build_layout(df)", """Return the complete app layout (an html.Div). It must contain exactly the
+components of the contract, with exactly these ids:
+- a dcc.Dropdown per filter (multi=True, options built from df[column].unique() with a
+  {"label": "Select All", "value": "ALL"} option first, and value=["ALL"])
+- a dcc.DatePickerRange with the contract's date_range id, if there is one, spanning the dates in df
+- an html.Button with the contract's reset_button id and the text "Reset Filters"
+- an html.Div per KPI card id (the KPI callbacks fill in their children)
+- a dcc.Graph per chart id
+Lay them out attractively: a title, the filters in a row, the KPI cards in a row, then the charts in a grid."""),
+    "kpis": ("register_kpi_callbacks(app, df)", """Register one @app.callback that fills the children of every KPI card id from the
+contract's inputs, in that order. Filter the data with filter_data(df, *inputs), which
+already applies the date range and the filters ("ALL" means no filter). Each card shows
+the KPI's column aggregated over the filtered data and its change against the same
+period 6 months earlier, when there is a date column."""),
+    "charts": ("register_chart_callbacks(app, df)", """Register one @app.callback per chart id that returns its figure (plotly.express) from
+the contract's inputs, in that order. Filter the data with filter_data(df, *inputs),
+which already applies the date range and the filters ("ALL" means no filter). Use a
+different, suitable chart type per chart, covering trends over time, breakdowns by the
+filter columns and distributions of the KPI columns."""),
+}
+
+_executor = ThreadPoolExecutor(max_workers=len(SECTIONS) * 2, thread_name_prefix="autodash-section")
+
+
+def _slug(name):
+    return re.sub(r"[^0-9a-zA-Z]+", "-", str(name)).strip("-").lower() or "column"
+
+
+def _is_date_column(series, sample_size=1000, min_parsed=0.8):
+    # A datetime column, or text in a column named with the word 'date' that mostly parses as dates
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    words = re.split(r"[^0-9a-z]+", re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", str(series.name)).lower())
+    if "date" not in words or pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return False
+    values = series.dropna()
+    values = values.sample(sample_size, random_state=0) if len(values) > sample_size else values
+    if values.empty:
+        return False
+    with warnings.catch_warnings():
+        # Mixed formats fall back to per-value parsing, which pandas warns about
+        warnings.simplefilter("ignore", UserWarning)
+        parsed = pd.to_datetime(values.astype(str), errors="coerce")
+    return parsed.notna().mean() >= min_parsed
+
+
+def build_contract(data):
+    """Decide the dashboard's columns and component ids up front, so sections can be written independently.
+
+    Args:
+        data (pd.DataFrame): Data the dashboard is built for
+
+    Returns:
+        dict: date_column, filters, kpis, charts, date_range and reset_button ids,
+            and the callback inputs every KPI and chart callback takes, in order
+    """
+    date_column = None
+    for col in data.columns:
+        if _is_date_column(data[col]):
+            date_column = col
+            break
+
+    filters = []
+    kpis = []
+    for col in data.columns:
+        series = data[col]
+        if col == date_column:
+            continue
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            if not str(col).lower().endswith("id") and len(kpis) < MAX_KPIS:
+                kpis.append({"id": f"kpi-{_slug(col)}", "column": col})
+        elif series.nunique() <= MAX_FILTER_CATEGORIES and len(filters) < MAX_FILTERS:
+            filters.append({"id": f"filter-{_slug(col)}", "column": col})
+
+    inputs = []
+    if date_column is not None:
+        inputs += [["date-range", "start_date"], ["date-range", "end_date"]]
+    inputs += [[f["id"], "value"] for f in filters]
+    return {
+        "date_column": date_column,
+        "date_range": "date-range" if date_column is not None else None,
+        "filters": filters,
+        "kpis": kpis,
+        "charts": [f"chart-{i}" for i in range(1, N_CHARTS + 1)],
+        "reset_button": "reset-button",
+        "inputs": inputs,
+    }
+
+
+def build_section_prompt(section, contract, columns):
+    """Build the prompt for one section of the dashboard."""
+    signature, task = SECTIONS[section]
+    return f"""
+You are an expert in creating dashboards using Dash. You are writing one part of a dashboard;
+other parts are written separately against the same contract.
+
+SECTION: {section}
+
+The DataFrame 'df' contains the following columns:
+{', '.join(map(str, columns))}
+
+Contract (JSON):
+{json.dumps(contract, indent=2, default=str)}
+
+Write only the function `def {signature}:`.
+{task}
+
+Available names: Dash, html, dcc, Input, Output, State, ctx, px, go, pd, dbc and filter_data.
+Do not define anything else, do not import anything and do not create the app.
+Respond with only the Python code of the function.
+"""
+
+
+def _section_function(code, name):
+    """Return the named top-level function's source from a section response, or None."""
+    try:
+        tree = ast.parse(extract_code(code))
+    except SyntaxError as e:
+        logging.warning(f"Section {name} has a syntax error at line {e.lineno}: {e.msg}")
+        return None
+    functions = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == name]
+    if not functions:
+        logging.warning(f"Section response does not define {name}")
+        return None
+    return ast.unparse(functions[0])
+
+
+def _filter_function(contract):
+    params = []
+    body = ["    dff = df"]
+    if contract["date_column"] is not None:
+        params += ["start_date", "end_date"]
+        column = repr(contract["date_column"])
+        body += [
+            "    if start_date and end_date:",
+            f"        dff = dff[(dff[{column}] >= start_date) & (dff[{column}] <= end_date)]",
+        ]
+    for i, item in enumerate(contract["filters"]):
+        params.append(f"selected_{i}")
+        body += [
+            f"    if selected_{i} and 'ALL' not in selected_{i}:",
+            f"        dff = dff[dff[{item['column']!r}].isin(selected_{i})]",
+        ]
+    body.append("    return dff")
+    return f"def filter_data(df, {', '.join(params)}):\n" + "\n".join(body) if params else "def filter_data(df):\n    return df"
+
+
+def _reset_function(contract):
+    outputs = [f"Output({f['id']!r}, 'value')" for f in contract["filters"]]
+    defaults = ["['ALL']"] * len(contract["filters"])
+    if contract["date_column"] is not None:
+        outputs += ["Output('date-range', 'start_date')", "Output('date-range', 'end_date')"]
+        column = repr(contract["date_column"])
+        defaults += [f"df[{column}].min()", f"df[{column}].max()"]
+    if not outputs:
+        return "def register_reset_callback(app, df):\n    pass"
+    return f"""def register_reset_callback(app, df):
+
+    @app.callback({', '.join(outputs)}, Input({contract['reset_button']!r}, 'n_clicks'), prevent_initial_call=True)
+    def reset_filters(n_clicks):
+        return {', '.join(defaults)}{',' if len(defaults) == 1 else ''}"""
+
+
+def stitch_sections(contract, sections):
+    """Assemble the dashboard from the generated section functions and the local skeleton.
+
+    Args:
+        contract (dict): Output of `build_contract`
+        sections (dict): Section name -> function source
+
+    Returns:
+        str: Complete dashboard code
+    """
+    date_setup = ""
+    if contract["date_column"] is not None:
+        column = repr(contract["date_column"])
+        date_setup = f"    df[{column}] = pd.to_datetime(df[{column}], errors='coerce')\n"
+    parts = [
+        "import os\n"
+        "from dash import Dash, html, dcc, callback, Output, Input, State, ctx\n"
+        "import plotly.express as px\n"
+        "import plotly.graph_objects as go\n"
+        "import pandas as pd\n"
+        "import dash_bootstrap_components as dbc",
+        _filter_function(contract),
+        sections["layout"],
+        sections["kpis"],
+        sections["charts"],
+        _reset_function(contract),
+        "def create_app(df):\n"
+        f"{date_setup}"
+        "    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])\n"
+        "    app.layout = build_layout(df)\n"
+        "    register_kpi_callbacks(app, df)\n"
+        "    register_chart_callbacks(app, df)\n"
+        "    register_reset_callback(app, df)\n"
+        "    return app",
+        "def main():\n"
+        f"    df_path = {DATA_PATH!r}\n"
+        "    df = pd.read_csv(df_path)\n"
+        "    app = create_app(df)\n"
+        "    app.run(debug=True)",
+        "if __name__ == '__main__':\n    main()",
+    ]
+    return "\n\n\n".join(parts) + "\n"
+
+
+def generate_sections(invoke, data):
+    """Generate the dashboard's sections concurrently and stitch them together.
+
+    Args:
+        invoke (callable): `invoke(prompt, stage)` returns the LLM response text
+        data (pd.DataFrame): Data the dashboard is built for
+
+    Returns:
+        str: Stitched dashboard code, or None if a section came back unusable
+            or the stitched code does not validate
+    """
+    contract = build_contract(data)
+    # Its own token, so the other sections can be stopped once one is unusable
+    token = cancellation.CancelToken(parent=cancellation.current_token.get())
+    futures = {
+        section: rate_limiter.submit(_executor, cancellation.run_with_token, token, invoke,
+                                     build_section_prompt(section, contract, data.columns), f"generation: {section}")
+        for section in SECTIONS
+    }
+    sections = {}
+    try:
+        for section, future in futures.items():
+            name = SECTIONS[section][0].split("(")[0]
+            function = _section_function(future.result(), name)
+            if function is None:
+                return None
+            sections[section] = function
+    finally:
+        if len(sections) < len(futures):
+            token.cancel()
+            for future in futures.values():
+                future.cancel()
+    code = stitch_sections(contract, sections)
+    errors = validate_dashboard_code(code, list(data.columns))
+    if errors:
+        logging.warning(f"Stitched dashboard has {len(errors)} error(s), e.g. {errors[0]}")
+        return None
+    logging.info(f"Stitched {len(sections)} dashboard sections")
+    return code
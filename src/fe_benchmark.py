@@ -0,0 +1,224 @@
+import argparse
+import logging
+import multiprocessing
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+from src.cancellation import join_process
+
+DEFAULT_SIZES = (10_000, 1_000_000, 10_000_000)
+# Fitted time ~ rows ** exponent; anything clearly above linear is rejected
+MAX_SCALING_EXPONENT = 1.2
+# Per-size wall clock limit; the benchmark stops at the first size that exceeds it
+SIZE_TIMEOUT_SECONDS = 120
+TARGET_ROWS = 50_000_000
+MAX_PROFILE_VALUES = 1000
+
+
+def profile_schema(data):
+    """Summarize each column so a synthetic frame can be built from it.
+
+    Args:
+        data (pd.DataFrame): The uploaded (cleaned) data
+
+    Returns:
+        dict: Column name -> profile with the column kind and value range/sample
+    """
+    profile = {}
+    for col in data.columns:
+        series = data[col]
+        values = series.dropna()
+        if values.empty:
+            profile[col] = {"kind": "empty"}
+        elif pd.api.types.is_bool_dtype(series):
+            profile[col] = {"kind": "bool", "p": float(values.mean())}
+        elif pd.api.types.is_integer_dtype(series):
+            profile[col] = {"kind": "int", "min": int(values.min()), "max": int(values.max())}
+        elif pd.api.types.is_numeric_dtype(series):
+            profile[col] = {"kind": "float", "min": float(values.min()), "max": float(values.max())}
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            profile[col] = {"kind": "datetime", "min": values.min().value, "max": values.max().value}
+        else:
+            sample = values.drop_duplicates()
+            if len(sample) > MAX_PROFILE_VALUES:
+                sample = sample.sample(MAX_PROFILE_VALUES, random_state=0)
+            profile[col] = {"kind": "object", "values": sample.tolist()}
+    return profile
+
+
+def synthesize_frame(profile, n_rows, seed=0):
+    """Build a synthetic DataFrame of `n_rows` rows matching a schema profile.
+
+    Args:
+        profile (dict): Output of `profile_schema`
+        n_rows (int): Number of rows to generate
+        seed (int): Random seed, so every run sees the same data
+
+    Returns:
+        pd.DataFrame: Synthetic data with the same columns and dtypes
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for col, spec in profile.items():
+        kind = spec["kind"]
+        if kind == "empty":
+            columns[col] = np.full(n_rows, np.nan)
+        elif kind == "bool":
+            columns[col] = rng.random(n_rows) < spec["p"]
+        elif kind == "int":
+            columns[col] = rng.integers(spec["min"], spec["max"] + 1, n_rows)
+        elif kind == "float":
+            columns[col] = rng.uniform(spec["min"], spec["max"], n_rows)
+        elif kind == "datetime":
+            columns[col] = pd.to_datetime(rng.integers(spec["min"], spec["max"] + 1, n_rows))
+        else:
+            values = np.empty(len(spec["values"]), dtype=object)
+            values[:] = spec["values"]
+            columns[col] = values[rng.integers(0, len(values), n_rows)]
+    return pd.DataFrame(columns)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _run_code(code, profile, n_rows, queue):
+    """Child process entry point: run `code` once on synthetic data and report back.
+
+    Peak memory is the growth of the child's max RSS over the synthetic frame.
+    Where `resource` is unavailable (Windows) it falls back to tracemalloc,
+    which slows object-heavy code down noticeably.
+    """
+    try:
+        frame = synthesize_frame(profile, n_rows)
+        namespace = {"df": frame, "pd": pd, "np": np}
+        compiled = compile(code, "<feature_code>", "exec")
+        if resource is None:
+            tracemalloc.start()
+        else:
+            baseline = _peak_rss_mb()
+        start = time.perf_counter()
+        exec(compiled, namespace)
+        elapsed = time.perf_counter() - start
+        if resource is None:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peak_mb = peak / 2**20
+        else:
+            peak_mb = _peak_rss_mb() - baseline
+        queue.put({"seconds": elapsed, "peak_mb": round(peak_mb, 1), "error": None})
+    except Exception as e:
+        queue.put({"seconds": None, "peak_mb": None, "error": str(e)})
+
+
+def fit_scaling(rows, seconds):
+    """Fit seconds = coefficient * rows ** exponent on a log-log scale.
+
+    Returns:
+        float: exponent
+        float: coefficient
+    """
+    exponent, intercept = np.polyfit(np.log(rows), np.log(seconds), 1)
+    return float(exponent), float(np.exp(intercept))
+
+
+def benchmark_feature_code(code, data, sizes=DEFAULT_SIZES, timeout=SIZE_TIMEOUT_SECONDS,
+                           max_exponent=MAX_SCALING_EXPONENT, target_rows=TARGET_ROWS):
+    """Run feature code on synthetic frames of growing size and decide if it scales.
+
+    Each size runs in its own process so runaway code can be killed and peak
+    memory is measured in isolation.
+
+    Args:
+        code (str): Feature-engineering code operating on `df`
+        data (pd.DataFrame): Data whose schema the synthetic frames mirror
+        sizes (tuple): Row counts to benchmark, in increasing order
+        timeout (float): Wall clock limit per size, in seconds
+        max_exponent (float): Largest accepted scaling exponent
+        target_rows (int): Row count to project the runtime for
+
+    Returns:
+        dict: Per-size timings, fitted curve, projection and the accept/reject decision
+    """
+    profile = profile_schema(data)
+    report = {"sizes": [], "exponent": None, "coefficient": None,
+              "projected_seconds": None, "accepted": False, "reason": None}
+
+    for n_rows in sizes:
+        logging.info(f"Benchmarking feature code on {n_rows:,} synthetic rows")
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_run_code, args=(code, profile, n_rows, queue))
+        process.start()
+        join_process(process, timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+            report["sizes"].append({"rows": n_rows, "seconds": None, "peak_mb": None,
+                                    "error": f"timed out after {timeout}s"})
+            report["reason"] = f"Timed out on {n_rows:,} rows"
+            break
+        result = queue.get() if not queue.empty() else {"seconds": None, "peak_mb": None,
+                                                         "error": f"exit code {process.exitcode}"}
+        report["sizes"].append({"rows": n_rows, **result})
+        logging.info(f"{n_rows:,} rows: {result}")
+        if result["error"]:
+            report["reason"] = f"Failed on {n_rows:,} rows: {result['error']}"
+            break
+
+    timed = [s for s in report["sizes"] if s["seconds"]]
+    if len(timed) >= 2:
+        exponent, coefficient = fit_scaling([s["rows"] for s in timed], [s["seconds"] for s in timed])
+        report["exponent"] = round(exponent, 3)
+        report["coefficient"] = coefficient
+        report["projected_seconds"] = round(coefficient * target_rows ** exponent, 2)
+        if exponent > max_exponent and report["reason"] is None:
+            report["reason"] = f"Super-linear scaling (exponent {exponent:.2f} > {max_exponent})"
+
+    if report["reason"] is None:
+        if len(timed) < 2:
+            report["reason"] = "Not enough successful runs to fit a scaling curve"
+        else:
+            report["accepted"] = True
+            report["reason"] = f"Scales with exponent {report['exponent']}"
+
+    log = logging.info if report["accepted"] else logging.warning
+    log(f"Feature code benchmark: {report['reason']}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feature-engineering code on synthetic data")
+    parser.add_argument("data", help="CSV whose schema the synthetic data should match")
+    parser.add_argument("--code", help="File with the feature code; generated fresh when omitted")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    args = parser.parse_args()
+
+    from src.data_loader import get_data, clean_data
+    data = clean_data(get_data(args.data))
+    if args.code:
+        with open(args.code, encoding="utf-8") as f:
+            code = f.read()
+    else:
+        from src.feature_eng import generate_feature_code
+        code = generate_feature_code(data)
+
+    report = benchmark_feature_code(code, data, sizes=args.sizes)
+    for size in report["sizes"]:
+        print(size)
+    print(f"Exponent: {report['exponent']}, projected {report['projected_seconds']}s at {TARGET_ROWS:,} rows")
+    print(("ACCEPTED: " if report["accepted"] else "REJECTED: ") + report["reason"])
+
+
+if __name__ == "__main__":
+    main()
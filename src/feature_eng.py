@@ -1,15 +1,16 @@
 import pandas as pd
 import numpy as np
 import logging
-from langchain_anthropic import ChatAnthropic
+import time
 
 from langchain_experimental.tools import PythonAstREPLTool
-from dotenv import load_dotenv
-import os
-
-# Load environment variables
-load_dotenv()
-os.environ["ANTHROPIC_API_KEY"] = os.getenv('ANTHROPIC_API_KEY')
+from src.code_optimizer import optimize_feature_code
+from src.fe_benchmark import benchmark_feature_code
+from src import cancellation, telemetry
+from src.llm_backend import get_llm
+from src.model_router import route
+from src.rate_limiter import llm_slot
+from src.stream_guard import stream_text
 def generate_llm_prompt(data):
     """Generate a prompt for the LLM based on the dataframe structure, including examples."""
     columns = ", ".join(data.columns)
@@ -44,33 +45,67 @@ def generate_llm_prompt(data):
     """
     return prompt
 
-def transform_data_with_llm(data):
-    """Use LLM to generate and execute data transformation code."""
-    llm = ChatAnthropic(
-                            model="claude-3-5-sonnet-20240620",
+def get_feature_llm():
+    """Return the (pooled) LLM used for feature engineering."""
+    return get_llm(
                             temperature=0,
                             max_tokens=4096,
                             timeout=None,
                             max_retries=2,
                         )
+
+def generate_feature_code(data, run_log=None):
+    """Ask the LLM for transformation code and vectorize it, without running it.
+
+    The call is recorded in the telemetry store and appended to `run_log`, if given.
+    """
+    llm = route("feature engineering", get_feature_llm())
     prompt = generate_llm_prompt(data)
     
+    start = time.time()
+    stats = {}
+    with llm_slot(llm, prompt) as slot:
+        code = stream_text(llm, prompt, stats)
+        slot["tokens"] = (stats.get("input_tokens") or 0) + (stats.get("output_tokens") or 0) or None
+    entry = telemetry.call_entry("feature engineering", llm, prompt, code, time.time() - start,
+                                 usage=stats, ttft=stats.get("ttft"))
+    telemetry.record(entry)
+    if run_log is not None:
+        run_log.append(entry)
+    logging.info("LLM generated transformation code")
+    
+    # Vectorize row-wise patterns and flag the rest before touching the data (the optimizer logs its findings)
+    code, _ = optimize_feature_code(code, n_rows=len(data))
+    return code
+
+def transform_data_with_llm(data, benchmark=False, run_log=None):
+    """Use LLM to generate and execute data transformation code.
+
+    When `benchmark` is set, the code is first run on scaled synthetic data and
+    rejected (the data is returned untouched) if it does not scale linearly.
+    """
+    report = None
     try:
-        response = llm.invoke(prompt)
-        code = response.content
-        logging.info("LLM generated transformation code")
+        code = generate_feature_code(data, run_log)
+        
+        if benchmark:
+            report = benchmark_feature_code(code, data)
+            if not report["accepted"]:
+                logging.warning(f"Feature code rejected before execution: {report['reason']}")
+                return data, None, report
         
+        cancellation.check()
         locals_dict = {"df": data.copy(), "pd": pd, "np": np}
         tool = PythonAstREPLTool(locals=locals_dict)
         result = tool.run(code)
         logging.info("Transformation code executed successfully")
         
-        return locals_dict["df"], code
+        return locals_dict["df"], code, report
     except Exception as e:
         logging.error(f"Error in data transformation: {str(e)}")
-        return data, None
+        return data, None, report
 
-def feature_engineering(data):
+def feature_engineering(data, benchmark=False, run_log=None):
     """Perform feature engineering on the data."""
-    transformed_data, generated_code = transform_data_with_llm(data)
-    return transformed_data, generated_code
\ No newline at end of file
+    transformed_data, generated_code, benchmark_report = transform_data_with_llm(data, benchmark=benchmark, run_log=run_log)
+    return transformed_data, generated_code, benchmark_report
\ No newline at end of file
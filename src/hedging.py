@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src import rate_limiter, telemetry
+from src.stream_guard import StreamCancelled
+
+# Off unless enabled per stage in JSON, e.g. LLM_HEDGING='{"generation": {"enabled": true, "percentile": 0.95}}'
+HEDGING_ENV = "LLM_HEDGING"
+DEFAULT_CONFIG = {
+    "enabled": False,
+    # Send the second request once the call outlasts this latency percentile of past calls
+    "percentile": 0.9,
+    # Deadline used until enough calls are recorded, and the lowest deadline allowed
+    "default_deadline": 45.0,
+    "min_deadline": 5.0,
+    # Cap on what hedge requests may cost per rolling day, in USD
+    "max_extra_cost_per_day": 1.0,
+}
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="autodash-hedge")
+
+
+def stage_config(stage):
+    """Hedging settings for a stage, with $LLM_HEDGING applied; None when hedging is off."""
+    config = dict(DEFAULT_CONFIG)
+    overrides = os.getenv(HEDGING_ENV)
+    if overrides:
+        try:
+            config.update(json.loads(overrides).get(stage, {}))
+        except (ValueError, AttributeError) as e:
+            logging.error(f"Ignoring invalid {HEDGING_ENV}: {str(e)}")
+    return config if config["enabled"] else None
+
+
+def hedge_stage(stage):
+    """Telemetry stage name under which a stage's hedge requests are recorded."""
+    return f"{stage} (hedge)"
+
+
+def deadline(stage, model, config):
+    """Seconds to wait for the first request before hedging, from recorded latencies."""
+    seconds = telemetry.latency_percentile(stage, model, config["percentile"])
+    if seconds is None:
+        return config["default_deadline"]
+    return max(seconds, config["min_deadline"])
+
+
+def within_budget(stage, config):
+    """Return True if the stage's hedge requests of the last day cost less than the cap."""
+    spent = telemetry.stage_cost(hedge_stage(stage), time.time() - 86400)
+    if spent >= config["max_extra_cost_per_day"]:
+        logging.warning(f"Not hedging {stage}: ${spent:.2f} spent on hedges today")
+        return False
+    return True
+
+
+def run_hedged(run, hedge_after, validate=None, allow_hedge=None):
+    """Run a request, racing a second copy if the first is slow.
+
+    Args:
+        run (callable): `run(cancel_event, primary)` performs one request and
+            returns its result; it should stop early once `cancel_event` is set
+        hedge_after (float): Seconds to wait before sending the second request
+        validate (callable): Takes a result and returns True if it is usable;
+            the first usable result wins and the other request is cancelled
+        allow_hedge (callable): Checked before hedging, e.g. against a spend cap
+
+    Returns:
+        The winning result (the first to finish if neither is usable)
+        bool: True if the hedge request won
+
+    Raises:
+        Exception: The first request's error if both failed, else the
+            StreamCancelled of requests that were both cancelled
+    """
+    cancels = {}
+    primary_cancel = threading.Event()
+    primary = rate_limiter.submit(_executor, run, primary_cancel, True)
+    cancels[primary] = primary_cancel
+    done, _ = wait([primary], timeout=hedge_after)
+    if done or (allow_hedge is not None and not allow_hedge()):
+        return primary.result(), False
+
+    logging.info(f"No response after {hedge_after:.1f}s, sending a hedge request")
+    hedge_cancel = threading.Event()
+    hedge = rate_limiter.submit(_executor, run, hedge_cancel, False)
+    cancels[hedge] = hedge_cancel
+
+    pending = {primary, hedge}
+    fallback = None
+    error = None
+    cancelled = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except StreamCancelled as e:
+                cancelled = e
+                continue
+            except Exception as e:
+                error = error or e
+                continue
+            if validate is None or validate(result):
+                for other in pending:
+                    cancels[other].set()
+                    other.cancel()
+                logging.info(f"{'Hedge' if future is hedge else 'Primary'} request won")
+                return result, future is hedge
+            if fallback is None:
+                fallback = (result, future is hedge)
+    if fallback is not None:
+        return fallback
+    # Both requests failed, or were cancelled
+    raise error or cancelled
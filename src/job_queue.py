@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+
+DB_PATH = os.path.join(".cache", "jobs.db")
+POLL_INTERVAL_SECONDS = 0.5
+# Workers beat every HEARTBEAT_SECONDS while a job runs; a running job without a
+# beat for STALE_SECONDS belongs to a dead worker and is queued again
+HEARTBEAT_SECONDS = 10
+STALE_SECONDS = 60
+MAX_JOB_ATTEMPTS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+"""
+
+
+def _json_default(value):
+    # numpy scalars and the like
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def connect(db_path=DB_PATH):
+    """Open the queue database, creating it on first use."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def enqueue(kind, payload, db_path=DB_PATH):
+    """Add a job to the queue.
+
+    Args:
+        kind (str): Handler name the workers dispatch on
+        payload (dict): JSON-serializable job arguments
+
+    Returns:
+        str: Job id
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, payload, created, updated) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload, default=_json_default), now, now),
+        )
+    finally:
+        conn.close()
+    logging.info(f"Queued {kind} job {job_id}")
+    return job_id
+
+
+def claim(worker, db_path=DB_PATH, stale_seconds=STALE_SECONDS):
+    """Take the oldest queued job for `worker`, first requeueing jobs of dead workers.
+
+    Returns:
+        dict: The claimed job, or None if the queue is empty
+    """
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'worker died repeatedly', updated = ? "
+            "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+            (now, now - stale_seconds, MAX_JOB_ATTEMPTS),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, updated = ? WHERE status = 'running' AND heartbeat < ?",
+            (now, now - stale_seconds),
+        )
+        row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, heartbeat = ?, updated = ? "
+            "WHERE id = ?",
+            (worker, now, now, row["id"]),
+        )
+        job = _row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+        conn.execute("COMMIT")
+        return job
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _update(job_id, db_path, **fields):
+    fields["updated"] = time.time()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = connect(db_path)
+    try:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    finally:
+        conn.close()
+
+
+def set_progress(job_id, message, db_path=DB_PATH):
+    """Record a progress message for the UI to show."""
+    _update(job_id, db_path, progress=message)
+
+
+def beat(job_id, db_path=DB_PATH):
+    """Record that the worker running `job_id` is alive, however long its current stage takes.
+
+    Returns:
+        bool: True if the job is still running
+    """
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'running'",
+                              (time.time(), job_id))
+    finally:
+        conn.close()
+    return cursor.rowcount > 0
+
+
+def finish(job_id, result, db_path=DB_PATH):
+    """Mark a running job done with its JSON-serializable result.
+
+    A job cancelled while it ran stays cancelled.
+
+    Returns:
+        bool: True if the job was still running
+    """
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, updated = ? WHERE id = ? AND status = 'running'",
+            (json.dumps(result, default=_json_default), time.time(), job_id),
+        )
+    finally:
+        conn.close()
+    return cursor.rowcount > 0
+
+
+def fail(job_id, error, db_path=DB_PATH):
+    """Mark a job failed with an error message."""
+    _update(job_id, db_path, status="failed", error=str(error))
+
+
+def cancel(job_id, db_path=DB_PATH):
+    """Cancel a queued or running job; its worker stops it at the next check.
+
+    Returns:
+        bool: True if the job was still queued or running
+    """
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'cancelled', updated = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time(), job_id),
+        )
+    finally:
+        conn.close()
+    if cursor.rowcount:
+        logging.info(f"Cancelled job {job_id}")
+    return cursor.rowcount > 0
+
+
+def get_job(job_id, db_path=DB_PATH):
+    """Return a job as a dict, or None if it does not exist."""
+    conn = connect(db_path)
+    try:
+        return _row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def queue_position(job_id, db_path=DB_PATH):
+    """Number of queued jobs ahead of `job_id` (0 once it is running or finished)."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < "
+            "(SELECT created FROM jobs WHERE id = ? AND status = 'queued')",
+            (job_id,),
+        ).fetchone()
+        return row[0]
+    finally:
+        conn.close()
+
+
+def wait(job_id, on_poll=None, poll_interval=POLL_INTERVAL_SECONDS, timeout=None, db_path=DB_PATH):
+    """Poll a job until it is done, failed or cancelled.
+
+    Args:
+        job_id (str): Job to wait for
+        on_poll (callable): Called with the job dict on every poll, e.g. to show progress
+        poll_interval (float): Seconds between polls
+        timeout (float): Give up after this many seconds; None waits indefinitely
+
+    Returns:
+        dict: The finished (or failed or cancelled) job, or the latest state on timeout
+    """
+    start = time.time()
+    while True:
+        job = get_job(job_id, db_path)
+        if job is None:
+            raise KeyError(f"Unknown job {job_id}")
+        if on_poll is not None:
+            on_poll(job)
+        if job["status"] in ("done", "failed", "cancelled"):
+            return job
+        if timeout is not None and time.time() - start > timeout:
+            return job
+        time.sleep(poll_interval)
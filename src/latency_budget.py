@@ -0,0 +1,93 @@
+import logging
+import os
+import time
+
+from src import telemetry
+
+# Seconds from upload to dashboard; 0 (the default) disables the budget
+BUDGET_ENV = "DASHBOARD_BUDGET_SECONDS"
+DEFAULT_BUDGET_SECONDS = 0.0
+# Latency percentile of past calls a stage is expected to take
+EXPECTED_PERCENTILE = 0.9
+# Expected seconds per stage until enough calls are recorded; together they fit a 60s budget,
+# so a stage is not skipped before its own calls have been recorded
+DEFAULT_STAGE_SECONDS = {
+    "feature engineering": 15.0,
+    "generation": 30.0,
+    "correction (patch)": 10.0,
+}
+# Larger data is profiled on a sample when the budget is at risk
+PROFILE_SAMPLE_ROWS = 50_000
+
+# Degradations, as shown to the user
+SKIPPED_FEATURE_ENGINEERING = "skipped feature engineering"
+SAMPLED_PROFILE = f"profiled a {PROFILE_SAMPLE_ROWS:,}-row sample of the data"
+KEPT_DRAFT = "kept the dashboard drafted before feature engineering, without the new columns"
+CACHED_DASHBOARD = "reused a cached dashboard for the data before feature engineering"
+SKIPPED_CORRECTION = "skipped the correction pass"
+
+
+def default_budget_seconds():
+    """Budget from $DASHBOARD_BUDGET_SECONDS, or DEFAULT_BUDGET_SECONDS."""
+    return float(os.getenv(BUDGET_ENV, DEFAULT_BUDGET_SECONDS))
+
+
+def expected_seconds(stage):
+    """Seconds a stage is expected to take, from recorded calls of any model."""
+    seconds = telemetry.latency_percentile(stage, None, EXPECTED_PERCENTILE)
+    return DEFAULT_STAGE_SECONDS.get(stage, 0.0) if seconds is None else seconds
+
+
+class LatencyBudget:
+    """Time-to-dashboard budget of one run, and the optional work dropped to meet it.
+
+    Before each optional step the pipeline asks whether the step, plus the
+    stages that must still follow it, fits in the time left; if not, the step
+    is skipped (or replaced by something cheaper) and the degradation recorded
+    for the UI.
+    """
+
+    def __init__(self, seconds=None, start=None):
+        self.seconds = default_budget_seconds() if seconds is None else seconds
+        self.start = time.time() if start is None else start
+        self.degradations = []
+
+    def remaining(self):
+        """Seconds left, or None for an unlimited budget."""
+        if not self.seconds:
+            return None
+        return self.seconds - (time.time() - self.start)
+
+    def fits(self, *stages):
+        """Return True if the stages are expected to finish within the time left."""
+        remaining = self.remaining()
+        return remaining is None or sum(expected_seconds(stage) for stage in stages) <= remaining
+
+    def allow(self, degradation, *stages):
+        """Return True if the stages fit; otherwise record `degradation` and return False.
+
+        Args:
+            degradation (str): What is given up if they do not, shown to the user
+            *stages: The optional stage followed by the stages that must still run
+        """
+        if self.fits(*stages):
+            return True
+        self.degrade(degradation)
+        return False
+
+    def degrade(self, degradation):
+        """Record a degradation applied to stay within the budget."""
+        if degradation not in self.degradations:
+            self.degradations.append(degradation)
+            remaining = self.remaining()
+            if remaining is None:
+                logging.warning(f"Latency budget: {degradation}")
+            else:
+                logging.warning(f"Latency budget: {degradation} ({remaining:.1f}s of {self.seconds:.0f}s left)")
+
+    def profile_data(self, data):
+        """Data to profile for the prompt: a fixed sample of large data when the budget is at risk."""
+        if len(data) <= PROFILE_SAMPLE_ROWS or self.fits("generation", "correction (patch)"):
+            return data
+        self.degrade(SAMPLED_PROFILE)
+        return data.sample(PROFILE_SAMPLE_ROWS, random_state=0)
@@ -0,0 +1,367 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Select the provider with LLM_BACKEND and optionally the model with LLM_MODEL
+BACKEND_ENV = "LLM_BACKEND"
+MODEL_ENV = "LLM_MODEL"
+DEFAULT_BACKEND = "anthropic"
+DEFAULT_MODELS = {
+    "anthropic": "claude-3-5-sonnet-20240620",
+    "gemini": "gemini-1.5-pro",
+    "stub": "stub",
+}
+# Cheaper, lower-latency model per backend, for stages the model router may downgrade
+FAST_MODELS = {
+    "anthropic": "claude-3-haiku-20240307",
+    "gemini": "gemini-1.5-flash",
+    "stub": "stub-fast",
+}
+# Most output tokens the fast models accept; a caller's larger max_tokens is lowered to this
+FAST_MAX_TOKENS = {
+    "anthropic": 4096,
+    "gemini": 8192,
+}
+# Stub settings: total simulated latency in seconds and a directory of canned responses
+STUB_LATENCY_ENV = "LLM_STUB_LATENCY"
+STUB_DIR_ENV = "LLM_STUB_DIR"
+STUB_CHUNK_CHARS = 40
+# Point the Anthropic backend at another server, e.g. `python -m src.stub_server`
+BASE_URL_ENV = "LLM_BASE_URL"
+WARM_UP_TIMEOUT_SECONDS = 5
+# Anthropic prompt caching: shorter prefixes are not cached, and entries expire after five minutes unused
+MIN_CACHEABLE_TOKENS = 1024
+PROMPT_CACHE_TTL_SECONDS = 300
+
+# One client per backend, model and parameters for the whole process, so connections are reused
+_pool = {}
+_pool_lock = threading.Lock()
+# Simulated prompt cache of the stub: (model, prefix hash) -> expiry; like the real one, shared by all clients of a model
+_stub_prompt_cache = {}
+_stub_prompt_cache_lock = threading.Lock()
+
+
+def get_llm(backend=None, model=None, **params):
+    """Return the chat model every LLM call site uses.
+
+    Clients are pooled process-wide: every session asking for the same
+    backend, model and parameters shares one client and its keep-alive
+    connections.
+
+    Args:
+        backend (str): 'anthropic', 'gemini' or 'stub'; defaults to $LLM_BACKEND, then anthropic
+        model (str): Model name; defaults to $LLM_MODEL, then the backend's default
+        **params: Model parameters such as temperature, max_tokens and max_retries
+
+    Returns:
+        A LangChain-compatible chat model with `invoke` and `stream`
+    """
+    backend = backend or os.getenv(BACKEND_ENV, DEFAULT_BACKEND)
+    if backend not in DEFAULT_MODELS:
+        raise ValueError(f"Unknown LLM backend '{backend}', expected one of {', '.join(DEFAULT_MODELS)}")
+    model = model or os.getenv(MODEL_ENV) or DEFAULT_MODELS[backend]
+
+    key = (backend, model, json.dumps(params, sort_keys=True, default=str))
+    with _pool_lock:
+        llm = _pool.get(key)
+        if llm is None:
+            llm = _create_llm(backend, model, params)
+            _pool[key] = llm
+    return llm
+
+
+def pooled_config(llm):
+    """Return the backend, model and parameters a pooled client was created with, or None if it is not pooled."""
+    with _pool_lock:
+        for (backend, model, params), pooled in _pool.items():
+            if pooled is llm:
+                return backend, model, json.loads(params)
+    return None
+
+
+def _create_llm(backend, model, params):
+    if backend == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+        if os.getenv(BASE_URL_ENV):
+            params = {"base_url": os.environ[BASE_URL_ENV], **params}
+        return ChatAnthropic(model=model, **params)
+    if backend == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        if not os.getenv("GOOGLE_API_KEY") and os.getenv("GEMINI_API_KEY"):
+            os.environ["GOOGLE_API_KEY"] = os.environ["GEMINI_API_KEY"]
+        return ChatGoogleGenerativeAI(model=model, **params)
+    return StubLLM(model=model, **params)
+
+
+def warm_up(llm):
+    """Open the client's connection (TCP and TLS) ahead of its first real call.
+
+    Sends a HEAD request through the SDK's own HTTP client, which costs no
+    tokens and leaves the connection in its keep-alive pool. Clients without
+    an HTTP connection pool we can reach are left alone.
+
+    Returns:
+        bool: True if a connection was opened
+    """
+    sdk_client = getattr(llm, "_client", None)
+    http_client = getattr(sdk_client, "_client", None)
+    if http_client is None or not hasattr(http_client, "head"):
+        return False
+    start = time.time()
+    try:
+        http_client.head(str(sdk_client.base_url), timeout=WARM_UP_TIMEOUT_SECONDS)
+    except Exception as e:
+        logging.warning(f"Could not warm up the LLM connection: {str(e)}")
+        return False
+    logging.info(f"Warmed up the LLM connection in {time.time() - start:.2f}s")
+    return True
+
+
+def supports_prompt_caching(llm):
+    """Return True if the client honours `cache_control` markers (Anthropic, and the stub that imitates it)."""
+    if isinstance(llm, StubLLM):
+        return True
+    pooled = pooled_config(llm)
+    return pooled is not None and pooled[0] == "anthropic"
+
+
+def cacheable_text(text):
+    """Content blocks for `text` that mark the prompt up to its end as a cacheable prefix."""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+class StubMessage:
+    """Minimal stand-in for a LangChain AI message (or message chunk)."""
+
+    def __init__(self, content, usage_metadata=None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+
+def _prompt_text(prompt):
+    if isinstance(prompt, str):
+        return prompt
+    # A list of messages (or (role, content) tuples)
+    parts = []
+    for message in prompt:
+        content = message[1] if isinstance(message, tuple) else getattr(message, "content", message)
+        if isinstance(content, list):
+            content = "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+def _estimate_tokens(text):
+    return len(re.findall(r"\w{1,4}|[^\w\s]", text))
+
+
+def _cache_breakpoints(prompt):
+    """(hash, tokens) of every prompt prefix ending at a block marked with `cache_control`."""
+    if isinstance(prompt, str):
+        return []
+    prefix = hashlib.sha256()
+    tokens = 0
+    breakpoints = []
+    for message in prompt:
+        role, content = message if isinstance(message, tuple) else (getattr(message, "type", ""), getattr(message, "content", message))
+        for block in content if isinstance(content, list) else [content]:
+            text = block.get("text", "") if isinstance(block, dict) else str(block)
+            prefix.update(f"\n{role}: {text}".encode("utf-8"))
+            tokens += _estimate_tokens(text)
+            if isinstance(block, dict) and block.get("cache_control"):
+                breakpoints.append((prefix.copy().hexdigest(), tokens))
+    return breakpoints
+
+
+def prompt_columns(prompt):
+    """Recover (column, dtype) pairs from one of our prompts; dtype is None when not listed."""
+    listing = re.search(r"respective data types:\s*\n(.*?)(?:\n\s*\n|$)", prompt, re.DOTALL)
+    if listing:
+        pairs = re.findall(r"^\s*-\s*([^:\n]+):\s*(\S+)\s*$", listing.group(1), re.MULTILINE)
+        if pairs:
+            return [(name.strip(), dtype) for name, dtype in pairs]
+    names = re.search(r"(?:contains the following columns|with the following columns):\s*\n?\s*(.+)", prompt)
+    if names:
+        return [(name.strip(), None) for name in names.group(1).split(",") if name.strip()]
+    return []
+
+
+def _stub_feature_code(columns):
+    lines = []
+    names = [name for name, _ in columns]
+    for name in names:
+        if "date" in name.lower():
+            lines.append(f"if pd.api.types.is_datetime64_any_dtype(df['{name}']):")
+            lines.append(f"    df['{name}_year'] = df['{name}'].dt.year")
+            lines.append(f"    df['{name}_month'] = df['{name}'].dt.month")
+    if "first_name" in names and "last_name" in names:
+        lines.append("df['full_name'] = df['first_name'] + ' ' + df['last_name']")
+    return "```python\n" + ("\n".join(lines) or "pass") + "\n```"
+
+
+def _stub_dashboard_code(columns):
+    numeric = [n for n, d in columns if d and re.match(r"(int|float)", d)]
+    categorical = [n for n, d in columns if n not in numeric and (d is None or "date" not in d)]
+    category = categorical[0] if categorical else columns[0][0]
+    measure = numeric[0] if numeric else None
+    y = f", y='{measure}'" if measure else ""
+    return f"""import os
+from dash import Dash, html, dcc, callback, Output, Input, ctx
+import plotly.express as px
+import pandas as pd
+
+def create_app(df):
+    app = Dash(__name__)
+    options = [{{'label': 'Select All', 'value': 'ALL'}}] + [{{'label': str(v), 'value': v}} for v in df['{category}'].unique()]
+
+    app.layout = html.Div([
+        html.H1('Dashboard'),
+        dcc.Dropdown(id='category-filter', options=options, value=['ALL'], multi=True),
+        html.Button('Reset Filters', id='reset-button', n_clicks=0),
+        dcc.Graph(id='chart1'),
+    ])
+
+    @callback(Output('category-filter', 'value'), Input('reset-button', 'n_clicks'))
+    def reset_filters(n_clicks):
+        return ['ALL']
+
+    @callback(Output('chart1', 'figure'), Input('category-filter', 'value'))
+    def update_dashboard(selected):
+        dff = df if not selected or 'ALL' in selected else df[df['{category}'].isin(selected)]
+        return px.histogram(dff, x='{category}'{y})
+
+    return app
+
+def main():
+    df_path = "C:/Users/aditya/Desktop/2024/auto-dash/Staging_Data/engineered_data.csv"
+    df = pd.read_csv(df_path)
+    app = create_app(df)
+    app.run(debug=True)
+
+if __name__ == '__main__':
+    main()
+"""
+
+
+def _stub_section_code(section, contract):
+    inputs = ", ".join(f"Input('{component_id}', '{prop}')" for component_id, prop in contract["inputs"])
+    if section == "layout":
+        components = [f"dcc.Dropdown(id='{f['id']}', options=[{{'label': 'Select All', 'value': 'ALL'}}] + "
+                      f"[{{'label': str(v), 'value': v}} for v in df['{f['column']}'].unique()], value=['ALL'], multi=True)"
+                      for f in contract["filters"]]
+        if contract["date_range"]:
+            column = contract["date_column"]
+            components.append(f"dcc.DatePickerRange(id='{contract['date_range']}', start_date=df['{column}'].min(), end_date=df['{column}'].max())")
+        components.append(f"html.Button('Reset Filters', id='{contract['reset_button']}', n_clicks=0)")
+        components += [f"html.Div(id='{kpi['id']}')" for kpi in contract["kpis"]]
+        components += [f"dcc.Graph(id='{chart}')" for chart in contract["charts"]]
+        body = ",\n        ".join(["html.H1('Dashboard')"] + components)
+        return f"def build_layout(df):\n    return html.Div([\n        {body},\n    ])\n"
+    if section == "kpis":
+        if not contract["kpis"]:
+            return "def register_kpi_callbacks(app, df):\n    pass\n"
+        outputs = ", ".join(f"Output('{kpi['id']}', 'children')" for kpi in contract["kpis"])
+        values = ", ".join(f"f\"{kpi['column']}: {{dff['{kpi['column']}'].sum():,.0f}}\"" for kpi in contract["kpis"])
+        return (f"def register_kpi_callbacks(app, df):\n\n    @app.callback({outputs}, {inputs})\n"
+                f"    def update_kpis(*inputs):\n        dff = filter_data(df, *inputs)\n        return [{values}]\n")
+    lines = ["def register_chart_callbacks(app, df):"]
+    x = contract["filters"][0]["column"] if contract["filters"] else (contract["date_column"] or contract["kpis"][0]["column"])
+    for i, chart in enumerate(contract["charts"]):
+        lines += ["", f"    @app.callback(Output('{chart}', 'figure'), {inputs})",
+                  f"    def update_chart_{i}(*inputs):",
+                  "        dff = filter_data(df, *inputs)",
+                  f"        return px.histogram(dff, x='{x}')"]
+    return "\n".join(lines) + "\n"
+
+
+class StubLLM:
+    """Deterministic offline chat model for benchmarking the rest of the pipeline.
+
+    Returns a canned response from $LLM_STUB_DIR (a file named after the first
+    16 hex digits of the prompt's SHA-256, with a .txt suffix) when one exists,
+    otherwise code derived from the columns named in the prompt. Every call
+    takes `latency` seconds, spread over the stream when streaming.
+    """
+
+    def __init__(self, model="stub", temperature=0, max_tokens=None, latency=None, responses_dir=None, **params):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.latency = float(os.getenv(STUB_LATENCY_ENV, "0")) if latency is None else latency
+        self.responses_dir = responses_dir or os.getenv(STUB_DIR_ENV)
+        self.params = params
+
+    def respond(self, prompt):
+        """Return the stub's response text for a prompt, without any latency."""
+        text = _prompt_text(prompt)
+        if self.responses_dir:
+            name = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16] + ".txt"
+            path = os.path.join(self.responses_dir, name)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return f.read()
+        section = re.search(r"^SECTION: (\w+)$", text, re.MULTILINE)
+        contract = re.search(r"Contract \(JSON\):\n(.*?)\n\nWrite only", text, re.DOTALL)
+        if section and contract:
+            return _stub_section_code(section.group(1), json.loads(contract.group(1)))
+        columns = prompt_columns(text)
+        if "feature engineering" in text:
+            return _stub_feature_code(columns)
+        if not columns:
+            return "pass"
+        return _stub_dashboard_code(columns)
+
+    def cache_usage(self, prompt):
+        """Simulate Anthropic prompt caching for a prompt.
+
+        Returns:
+            int: Input tokens read from the cache (the longest cached prefix)
+            int: Input tokens written to the cache (up to the last breakpoint)
+        """
+        now = time.time()
+        breakpoints = [(key, tokens) for key, tokens in _cache_breakpoints(prompt) if tokens >= MIN_CACHEABLE_TOKENS]
+        read = 0
+        with _stub_prompt_cache_lock:
+            for expired in [key for key, expiry in _stub_prompt_cache.items() if expiry <= now]:
+                del _stub_prompt_cache[expired]
+            for key, tokens in breakpoints:
+                if _stub_prompt_cache.get((self.model, key), 0) > now:
+                    read = max(read, tokens)
+                _stub_prompt_cache[(self.model, key)] = now + PROMPT_CACHE_TTL_SECONDS
+        written = max(0, breakpoints[-1][1] - read) if breakpoints else 0
+        return read, written
+
+    def _usage(self, prompt, content):
+        input_tokens = _estimate_tokens(_prompt_text(prompt))
+        output_tokens = _estimate_tokens(content)
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                 "total_tokens": input_tokens + output_tokens}
+        read, written = self.cache_usage(prompt)
+        if read or written:
+            # As in LangChain, input_tokens includes the cached tokens
+            usage["input_token_details"] = {"cache_read": read, "cache_creation": written}
+        return usage
+
+    def invoke(self, prompt, **kwargs):
+        content = self.respond(prompt)
+        time.sleep(self.latency)
+        return StubMessage(content, self._usage(prompt, content))
+
+    def stream(self, prompt, **kwargs):
+        content = self.respond(prompt)
+        chunks = [content[i:i + STUB_CHUNK_CHARS] for i in range(0, len(content), STUB_CHUNK_CHARS)] or [""]
+        # A quarter of the latency before the first token, the rest spread over the chunks
+        time.sleep(self.latency / 4)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(self.latency * 3 / 4 / len(chunks))
+            usage = self._usage(prompt, content) if i == len(chunks) - 1 else None
+            yield StubMessage(chunk, usage)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+CACHE_DIR = os.path.join(".cache", "llm")
+MAX_CACHE_BYTES = 200 * 2**20
+MAX_AGE_SECONDS = 30 * 24 * 3600
+# Sampling parameters that change the output, and so belong in the key
+KEY_PARAMS = ("temperature", "max_tokens", "top_p", "top_k", "stop")
+
+
+def model_signature(llm):
+    """Return the model name and output-affecting parameters of a chat model.
+
+    Returns:
+        str: Model name
+        dict: Parameters that are set on the model
+    """
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+    params = {}
+    for name in KEY_PARAMS:
+        value = getattr(llm, name, None)
+        if value is not None:
+            params[name] = value
+    return str(model), params
+
+
+def cache_key(model, params, prompt):
+    """Content address of an LLM call: model, parameters and a hash of the prompt (text or messages)."""
+    text = prompt if isinstance(prompt, str) else json.dumps(prompt, sort_keys=True, default=str)
+    prompt_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    payload = json.dumps({"model": model, "params": params, "prompt": prompt_hash}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def request_key(llm, prompt):
+    """Cache key for calling `llm` with `prompt`."""
+    model, params = model_signature(llm)
+    return cache_key(model, params, prompt)
+
+
+def _path(key, cache_dir):
+    return os.path.join(cache_dir, key[:2], f"{key}.json")
+
+
+def get(key, cache_dir=CACHE_DIR, max_age=MAX_AGE_SECONDS):
+    """Look up a cached response, refreshing its LRU timestamp on a hit.
+
+    Returns:
+        str: Cached response content, or None on a miss
+    """
+    path = _path(key, cache_dir)
+    try:
+        if time.time() - os.path.getmtime(path) > max_age:
+            os.remove(path)
+            return None
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(path)
+        return entry["content"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def put(key, content, model=None, cache_dir=CACHE_DIR):
+    """Store a response under `key` and evict old entries if the cache is over its limits."""
+    path = _path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"model": model, "created": time.time(), "content": content}, f)
+    os.replace(tmp_path, path)
+    evict(cache_dir)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, max_age=MAX_AGE_SECONDS):
+    """Remove entries older than `max_age`, then least recently used ones until under `max_bytes`.
+
+    Returns:
+        int: Number of entries removed
+    """
+    now = time.time()
+    entries = []
+    removed = 0
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime > max_age:
+                    os.remove(path)
+                    removed += 1
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+            total -= size
+        except OSError:
+            continue
+    if removed:
+        logging.info(f"Evicted {removed} LLM cache entries")
+    return removed
+
+
+def lookup(llm, prompt):
+    """Return the cached response for this model and prompt, or None.
+
+    Only calls at temperature 0 are cached, since others are not repeatable.
+    """
+    model, params = model_signature(llm)
+    if params.get("temperature") != 0:
+        return None
+    key = cache_key(model, params, prompt)
+    content = get(key)
+    if content is not None:
+        logging.info(f"LLM cache hit for {model} ({key[:12]})")
+    return content
+
+
+def store(llm, prompt, content):
+    """Cache a response for this model and prompt, if the call is deterministic."""
+    model, params = model_signature(llm)
+    if params.get("temperature") != 0:
+        return
+    try:
+        put(cache_key(model, params, prompt), content, model=model)
+    except OSError as e:
+        logging.error(f"Could not write LLM cache entry: {str(e)}")
+
@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import random
+import time
+
+from src import telemetry
+from src.llm_backend import FAST_MAX_TOKENS, FAST_MODELS, get_llm, pooled_config
+
+# JSON overrides per stage, e.g. LLM_ROUTING='{"generation": {"enabled": true, "latency_budget": 20}, "feature engineering": {"enabled": false}}'
+ROUTING_ENV = "LLM_ROUTING"
+DEFAULT_CONFIG = {
+    "enabled": False,
+    # Tiers in order of preference: "strong" is the caller's model, "fast" the backend's FAST_MODELS entry
+    "tiers": ["strong", "fast"],
+    # A tier is used while this latency percentile of its recent calls, and its mean cost, are within budget
+    "percentile": 0.9,
+    "latency_budget": 60.0,
+    "cost_budget": 0.10,
+    # Share of calls sent to the preferred tier anyway when it is over budget, so its statistics stay current
+    "explore": 0.05,
+    # Model parameters for the stage, on top of the caller's
+    "params": {},
+}
+STAGE_CONFIG = {
+    # Opt-in: the fast model writes noticeably worse dashboards, so generation stays on the caller's model by default
+    "generation": {"enabled": False, "cost_budget": 0.15},
+    # Edits are short. Only corrections that start a new conversation are routed: one continuing the
+    # generation's conversation stays on its model, whose prompt is already in the provider's cache
+    "correction (patch)": {"enabled": True, "tiers": ["strong", "fast"], "latency_budget": 15.0,
+                           "cost_budget": 0.03, "params": {"max_tokens": 2048}},
+    "feature engineering": {"enabled": True, "tiers": ["fast", "strong"], "latency_budget": 15.0,
+                            "cost_budget": 0.02, "params": {"max_tokens": 2048}},
+}
+
+
+def stage_config(stage):
+    """Routing settings for a stage, with $LLM_ROUTING applied; None when routing is off.
+
+    Section stages such as 'generation: layout' use the settings of 'generation'.
+    """
+    base = stage.split(":")[0]
+    config = {**DEFAULT_CONFIG, **STAGE_CONFIG.get(stage, STAGE_CONFIG.get(base, {}))}
+    overrides = os.getenv(ROUTING_ENV)
+    if overrides:
+        try:
+            overrides = json.loads(overrides)
+            config.update(overrides.get(base, {}))
+            config.update(overrides.get(stage, {}) if stage != base else {})
+        except (ValueError, AttributeError) as e:
+            logging.error(f"Ignoring invalid {ROUTING_ENV}: {str(e)}")
+    return config if config["enabled"] else None
+
+
+def choose_model(stage, candidates, config):
+    """Pick a model for a stage from recorded latency and cost.
+
+    The first candidate whose latency percentile and mean cost are within the
+    stage's budgets wins; a model without enough recorded calls counts as
+    within budget. If none is, the fastest is used.
+
+    Args:
+        stage (str): Telemetry stage name
+        candidates (list): Model names in order of preference
+        config (dict): Output of `stage_config`
+
+    Returns:
+        dict: Routing decision with the fields in telemetry.ROUTE_COLUMNS
+    """
+    stats = [(model, telemetry.latency_percentile(stage, model, config["percentile"]), telemetry.mean_cost(stage, model))
+             for model in candidates]
+    for i, (model, latency, cost) in enumerate(stats):
+        if (latency is None or latency <= config["latency_budget"]) and (cost is None or cost <= config["cost_budget"]):
+            reason = "preferred" if i == 0 else "preferred tier over budget"
+            break
+    else:
+        model, latency, cost = min(stats, key=lambda item: float("inf") if item[1] is None else item[1])
+        reason = "all over budget, fastest"
+    if model != candidates[0] and random.random() < config["explore"]:
+        model, latency, cost = stats[0]
+        reason = "exploring preferred"
+    return {"ts": time.time(), "stage": stage, "model": model, "reason": reason, "latency": latency, "cost": cost}
+
+
+def route(stage, llm):
+    """Return the client to use for a stage's call, given the caller's client.
+
+    The caller's model is the 'strong' tier; the other candidates keep its
+    backend and parameters. Every decision is logged and recorded in the
+    telemetry store, next to the calls that show how it turned out. Clients
+    not created through `get_llm`, and stages without routing, are returned
+    unchanged.
+
+    Args:
+        stage (str): Telemetry stage name of the call
+        llm: Chat model the caller would use
+
+    Returns:
+        A pooled chat model
+    """
+    config = stage_config(stage)
+    if config is None:
+        return llm
+    pooled = pooled_config(llm)
+    if pooled is None:
+        return llm
+    backend, strong_model, params = pooled
+    tiers = {"strong": strong_model, "fast": FAST_MODELS[backend]}
+    candidates = []
+    for tier in config["tiers"]:
+        if tiers[tier] not in candidates:
+            candidates.append(tiers[tier])
+
+    decision = choose_model(stage, candidates, config)
+    telemetry.record_route(decision)
+    logging.info(f"Routing {stage} to {decision['model']} ({decision['reason']})")
+    params = {**params, **config["params"]}
+    limit = FAST_MAX_TOKENS.get(backend)
+    if decision["model"] == tiers["fast"] != strong_model and limit:
+        params["max_tokens"] = min(params.get("max_tokens") or limit, limit)
+    return get_llm(backend, decision["model"], **params)
@@ -0,0 +1,504 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.code_patch import EDIT_FORMAT, PatchError, apply_edits, parse_edits
+from src.code_verifier import validate_dashboard_code, verify_dashboard_code
+from src.dashboard_sections import generate_sections
+from src.feature_eng import get_feature_llm
+from src.llm_backend import cacheable_text, get_llm, supports_prompt_caching, warm_up
+from src.model_router import route
+from src import cancellation, hedging, latency_budget, rate_limiter, schema_index, single_flight, telemetry
+from src.llm_cache import lookup, model_signature, request_key, store
+from src.prompt_builder import prompt_generator
+from src.rate_limiter import llm_slot
+from src.stream_guard import stream_code, stream_text
+from src.telemetry import call_entry
+
+# Date parts extracted by feature engineering; the dashboard already filters on the source date
+DERIVED_SUFFIXES = ("_year", "_month", "_day", "_quarter", "_week", "_weekday", "_dayofweek", "_hour")
+# New categoricals with more distinct values than this are too granular for a filter or a chart
+MAX_FILTER_CATEGORIES = 20
+
+# Idle keep-alive connections are dropped after a few seconds, so warming up more often is wasted
+WARM_UP_INTERVAL_SECONDS = 4
+
+# Generation prompts kept for the correction to continue the conversation
+MAX_CONTEXTS = 32
+
+# Shared by all sessions; the LLM calls are network-bound so threads are enough
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="autodash-llm")
+_contexts = OrderedDict()
+_contexts_lock = threading.Lock()
+_last_warm_up = [0.0]
+
+
+def get_dashboard_llm():
+    """Create the LLM used for dashboard generation and correction."""
+    return get_llm(
+        temperature=0,
+        max_tokens=8192,
+        max_retries=2,
+    )
+
+
+def prewarm_llm_clients():
+    """Create the pooled LLM clients and open their connections in the background.
+
+    Called on every script run, so the connections are being set up while an
+    upload is parsed; calls within WARM_UP_INTERVAL_SECONDS of the last are skipped.
+
+    Returns:
+        concurrent.futures.Future: Resolves to the number of connections opened, or None if skipped
+    """
+    now = time.time()
+    if now - _last_warm_up[0] < WARM_UP_INTERVAL_SECONDS:
+        return None
+    _last_warm_up[0] = now
+    return _executor.submit(lambda: sum(warm_up(llm) for llm in (get_dashboard_llm(), get_feature_llm())))
+
+
+def _used_tokens(stats):
+    tokens = (stats.get("input_tokens") or 0) + (stats.get("output_tokens") or 0)
+    return tokens or None
+
+
+def _stream_hedged(llm, prompt, stage, config, validate, on_update, stats, run_log):
+    # Both requests stream so the loser can be cancelled; only the first drives the live view
+    hedge_stats = {}
+    hedge_started = []
+    primary_started = []
+
+    def run(cancel_event, primary):
+        with llm_slot(llm, prompt) as slot:
+            (primary_started if primary else hedge_started).append(time.time())
+            run_stats = stats if primary else hedge_stats
+            result = stream_code(llm, prompt, on_update=on_update if primary else None,
+                                 stats=run_stats, cancel_event=cancel_event)
+            slot["tokens"] = _used_tokens(run_stats)
+        return result
+
+    model, _ = model_signature(llm)
+    (content, attempts), hedge_won = hedging.run_hedged(
+        run,
+        hedging.deadline(stage, model, config),
+        validate=(lambda result: validate(result[0])) if validate else None,
+        # A call still waiting for a limiter slot is slow because of load; hedging would add to it
+        allow_hedge=lambda: bool(primary_started) and hedging.within_budget(stage, config),
+    )
+    if hedge_started:
+        entry = call_entry(hedging.hedge_stage(stage), llm, prompt, content if hedge_won else "",
+                           time.time() - hedge_started[0], usage=hedge_stats, ttft=hedge_stats.get("ttft"))
+        telemetry.record(entry)
+        if run_log is not None:
+            run_log.append(entry)
+    if hedge_won and on_update is not None:
+        on_update(content)
+    return content, attempts
+
+
+def _invoke(llm, prompt, stage, run_log=None, on_update=None, validate=None, routed=True):
+    """Invoke the LLM through the response cache and record the call in `run_log`.
+
+    Identical requests already in flight in another session are joined
+    instead of sent again. Responses are streamed so a superseded run's calls
+    stop as soon as it is cancelled. With `on_update`, the response is streamed and
+    checked as it arrives, and `on_update` receives the text so far. Every
+    call is also recorded in the telemetry store. For stages with hedging
+    enabled, a slow call is raced against a second request and the first
+    response passing `validate` wins. Unless `routed` is False, the model may
+    be swapped for the stage by the model router.
+    """
+    start = time.time()
+    if routed:
+        llm = route(stage, llm)
+    attempts = 0
+    shared = False
+    stats = {}
+    content = lookup(llm, prompt)
+    cache_hit = content is not None
+    if cache_hit:
+        if on_update is not None:
+            on_update(content)
+    else:
+        def call():
+            hedging_config = hedging.stage_config(stage)
+            if hedging_config is not None:
+                return _stream_hedged(llm, prompt, stage, hedging_config, validate, on_update, stats, run_log)
+            with llm_slot(llm, prompt) as slot:
+                if on_update is None:
+                    result = stream_text(llm, prompt, stats), 1
+                else:
+                    result = stream_code(llm, prompt, on_update=on_update, stats=stats)
+                slot["tokens"] = _used_tokens(stats)
+            return result
+
+        while True:
+            cancellation.check()
+            try:
+                (content, attempts), shared = single_flight.do(request_key(llm, prompt), call)
+                break
+            except cancellation.Cancelled:
+                # Another session's run was cancelled while we shared its call; ours goes on
+                if cancellation.is_cancelled():
+                    raise
+        if shared:
+            attempts = 0
+            if on_update is not None:
+                on_update(content)
+        else:
+            store(llm, prompt, content)
+    entry = call_entry(stage, llm, prompt, content, time.time() - start, usage=stats, ttft=stats.get("ttft"),
+                       attempts=attempts, cache_hit=cache_hit, coalesced=shared)
+    telemetry.record(entry)
+    if run_log is not None:
+        run_log.append(entry)
+    return content
+
+
+def _remember_context(dashboard_code, prompt, columns, llm):
+    with _contexts_lock:
+        _contexts[dashboard_code] = (prompt, list(columns), llm)
+        _contexts.move_to_end(dashboard_code)
+        while len(_contexts) > MAX_CONTEXTS:
+            _contexts.popitem(last=False)
+
+
+def _generation_context(dashboard_code):
+    """Return the prompt, columns and model the code was generated with, or None if they are not known."""
+    with _contexts_lock:
+        return _contexts.get(dashboard_code)
+
+
+def reuse_stored_dashboard(data, run_log=None, on_update=None):
+    """Adapt a stored dashboard whose schema is close to the data's, without an LLM call.
+
+    Returns:
+        str: The adapted dashboard code, or None if no stored dashboard is similar enough
+    """
+    start = time.time()
+    try:
+        reused = schema_index.find_reusable_dashboard(data)
+    except Exception as e:
+        logging.error(f"Could not search the stored dashboards: {str(e)}")
+        return None
+    if reused is None:
+        return None
+    if run_log is not None:
+        run_log.append({"stage": "schema reuse", "seconds": round(time.time() - start, 2), "cache_hit": True,
+                        "attempts": 0, "coalesced": False, "source": reused["path"],
+                        "similarity": round(reused["similarity"], 2)})
+    if on_update is not None:
+        on_update(reused["code"])
+    return reused["code"]
+
+
+def generation_messages(llm, dashboard_prompt):
+    """The request sent for a one-call generation, which is also its response cache key."""
+    # Marked cacheable so a correction continuing this conversation reads the prompt from the provider's cache
+    return [("user", cacheable_text(dashboard_prompt))] if supports_prompt_caching(llm) else dashboard_prompt
+
+
+def lookup_generation(llm, data):
+    """Return the cached one-call generation for the data, or None, without calling the LLM."""
+    llm = route("generation", llm)
+    return lookup(llm, generation_messages(llm, prompt_generator(data)))
+
+
+def generate_dashboard_code(llm, data, run_log=None, on_update=None, sectioned=False, budget=None):
+    """Generate Dash code for the given data.
+
+    A stored dashboard whose schema is similar enough is adapted to the
+    data's column names instead; see `schema_index`.
+
+    Args:
+        llm: Chat model to invoke
+        data (pd.DataFrame): Data the dashboard is built for
+        run_log (list): Collects one timing entry per LLM call, if given
+        on_update (callable): Streams the partial code to this callback, if given
+        sectioned (bool): Generate the layout, KPIs and charts concurrently and
+            stitch them, falling back to one call if a section is unusable or
+            the stitched code does not validate
+        budget (LatencyBudget): Profiles a sample of large data when the budget is at risk
+
+    Returns:
+        str: Generated dashboard code
+    """
+    dashboard_code = reuse_stored_dashboard(data, run_log, on_update)
+    if dashboard_code is not None:
+        return dashboard_code
+
+    profile = data if budget is None else budget.profile_data(data)
+    if sectioned:
+        dashboard_code = generate_sections(lambda prompt, stage: _invoke(llm, prompt, stage, run_log), profile)
+        if dashboard_code is not None:
+            if on_update is not None:
+                on_update(dashboard_code)
+            return dashboard_code
+        logging.warning("The sectioned dashboard was unusable, generating the dashboard in one call")
+
+    dashboard_prompt = prompt_generator(profile)
+    generation_llm = route("generation", llm)
+    dashboard_code = _invoke(generation_llm, generation_messages(llm, dashboard_prompt), "generation", run_log, on_update,
+                             validate=lambda code: not validate_dashboard_code(code, list(data.columns)), routed=False)
+    _remember_context(dashboard_code, dashboard_prompt, data.columns, generation_llm)
+    logging.info("Dashboard code generated")
+    return dashboard_code
+
+
+def build_correction_prompt(columns, dashboard_code, findings):
+    """Build the prompt asking the LLM to fix the problems found by the local check."""
+    problems = "\n".join(f"- {finding}" for finding in findings)
+    return f"""
+                        Fix the following problems in this Python code for a Dash dashboard:
+                        {problems}
+
+                        The code should work with a pandas DataFrame named 'df' that contains the following columns:
+                        {', '.join(map(str, columns))}
+
+                        Here's the code to fix:
+
+                        {dashboard_code}
+
+                        Provide ONLY the corrected version of the entire code.
+                        Do not include any explanations, comments, or anything other than the Python code itself.
+                        """
+
+
+def build_patch_prompt(columns, dashboard_code, findings):
+    """Build the prompt asking the LLM for search/replace edits that fix the findings."""
+    problems = "\n".join(f"- {finding}" for finding in findings)
+    return f"""
+Fix the following problems in this Python code for a Dash dashboard:
+{problems}
+
+The code works with a pandas DataFrame named 'df' that contains the following columns:
+{', '.join(map(str, columns))}
+
+Here's the code to fix:
+
+{dashboard_code}
+
+Do not repeat the whole code. Reply with only the edits needed, each in this format:
+
+{EDIT_FORMAT}
+
+Each SEARCH block must match a few consecutive lines of the code exactly, including indentation, and only once.
+"""
+
+
+def _columns_note(columns):
+    if columns is None:
+        return ""
+    return f"\nThe DataFrame 'df' now contains the following columns:\n{', '.join(map(str, columns))}\n"
+
+
+def build_patch_followup(findings, columns=None):
+    """Build the follow-up turn asking for search/replace edits to the code generated earlier in the conversation.
+
+    Args:
+        findings (list): Problems found by the local check
+        columns: The data's columns, if they differ from those in the generation prompt
+    """
+    problems = "\n".join(f"- {finding}" for finding in findings)
+    return f"""
+Fix the following problems in the code you wrote:
+{problems}
+{_columns_note(columns)}
+Do not repeat the whole code. Reply with only the edits needed, each in this format:
+
+{EDIT_FORMAT}
+
+Each SEARCH block must match a few consecutive lines of the code exactly, including indentation, and only once.
+"""
+
+
+def build_correction_followup(findings, columns=None):
+    """Build the follow-up turn asking for the whole corrected code generated earlier in the conversation."""
+    problems = "\n".join(f"- {finding}" for finding in findings)
+    return f"""
+Fix the following problems in the code you wrote:
+{problems}
+{_columns_note(columns)}
+Provide ONLY the corrected version of the entire code.
+Do not include any explanations, comments, or anything other than the Python code itself.
+"""
+
+
+def correct_dashboard_code(llm, data, dashboard_code, run_log=None, on_update=None, budget=None):
+    """Run the correction pass over generated dashboard code, if it needs one.
+
+    The code is verified locally first; the LLM is only asked for a correction
+    when that check fails, and only about the concrete findings. The LLM
+    replies with edits that are applied locally, so the response is as long
+    as the fix rather than the dashboard; if the edits do not apply or the
+    patched code still fails the local check, the full corrected code is
+    requested instead.
+
+    When the code was generated in this process by a client with prompt
+    caching, the correction continues that conversation: the generation
+    prompt and the code are sent as cacheable earlier turns, so they are read
+    from the provider's cache instead of being paid for again as fresh input.
+    Such a correction stays on the model that generated the code, since the
+    provider's cache is per model.
+
+    Args:
+        llm: Chat model to invoke
+        data (pd.DataFrame): Data the dashboard is built for
+        dashboard_code (str): Code from the generation step
+        run_log (list): Collects one timing entry per LLM call, if given
+        on_update (callable): Streams the partial code to this callback, if given
+        budget (LatencyBudget): The correction is skipped if it no longer fits
+
+    Returns:
+        str: Corrected dashboard code (unchanged if the correction was skipped)
+        list: Findings of the local check that triggered the correction
+    """
+    start = time.time()
+    findings = verify_dashboard_code(dashboard_code, data.columns)
+    if not findings:
+        logging.info("Local check passed, skipping the correction pass")
+        if run_log is not None:
+            run_log.append({"stage": "verification", "seconds": round(time.time() - start, 2),
+                            "cache_hit": False, "attempts": 0, "coalesced": False})
+        return dashboard_code, findings
+    if budget is not None and not budget.allow(latency_budget.SKIPPED_CORRECTION, "correction (patch)"):
+        return dashboard_code, findings
+
+    context = _generation_context(dashboard_code) if supports_prompt_caching(llm) else None
+    if context is not None:
+        generation_prompt, generation_columns, llm = context
+        history = [("user", cacheable_text(generation_prompt)), ("assistant", cacheable_text(dashboard_code))]
+        columns = None if generation_columns == list(data.columns) else data.columns
+        patch_prompt = [*history, ("user", build_patch_followup(findings, columns))]
+        correction_prompt = [*history, ("user", build_correction_followup(findings, columns))]
+    else:
+        patch_prompt = build_patch_prompt(data.columns, dashboard_code, findings)
+        correction_prompt = build_correction_prompt(data.columns, dashboard_code, findings)
+
+    response = _invoke(llm, patch_prompt, "correction (patch)", run_log, routed=context is None)
+    try:
+        corrected_code = apply_edits(dashboard_code, parse_edits(response))
+        # Edits can fix one finding and break something else, so the patched code is checked again
+        remaining = verify_dashboard_code(corrected_code, data.columns)
+        if remaining:
+            raise PatchError(f"patched code still fails the local check: {remaining[0]}")
+        if on_update is not None:
+            on_update(corrected_code)
+        logging.info(f"Dashboard code patched for {len(findings)} finding(s)")
+        return corrected_code, findings
+    except PatchError as e:
+        logging.warning(f"Could not apply the correction edits, requesting the full code: {str(e)}")
+
+    corrected_code = _invoke(llm, correction_prompt, "correction", run_log, on_update, routed=context is None)
+    logging.info(f"Dashboard code corrected for {len(findings)} finding(s)")
+    return corrected_code, findings
+
+
+def start_speculative_generation(llm, cleaned_data, run_log=None, sectioned=False, budget=None):
+    """Start generating the dashboard for the cleaned data in the background.
+
+    Used while feature engineering runs, so both LLM round trips overlap.
+    The draft runs under its own cancellation token, a child of the run's,
+    so `cancel_speculative_generation` can stop it while the run goes on.
+
+    Returns:
+        concurrent.futures.Future: Resolves to the generated dashboard code
+    """
+    logging.info("Starting speculative dashboard generation on the cleaned schema")
+    token = cancellation.CancelToken(parent=cancellation.current_token.get())
+    future = rate_limiter.submit(_executor, cancellation.run_with_token, token, generate_dashboard_code, llm, cleaned_data,
+                                 run_log, sectioned=sectioned, budget=budget)
+    future.cancel_token = token
+    return future
+
+
+def cancel_speculative_generation(future):
+    """Stop a speculative draft that is no longer wanted, whether it is still queued or already running.
+
+    Future.cancel() alone cannot stop a running task, which would keep its
+    limiter slot and finish a paid LLM call nobody reads.
+    """
+    future.cancel()
+    future.cancel_token.cancel()
+
+
+def new_columns_needed(base_data, engineered_data):
+    """List the engineered columns a dashboard would actually make use of.
+
+    Derived date parts and high-cardinality text (e.g. concatenated names) are
+    not worth regenerating the dashboard for; new numeric measures and
+    low-cardinality categoricals are.
+
+    Args:
+        base_data (pd.DataFrame): Data before feature engineering
+        engineered_data (pd.DataFrame): Data after feature engineering
+
+    Returns:
+        list: Names of the new columns that should appear in the dashboard
+    """
+    needed = []
+    for col in engineered_data.columns:
+        if col in base_data.columns or str(col).lower().endswith(DERIVED_SUFFIXES):
+            continue
+        series = engineered_data[col]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            needed.append(col)
+        elif series.nunique() <= MAX_FILTER_CATEGORIES:
+            needed.append(col)
+    return needed
+
+
+def resolve_dashboard_code(llm, engineered_data, base_data=None, speculative_future=None, run_log=None, on_update=None,
+                           sectioned=False, budget=None):
+    """Return dashboard code for the engineered data, reusing a speculative draft when possible.
+
+    When a fresh generation no longer fits the latency budget, the draft is
+    kept even though it lacks the new columns, or else a cached dashboard for
+    the data before feature engineering is used, if there is one.
+
+    Args:
+        llm: Chat model to invoke
+        engineered_data (pd.DataFrame): Final data the dashboard is built for
+        base_data (pd.DataFrame): Data the speculative draft was generated for
+        speculative_future (Future): Result of `start_speculative_generation`, if any
+        run_log (list): Collects one timing entry per LLM call, if given
+        on_update (callable): Streams the partial code of a fresh generation to this callback
+        sectioned (bool): Generate a fresh dashboard in concurrent sections
+        budget (LatencyBudget): Time-to-dashboard budget of the run, if any
+
+    Returns:
+        str: Generated dashboard code
+        bool: True if the speculative draft was reused
+    """
+    out_of_time = budget is not None and not budget.fits("generation", "correction (patch)")
+    if speculative_future is not None:
+        needed = new_columns_needed(base_data, engineered_data)
+        if not needed:
+            try:
+                code = speculative_future.result()
+                logging.info("Reusing speculative dashboard; no new columns needed")
+                return code, True
+            except Exception as e:
+                logging.error(f"Speculative generation failed, regenerating: {str(e)}")
+        elif out_of_time:
+            try:
+                # The draft started earlier, so it is done sooner than a new generation
+                code = speculative_future.result()
+                budget.degrade(latency_budget.KEPT_DRAFT)
+                return code, True
+            except Exception as e:
+                logging.error(f"Speculative generation failed, regenerating: {str(e)}")
+        else:
+            logging.info(f"Regenerating dashboard for new columns: {', '.join(map(str, needed))}")
+            cancel_speculative_generation(speculative_future)
+    elif out_of_time and base_data is not None and base_data is not engineered_data:
+        code = lookup_generation(llm, budget.profile_data(base_data))
+        if code is not None:
+            budget.degrade(latency_budget.CACHED_DASHBOARD)
+            return code, False
+    return generate_dashboard_code(llm, engineered_data, run_log, on_update, sectioned=sectioned, budget=budget), False
@@ -0,0 +1,61 @@
+import argparse
+import os
+import statistics
+import time
+
+import pandas as pd
+
+from src.code_verifier import validate_dashboard_code
+from src.data_loader import get_data, clean_data
+from src.llm_backend import get_llm
+from src.pipeline import correct_dashboard_code, generate_dashboard_code
+from src.schema_index import DISABLE_ENV
+
+
+def run_once(data_path, llm):
+    """Run load, clean, generation, correction and validation once.
+
+    Returns:
+        dict: Stage name -> seconds
+    """
+    timings = {}
+    start = time.perf_counter()
+    data = get_data(data_path)
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaned_data = clean_data(data)
+    timings["clean"] = time.perf_counter() - start
+
+    run_log = []
+    start = time.perf_counter()
+    dashboard_code = generate_dashboard_code(llm, cleaned_data, run_log)
+    corrected_code, findings = correct_dashboard_code(llm, cleaned_data, dashboard_code, run_log)
+    timings["llm stages"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validate_dashboard_code(corrected_code, list(cleaned_data.columns))
+    timings["validation"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline against the stub LLM backend")
+    parser.add_argument("data", help="CSV file to build dashboards for")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    args = parser.parse_args()
+
+    # Stored dashboards would let later runs skip generation or change the prompt's example
+    os.environ[DISABLE_ENV] = "1"
+    # No temperature, so the response cache stays out of the measurement
+    llm = get_llm(backend="stub", temperature=None, latency=args.latency)
+    runs = [run_once(args.data, llm) for _ in range(args.runs)]
+
+    summary = pd.DataFrame(runs)
+    print(summary.describe(percentiles=[0.5, 0.95]).T[["mean", "50%", "95%", "max"]].round(4))
+    print(f"Median end to end: {statistics.median(summary.sum(axis=1)):.3f}s over {args.runs} runs")
+
+
+if __name__ == "__main__":
+    main()
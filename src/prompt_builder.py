@@ -1,14 +1,17 @@
+import logging
+import re
+import textwrap
 import pandas as pd
 import numpy as np
 
-def prompt_generator(DataFrame):
-    """Generate a prompt for modifying the existing Dash code based on the new dataset."""
-    data = DataFrame
-    column_names=data.columns
-    data_dtypes = data.dtypes
-    column_descriptions = "/n".join([f"- {col}: {dtype}" for col, dtype in data_dtypes.items()])
-    
-    prompt = f"""
+from src.schema_index import pinned_example
+
+# Prompts above this many (estimated) tokens get compressed step by step
+DEFAULT_TOKEN_BUDGET = 8000
+# Name groups (after masking digits or sharing a prefix) at least this large are collapsed
+MIN_GROUP_SIZE = 3
+
+INSTRUCTIONS = """
     You are an expert  in creating dashboards using Dash. 
     
     Task: Develop a Dash dashboard that provides business users with comprehensive insights from the data. The dashboard should include the following features:
@@ -19,12 +22,9 @@ def prompt_generator(DataFrame):
     4.Interactive Charts: Ensure that charts are interactive and can respond to each other, enabling dynamic data exploration.
     5.Note: The code will always load the dataset from the following path: df_path = "C:/Users/aditya/Desktop/2024/auto-dash/Staging_Data/engineered_data.csv"
     
-    6.While creating a chart make sure to pass x,y properly(check column_names)  {column_names}
-    New Dataset Information:
-   
-    The DataFrame contains the following columns and their respective data types:
-    {column_descriptions}
+"""
 
+EXAMPLE_DASHBOARD = """
     Example1-
 
     Input -
@@ -60,16 +60,16 @@ def prompt_generator(DataFrame):
         app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
         # Define color scheme for consistent styling
-        colors ={{
+        colors ={
         'background': '#F7F7F7',  # Light gray background
         'text': '#333333',        # Dark gray text
         'primary': '#3498DB',     # Bright blue for primary elements
         'secondary': '#2ECC71',   # Green for secondary elements (positive changes)
         'accent': '#F39C12',      # Orange for accents
         'negative': '#E74C3C'     # Red for negative changes (used sparingly)
-         }}
+         }
 
-        kpi_style ={{
+        kpi_style ={
                 'textAlign': 'center',
                 'padding': '15px',
                 'backgroundColor': 'white',
@@ -82,12 +82,12 @@ def prompt_generator(DataFrame):
                 'flexDirection': 'column',
                 'justifyContent': 'space-between',
                 'transition': 'all 0.3s ease'
-        }}
+        }
 
         # Update the dropdown options to include 'Select All'
-        country_options = [{{'label': 'Select All', 'value': 'ALL'}}] + [{{'label': i, 'value': i}} for i in df.country.unique()]
+        country_options = [{'label': 'Select All', 'value': 'ALL'}] + [{'label': i, 'value': i} for i in df.country.unique()]
 
-        filter_style = {{
+        filter_style = {
             'display': 'flex', 
             'justifyContent': 'space-between', 
             'alignItems': 'flex-end', 
@@ -97,49 +97,49 @@ def prompt_generator(DataFrame):
             'padding': '20px',
             'borderRadius': '10px',
             'boxShadow': '0 4px 15px rgba(0, 0, 0, 0.1)'
-        }}
+        }
 
         # Layout of the dashboard
         app.layout = dbc.Container([
             html.Div([
-                html.H1('Sales Dashboard', style={{
+                html.H1('Sales Dashboard', style={
                     'textAlign': 'center', 
                     'color': colors['text'], 
                     'marginBottom': '30px', 
                     'fontSize': '36px',
                     'fontWeight': '300',
                     'letterSpacing': '2px'
-                }}),
+                }),
                 
                 # Filter section
                 html.Div([
                     html.Div([
-                        html.Label('Country', style={{'fontWeight': 'bold', 'marginBottom': '5px', 'color': colors['text']}}),
+                        html.Label('Country', style={'fontWeight': 'bold', 'marginBottom': '5px', 'color': colors['text']}),
                         dcc.Dropdown(
                             id='dropdown-country',
-                            options=[{{'label': i, 'value': i}} for i in df.country.unique()],
+                            options=[{'label': i, 'value': i} for i in df.country.unique()],
                             value=['France'],  # Default value as a list
                             multi=True,  # Enable multi-select
-                            style={{'width': '300px'}}  # Increased width to accommodate multiple selections
+                            style={'width': '300px'}  # Increased width to accommodate multiple selections
                         )
-                    ], style={{'display': 'flex', 'flexDirection': 'column'}}),
+                    ], style={'display': 'flex', 'flexDirection': 'column'}),
                     html.Div([
-                        html.Label('Date Range', style={{'fontWeight': 'bold', 'marginBottom': '5px', 'color': colors['text']}}),
+                        html.Label('Date Range', style={'fontWeight': 'bold', 'marginBottom': '5px', 'color': colors['text']}),
                         dcc.DatePickerRange(
                             id='date-picker-range',
                             start_date=df['purchase_date'].min(),
                             end_date=df['purchase_date'].max(),
-                            style={{'width': '300px'}}
+                            style={'width': '300px'}
                         )
-                    ], style={{'display': 'flex', 'flexDirection': 'column'}}),
+                    ], style={'display': 'flex', 'flexDirection': 'column'}),
                     html.Div([
                         html.Button('Reset Filters', id='reset-button', n_clicks=0, 
-                                    style={{'padding': '10px 20px', 'backgroundColor': colors['accent'], 'color': 'white', 'border': 'none', 'borderRadius': '5px', 'cursor': 'pointer', 'transition': 'all 0.3s ease'}})
+                                    style={'padding': '10px 20px', 'backgroundColor': colors['accent'], 'color': 'white', 'border': 'none', 'borderRadius': '5px', 'cursor': 'pointer', 'transition': 'all 0.3s ease'})
                     ])
                 ], style=filter_style),
                 
                 # KPI indicators section
-                html.Div(id='kpi-indicators', style={{'margin': '30px 0'}}),
+                html.Div(id='kpi-indicators', style={'margin': '30px 0'}),
                 
                 # Charts section
                 dbc.Row([
@@ -152,11 +152,11 @@ def prompt_generator(DataFrame):
                     dbc.Col([dcc.Graph(id='age-distribution')], width=6),
                 ], className='mb-4'),
                 
-            ], style={{
+            ], style={
                 'fontFamily': '"Segoe UI", "Roboto", "Helvetica Neue", Arial, sans-serif',
                 'padding': '20px', 
                 'backgroundColor': colors['background']
-            }})
+            })
         ], fluid=True)
 
         #Callback function for updating the dashboard
@@ -234,25 +234,25 @@ def prompt_generator(DataFrame):
             orders_change = total_orders - past_total_orders
             
             #Function to create a KPI card
-            def create_kpi_card(title, value, change):
+            def create_kpi_card(title, current_value, previous_value):
                 change = current_value - previous_value
                 change_percentage = (change / previous_value) * 100 if previous_value != 0 else 0
                 return html.Div([
-                    html.H3(title, style={{'color': colors['text'], 'marginBottom': '10px', 'fontSize': '16px', 'fontWeight': '400', 'height': '20px'}}),
+                    html.H3(title, style={'color': colors['text'], 'marginBottom': '10px', 'fontSize': '16px', 'fontWeight': '400', 'height': '20px'}),
                     html.Div([
-                        html.Span(f'{{current_value:,.0f}}', style={{'fontSize': '24px', 'fontWeight': 'bold', 'color': colors['primary']}}),
-                    ], style={{'height': '30px'}}),
+                        html.Span(f'{current_value:,.0f}', style={'fontSize': '24px', 'fontWeight': 'bold', 'color': colors['primary']}),
+                    ], style={'height': '30px'}),
                     html.Div([
-                        html.Span(f'Previous: {{previous_value:,.0f}}', style={{'fontSize': '14px', 'color': colors['text']}}),
-                    ], style={{'height': '20px'}}),
+                        html.Span(f'Previous: {previous_value:,.0f}', style={'fontSize': '14px', 'color': colors['text']}),
+                    ], style={'height': '20px'}),
                     html.Div([
                         html.Div([
-                            html.Span(f'{{"▲" if change > 0 else "▼"}}', 
-                                    style={{'color': colors['secondary'] if change > 0 else colors['negative'], 'fontSize': '16px', 'marginRight': '5px'}}),
-                            html.Span(f'{{abs(change):,.0f}} ({{abs(change_percentage):.1f}}%)', 
-                                    style={{'color': colors['secondary'] if change > 0 else colors['negative'], 'fontSize': '14px'}})
-                        ], style={{'display': 'inline-block'}})
-                    ], style={{'display': 'flex', 'justifyContent': 'center', 'alignItems': 'center', 'height': '20px'}})
+                            html.Span(f'{"▲" if change > 0 else "▼"}', 
+                                    style={'color': colors['secondary'] if change > 0 else colors['negative'], 'fontSize': '16px', 'marginRight': '5px'}),
+                            html.Span(f'{abs(change):,.0f} ({abs(change_percentage):.1f}%)', 
+                                    style={'color': colors['secondary'] if change > 0 else colors['negative'], 'fontSize': '14px'})
+                        ], style={'display': 'inline-block'})
+                    ], style={'display': 'flex', 'justifyContent': 'center', 'alignItems': 'center', 'height': '20px'})
                 ], style=kpi_style)
             
             # In the update_dashboard function:
@@ -261,7 +261,7 @@ def prompt_generator(DataFrame):
                     create_kpi_card('Total Customers', total_customers, past_total_customers),
                     create_kpi_card('Avg Order Value', average_order_value, past_average_order_value),
                     create_kpi_card('Total Orders', total_orders, past_total_orders)
-            ], style={{'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'stretch', 'flexWrap': 'wrap'}})
+            ], style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'stretch', 'flexWrap': 'wrap'})
         
             
             # Function to update chart layout
@@ -293,23 +293,23 @@ def prompt_generator(DataFrame):
             time_series = px.line(dff.groupby('purchase_date')['purchase_amount'].sum().reset_index(), 
                               x='purchase_date', y='purchase_amount', 
                               title="Daily Sales Over Time",
-                              labels={{'purchase_date': 'Date', 'purchase_amount': 'Total Sales'}})
-            time_series.update_traces(mode='lines+markers', hovertemplate='Date: %{{x}}<br>Sales: $%{{y:,.2f}}')
+                              labels={'purchase_date': 'Date', 'purchase_amount': 'Total Sales'})
+            time_series.update_traces(mode='lines+markers', hovertemplate='Date: %{x}<br>Sales: $%{y:,.2f}')
             time_series = update_chart_layout(time_series)
             customer_purchase = px.bar(dff, x='customer_name', y='purchase_amount', title="Customer Purchase Analysis",
-                                       color_discrete_sequence=[colors['primary']], labels={{'customer_name': 'Customer Name', 'purchase_amount': 'Purchase Amount'}})
+                                       color_discrete_sequence=[colors['primary']], labels={'customer_name': 'Customer Name', 'purchase_amount': 'Purchase Amount'})
             customer_purchase = update_chart_layout(customer_purchase)
             
             product_sales = px.bar(dff, x='product_name', y='purchase_amount', title="Product Sales Analysis",
-                                   color_discrete_sequence=[colors['primary']], labels={{'product_name':'Product Name','purchase_amount':'Purchase amount'}})
+                                   color_discrete_sequence=[colors['primary']], labels={'product_name':'Product Name','purchase_amount':'Purchase amount'})
             product_sales = update_chart_layout(product_sales)
             
             sales_rep_performance = px.bar(dff, x='sales_representative', y='purchase_amount', title="Sales Representative Performance",
-                                           color_discrete_sequence=[colors['primary']], labels={{'sales_representative':'Sales Representative','purchase_amount':'Purchase Amount'}})
+                                           color_discrete_sequence=[colors['primary']], labels={'sales_representative':'Sales Representative','purchase_amount':'Purchase Amount'})
             sales_rep_performance = update_chart_layout(sales_rep_performance)
             
             age_distribution = px.histogram(dff, x='age', nbins=10, title="Customer Age Distribution",
-                                            color_discrete_sequence=[colors['primary']], labels={{'age':'Age'}})
+                                            color_discrete_sequence=[colors['primary']], labels={'age':'Age'})
             age_distribution = update_chart_layout(age_distribution)
             
             return kpi_indicators, customer_purchase, product_sales, sales_rep_performance, age_distribution    
@@ -324,7 +324,67 @@ def prompt_generator(DataFrame):
 
     if __name__ == '__main__':
         main()
+"""
+
+COMPACT_EXAMPLE = """
+    Example structure (adapt ids, columns and charts to the dataset):
+
+    import os
+    from dash import Dash, html, dcc, callback, Output, Input, ctx
+    import plotly.express as px
+    import pandas as pd
+    from datetime import datetime, timedelta
+    from dotenv import load_dotenv
+    import dash_bootstrap_components as dbc
+
+    load_dotenv()
+
+    def create_app(df):
+        df['date_column'] = pd.to_datetime(df['date_column'])
+        app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+        categories = sorted(df['category_column'].unique())
+
+        app.layout = dbc.Container([
+            html.H1('Dashboard Title'),
+            dbc.Row([
+                dbc.Col(dcc.Dropdown(id='category-filter', options=[{'label': 'Select All', 'value': 'ALL'}] + [{'label': c, 'value': c} for c in categories], value=['ALL'], multi=True)),
+                dbc.Col(dcc.DatePickerRange(id='date-filter', start_date=df['date_column'].min(), end_date=df['date_column'].max())),
+                dbc.Col(html.Button('Reset Filters', id='reset-button', n_clicks=0)),
+            ]),
+            html.Div(id='kpi-cards'),
+            dbc.Row([dbc.Col(dcc.Graph(id='chart1')), dbc.Col(dcc.Graph(id='chart2'))]),
+        ])
+
+        @callback(
+            [Output('category-filter', 'value'), Output('date-filter', 'start_date'), Output('date-filter', 'end_date')],
+            Input('reset-button', 'n_clicks'),
+        )
+        def reset_filters(n_clicks):
+            return ['ALL'], df['date_column'].min(), df['date_column'].max()
+
+        @callback(
+            [Output('kpi-cards', 'children'), Output('chart1', 'figure'), Output('chart2', 'figure')],
+            [Input('category-filter', 'value'), Input('date-filter', 'start_date'), Input('date-filter', 'end_date'),
+             Input('chart1', 'clickData')],
+        )
+        def update_dashboard(categories_selected, start_date, end_date, chart1_click):
+            # Filter (treat 'ALL' as every category), apply cross-filter from chart clicks,
+            # compute KPIs with the value 6 months earlier, and build the figures
+            ...
+
+        return app
+
+    def main():
+        df_path = "C:/Users/aditya/Desktop/2024/auto-dash/Staging_Data/engineered_data.csv"
+        df = pd.read_csv(df_path)
+        app = create_app(df)
+        app.run(debug=True)
+
+    if __name__ == '__main__':
+        main()
+"""
 
+OUTPUT_FORMAT = """
     Output should be only python code nothing else(No comments, No markdown,just pure code).
 
     Output format-
@@ -336,5 +396,205 @@ def prompt_generator(DataFrame):
     from dotenv import load_dotenv
     import dash_bootstrap_components as dbc
     and rest of the code ...
+"""
+
+
+def estimate_tokens(text):
+    """Estimate the token count of a prompt locally.
+
+    Words are counted in chunks of up to four characters and every symbol
+    counts as one token, which tracks BPE tokenizers closely enough for
+    budgeting without a network call.
+
+    Args:
+        text (str): Prompt text
+
+    Returns:
+        int: Estimated number of tokens
+    """
+    return len(re.findall(r"\w{1,4}|[^\w\s]", text))
+
+
+def low_value_columns(data):
+    """Find columns that add nothing to a dashboard.
+
+    Constant (or all 'NA') columns and row identifiers such as free-text
+    columns unique on every row are low value.
+
+    Args:
+        data (pd.DataFrame): The dataset
+
+    Returns:
+        list: Names of low-value columns
+    """
+    low_value = []
+    for col in data.columns:
+        series = data[col]
+        nunique = series.nunique()
+        if nunique <= 1:
+            low_value.append(col)
+        elif len(series) > 1 and nunique == len(series) and not (
+            pd.api.types.is_float_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+        ):
+            low_value.append(col)
+    return low_value
+
+
+def group_columns(columns_with_dtypes):
+    """Describe columns, collapsing runs of similarly named columns.
+
+    Names that only differ in their digits (`sales_2019`, `sales_2020`, ...) or
+    that share a prefix before the first underscore are listed once per dtype.
+
+    Args:
+        columns_with_dtypes (list): (column name, dtype) pairs
+
+    Returns:
+        str: Column description, one line per column or group
+    """
+    groups = {}
+    for col, dtype in columns_with_dtypes:
+        groups.setdefault((re.sub(r"\d+", "#", str(col)), str(dtype)), []).append(col)
+
+    singles = []
+    lines = []
+    for (pattern, dtype), cols in groups.items():
+        if len(cols) >= MIN_GROUP_SIZE:
+            lines.append(f"- {pattern}: {dtype} ({len(cols)} columns, # in {cols[0]} ... {cols[-1]})")
+        else:
+            singles.extend((col, dtype) for col in cols)
+
+    prefixes = {}
+    for col, dtype in singles:
+        prefixes.setdefault((str(col).split("_")[0], dtype), []).append(col)
+    for (prefix, dtype), cols in prefixes.items():
+        if len(cols) > MIN_GROUP_SIZE and prefix != str(cols[0]):
+            lines.append(f"- {prefix}_*: {dtype} ({len(cols)} columns: {', '.join(map(str, cols))})")
+        else:
+            lines.extend(f"- {col}: {dtype}" for col in cols)
+    return "\n".join(lines)
+
+
+def summarize_dtypes(data_dtypes):
+    """One-line count of columns per dtype, e.g. '12 x float64, 3 x object'."""
+    counts = data_dtypes.astype(str).value_counts()
+    return ", ".join(f"{count} x {dtype}" for dtype, count in counts.items())
+
+
+def retrieve_example(data):
+    """The stored dashboard for the most similar schema, or None to use EXAMPLE_DASHBOARD.
+
+    Pinned per schema, so the prompt for the same data does not change as dashboards are stored.
+    """
+    try:
+        return pinned_example(data)
+    except Exception as e:
+        logging.error(f"Could not retrieve an example dashboard: {str(e)}")
+        return None
+
+
+def render_example(example):
+    """Format a retrieved dashboard like EXAMPLE_DASHBOARD: its columns, then its code."""
+    columns = "\n".join(f"    - {col}: {kind}" for col, kind in example["schema"].items())
+    return f"""
+    Example1-
+
+    Input -
+
+{columns}
+
+    Assistant Response
+
+{textwrap.indent(example["code"].strip(), "    ")}
+"""
+
+
+def _render(data, raw_names, example, grouped, dropped, retrieved=None):
+    data_dtypes = data.dtypes.drop(dropped)
+    if grouped:
+        column_descriptions = group_columns(list(data_dtypes.items()))
+        column_descriptions += f"\n    Column types: {summarize_dtypes(data_dtypes)}"
+    else:
+        column_descriptions = "\n".join([f"- {col}: {dtype}" for col, dtype in data_dtypes.items()])
+    if dropped:
+        column_descriptions += f"\n    Ignore these low-value columns: {', '.join(map(str, dropped))}"
+
+    if raw_names:
+        check_names = f"{data.columns}"
+    else:
+        check_names = "listed below"
+
+    prompt = f"""{INSTRUCTIONS}    6.While creating a chart make sure to pass x,y properly(check column_names)  {check_names}
+    New Dataset Information:
+   
+    The DataFrame contains the following columns and their respective data types:
+    {column_descriptions}
+"""
+    if example == "full":
+        prompt += EXAMPLE_DASHBOARD if retrieved is None else render_example(retrieved)
+    elif example == "compact":
+        prompt += COMPACT_EXAMPLE
+    return prompt + OUTPUT_FORMAT
+
+
+def build_prompt(DataFrame, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Build the dashboard prompt, compressing it until it fits a token budget.
+
+    The full example is the stored dashboard, verified on real data, whose
+    schema is the most similar to the dataset's, falling back to
+    EXAMPLE_DASHBOARD when none is similar enough. The choice is pinned the first time a
+    schema is seen, so the prompt and the caches keyed on it stay stable.
+
+    Compression steps, applied in order only while the estimate is over budget:
+    drop the duplicated raw column list, swap the full example for a compact
+    skeleton, group similar column names and summarize dtypes, drop low-value
+    columns, and finally drop the example altogether.
+
+    Args:
+        DataFrame (pd.DataFrame): The dataset
+        token_budget (int): Maximum estimated prompt tokens, None for no limit
+
+    Returns:
+        str: The prompt
+        dict: Report with the estimated `tokens`, the `budget`, the compression
+            `steps` applied, the `dropped_columns` and the `example` used
+            (the retrieved dashboard's path, 'built-in', 'compact' or None)
     """
-    return prompt
\ No newline at end of file
+    data = DataFrame
+    retrieved = retrieve_example(data)
+    options = {"raw_names": True, "example": "full", "grouped": False, "dropped": [], "retrieved": retrieved}
+    ladder = [
+        ("deduplicate column list", lambda: options.update(raw_names=False)),
+        ("compact example", lambda: options.update(example="compact")),
+        ("group columns", lambda: options.update(grouped=True)),
+        ("drop low-value columns", lambda: options.update(dropped=low_value_columns(data))),
+        ("drop example", lambda: options.update(example=None)),
+    ]
+
+    prompt = _render(data, **options)
+    tokens = estimate_tokens(prompt)
+    steps = []
+    for step, apply in ladder:
+        if token_budget is None or tokens <= token_budget:
+            break
+        apply()
+        prompt = _render(data, **options)
+        tokens = estimate_tokens(prompt)
+        steps.append(step)
+
+    if token_budget is not None and tokens > token_budget:
+        logging.warning(f"Dashboard prompt still over budget after compression: {tokens} > {token_budget} tokens")
+    logging.info(f"Dashboard prompt: ~{tokens} tokens (budget {token_budget}), steps: {steps or 'none'}, "
+                 f"example: {retrieved['path'] if retrieved else 'built-in'}")
+    example = options["example"]
+    if example == "full":
+        example = retrieved["path"] if retrieved else "built-in"
+    report = {"tokens": tokens, "budget": token_budget, "steps": steps, "dropped_columns": options["dropped"],
+              "example": example}
+    return prompt, report
+
+
+def prompt_generator(DataFrame, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Generate a prompt for modifying the existing Dash code based on the new dataset."""
+    prompt, report = build_prompt(DataFrame, token_budget)
+    return prompt
@@ -0,0 +1,204 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from src.cancellation import Cancelled, is_cancelled
+from src.prompt_builder import estimate_tokens
+
+MAX_CONCURRENT_ENV = "LLM_MAX_CONCURRENT"
+TOKENS_PER_MINUTE_ENV = "LLM_TOKENS_PER_MINUTE"
+DEFAULT_MAX_CONCURRENT = 8
+# Input plus output tokens per minute across the process; 0 disables the token limit
+DEFAULT_TOKENS_PER_MINUTE = 200_000
+# Output reserved for a call whose model has no max_tokens; corrected once the usage is known
+DEFAULT_OUTPUT_TOKENS = 2048
+WAIT_POLL_SECONDS = 0.5
+
+# The session making the current call, and how to tell its user about the queue
+current_session = contextvars.ContextVar("llm_session", default="default")
+_wait_callback = contextvars.ContextVar("llm_wait_callback", default=None)
+
+
+def is_rate_limit_error(error):
+    """Return True if an exception from an LLM client is a 429 / rate limit error."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "ratelimit" in type(error).__name__.lower().replace("_", "") or "rate limit" in str(error).lower()
+
+
+class FairLimiter:
+    """Caps in-flight LLM calls and token throughput, serving sessions round-robin.
+
+    Each session's calls are served in order, but sessions take turns, so one
+    session with many queued calls cannot starve the others. The concurrency
+    limit backs off (halves) on rate limit errors and recovers additively on
+    successes, so overload slows requests down instead of multiplying retries.
+    """
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.max_concurrent = max_concurrent
+        self.limit = float(max_concurrent)
+        self.tokens_per_minute = tokens_per_minute
+        self._bucket = float(tokens_per_minute)
+        self._refilled = time.monotonic()
+        self._in_flight = 0
+        self._queues = {}
+        self._rotation = deque()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.tokens_per_minute:
+            self._bucket = min(self.tokens_per_minute,
+                               self._bucket + (now - self._refilled) * self.tokens_per_minute / 60)
+        self._refilled = now
+
+    def _can_start(self, tokens):
+        if self._in_flight >= max(1, int(self.limit)):
+            return False
+        if not self.tokens_per_minute:
+            return True
+        return self._bucket >= min(tokens, self.tokens_per_minute)
+
+    def _position(self, session, ticket):
+        # Calls served before this ticket when sessions take turns, starting with the front of the rotation
+        k = self._queues[session].index(ticket)
+        our_turn = self._rotation.index(session)
+        ahead = k
+        for i, other in enumerate(self._rotation):
+            if other != session:
+                ahead += min(len(self._queues[other]), k + 1 if i < our_turn else k)
+        return ahead
+
+    def position(self, session):
+        """Queue position of the session's oldest waiting call (0 = next), or None if it has none."""
+        with self._cond:
+            if session not in self._queues:
+                return None
+            return self._position(session, self._queues[session][0])
+
+    def acquire(self, session, tokens, on_wait=None):
+        """Wait for a slot for a call of about `tokens` tokens.
+
+        Args:
+            session (str): Session making the call
+            tokens (int): Estimated input plus output tokens
+            on_wait (callable): Called with the queue position while waiting,
+                then with None once the call may start
+        """
+        ticket = object()
+        waited = False
+        with self._cond:
+            self._queues.setdefault(session, deque()).append(ticket)
+            if session not in self._rotation:
+                self._rotation.append(session)
+            while True:
+                self._refill()
+                if self._rotation[0] == session and self._queues[session][0] is ticket and self._can_start(tokens):
+                    break
+                if is_cancelled():
+                    self._withdraw(session, ticket)
+                    raise Cancelled("Superseded while waiting for an LLM slot")
+                waited = True
+                if on_wait is not None:
+                    on_wait(self._position(session, ticket))
+                self._cond.wait(WAIT_POLL_SECONDS)
+
+            queue = self._queues[session]
+            queue.popleft()
+            self._rotation.popleft()
+            if queue:
+                self._rotation.append(session)
+            else:
+                del self._queues[session]
+            self._in_flight += 1
+            self._bucket -= tokens
+            self._cond.notify_all()
+        if waited and on_wait is not None:
+            on_wait(None)
+
+    def _withdraw(self, session, ticket):
+        queue = self._queues[session]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[session]
+            self._rotation.remove(session)
+        self._cond.notify_all()
+
+    def release(self, reserved_tokens, used_tokens, rate_limited=False):
+        """Free a slot, charging the actual token use and adapting the concurrency limit."""
+        with self._cond:
+            self._in_flight -= 1
+            self._bucket -= used_tokens - reserved_tokens
+            if rate_limited:
+                self.limit = max(1.0, self.limit / 2)
+                logging.warning(f"LLM rate limited, lowering concurrency to {int(self.limit)}")
+            else:
+                self.limit = min(float(self.max_concurrent), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the process-wide limiter, configured from the environment on first use."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = FairLimiter(
+                int(os.getenv(MAX_CONCURRENT_ENV, DEFAULT_MAX_CONCURRENT)),
+                int(os.getenv(TOKENS_PER_MINUTE_ENV, DEFAULT_TOKENS_PER_MINUTE)),
+            )
+        return _limiter
+
+
+def set_session(session_id, on_wait=None):
+    """Attribute the current thread's LLM calls to a session.
+
+    Args:
+        session_id (str): Session identifier, e.g. one stored in st.session_state
+        on_wait (callable): Shown the queue position (None when the wait is
+            over); only called from this thread, since other threads cannot
+            update the session's page
+    """
+    current_session.set(session_id)
+    _wait_callback.set((threading.get_ident(), on_wait) if on_wait else None)
+
+
+def submit(executor, fn, *args, **kwargs):
+    """Submit `fn` to an executor, keeping the caller's session for its LLM calls."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def reserve_tokens(llm, prompt):
+    """Tokens to reserve for a call: the prompt plus the most the model may answer."""
+    text = prompt if isinstance(prompt, str) else str(prompt)
+    return estimate_tokens(text) + (getattr(llm, "max_tokens", None) or DEFAULT_OUTPUT_TOKENS)
+
+
+@contextmanager
+def llm_slot(llm, prompt):
+    """Hold a limiter slot for one LLM call.
+
+    Yields a dict; set its 'tokens' to the actual input plus output tokens
+    once known, so the token budget is corrected.
+    """
+    limiter = get_limiter()
+    reserved = reserve_tokens(llm, prompt)
+    callback = _wait_callback.get()
+    on_wait = callback[1] if callback and callback[0] == threading.get_ident() else None
+    limiter.acquire(current_session.get(), reserved, on_wait)
+    usage = {"tokens": None}
+    rate_limited = False
+    try:
+        yield usage
+    except Exception as e:
+        rate_limited = is_rate_limit_error(e)
+        raise
+    finally:
+        limiter.release(reserved, usage["tokens"] if usage["tokens"] is not None else reserved, rate_limited)
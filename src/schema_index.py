@@ -0,0 +1,593 @@
+import argparse
+import ast
+import difflib
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import tokenize
+
+import numpy as np
+import pandas as pd
+
+from src.code_optimizer import extract_code
+from src.code_verifier import (FRAME_ATTRIBUTES, FRAME_NAME, IMPLICIT_COLUMNS, collect_column_references,
+                               frame_attribute_columns, verify_dashboard_code)
+
+CORPUS_DIR = "Generated_Dashboards"
+# Dashboards stored by the app, each with the schema of the data it was verified on
+STORE_DIR = os.path.join(".cache", "dashboards")
+CORPUS_DIRS = (CORPUS_DIR, STORE_DIR)
+INDEX_PATH = os.path.join(".cache", "schema_index.json")
+# The example chosen for a schema, kept so the prompt stays the same as dashboards are added
+PIN_DIR = os.path.join(".cache", "example_pins")
+# Rows of a corpus directory's CSVs read to check its dashboards' schemas against
+DATA_SAMPLE_ROWS = 1000
+# Estimated share of a stored dashboard's schema found in the data above which it is adapted instead of generated
+THRESHOLD_ENV = "SCHEMA_REUSE_THRESHOLD"
+DISABLE_ENV = "SCHEMA_INDEX_DISABLED"
+DEFAULT_THRESHOLD = 0.6
+# A stored column is only renamed to a data column of the same kind with at least this name similarity
+MIN_NAME_SIMILARITY = 0.6
+NUM_PERMUTATIONS = 128
+# Stored dashboards at least this similar are shown to the LLM as the example for the data
+# An unrelated dashboard is a worse example than the curated one: data of another domain still shares
+# a few generic columns (e.g. a hotel booking and a sales dashboard at 0.54)
+MIN_EXAMPLE_SIMILARITY = 0.7
+EXAMPLE_CANDIDATES = 5
+NUMERIC_METHODS = {"sum", "mean", "median", "min", "max", "std", "var", "cumsum", "pct_change"}
+NUMERIC_PX_KEYWORDS = ("y", "values", "size")
+ORDER_OPERATORS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+# One seed per permutation; a feature's value under a permutation is its hash mixed with the seed
+_SEEDS = np.random.RandomState(20240817).randint(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+_index = {"entries": None, "signatures": None, "stamp": None}
+_index_lock = threading.Lock()
+
+
+def _normalize(name):
+    # 'Hire Date', 'hireDate' and 'hire_date' are the same column name
+    name = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", str(name))
+    return re.sub(r"[^0-9a-z]+", "_", name.lower()).strip("_")
+
+
+def column_kind(series):
+    """Classify a column as 'datetime', 'numeric' or 'categorical'."""
+    if pd.api.types.is_datetime64_any_dtype(series) or re.search(r"date|time", str(series.name), re.IGNORECASE):
+        return "datetime"
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return "numeric"
+    return "categorical"
+
+
+def data_schema(data):
+    """Column name -> kind for a DataFrame."""
+    return {str(col): column_kind(data[col]) for col in data.columns}
+
+
+def _subscript_column(node):
+    # The column of `df['col']`, or of `df.col`
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and FRAME_NAME.match(node.value.id) \
+            and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str):
+        return node.slice.value
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and FRAME_NAME.match(node.value.id) \
+            and node.attr not in FRAME_ATTRIBUTES:
+        return node.attr
+    return None
+
+
+def code_schema(code):
+    """Infer the columns a dashboard reads from the data, and their kinds, from its code.
+
+    A column assigned by the code is derived, unless the assignment converts
+    the column itself (e.g. `df['date'] = pd.to_datetime(df['date'])`).
+
+    Returns:
+        dict: Column name -> kind, or None if the code does not parse
+    """
+    try:
+        tree = ast.parse(extract_code(code))
+    except SyntaxError:
+        return None
+    reads, created = collect_column_references(tree)
+    reads.extend(frame_attribute_columns(tree))
+    converted = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                column = _subscript_column(target)
+                if column is not None and column in {_subscript_column(n) for n in ast.walk(node.value)}:
+                    converted.add(column)
+    derived = (created - converted) | IMPLICIT_COLUMNS
+    columns = {column for column, _ in reads if column not in derived}
+
+    kinds = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            name = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, "id", None)
+            if name == "to_datetime" and node.args and _subscript_column(node.args[0]) in columns:
+                kinds[_subscript_column(node.args[0])] = "datetime"
+            elif name in NUMERIC_METHODS and isinstance(node.func, ast.Attribute) \
+                    and _subscript_column(node.func.value) in columns:
+                kinds.setdefault(_subscript_column(node.func.value), "numeric")
+            elif isinstance(node.func, ast.Attribute) and getattr(node.func.value, "id", None) == "px" \
+                    and node.args and isinstance(node.args[0], ast.Name):
+                for keyword in node.keywords:
+                    if keyword.arg in NUMERIC_PX_KEYWORDS and isinstance(keyword.value, ast.Constant) \
+                            and keyword.value.value in columns:
+                        kinds.setdefault(keyword.value.value, "numeric")
+        elif isinstance(node, ast.Attribute) and node.attr == "dt" and _subscript_column(node.value) in columns:
+            kinds[_subscript_column(node.value)] = "datetime"
+        elif isinstance(node, ast.BinOp) or isinstance(node, ast.Compare) and isinstance(node.ops[0], ORDER_OPERATORS):
+            for operand in (node.left, node.right) if isinstance(node, ast.BinOp) else (node.left, *node.comparators):
+                if _subscript_column(operand) in columns:
+                    kinds.setdefault(_subscript_column(operand), "numeric")
+    return {
+        column: "datetime" if re.search(r"date|time", column, re.IGNORECASE) else kinds.get(column, "categorical")
+        for column in sorted(columns)
+    }
+
+
+def shingles(schema):
+    """Set of features of a schema: each column's name with its kind, and the words in the names."""
+    features = set()
+    for column, kind in schema.items():
+        name = _normalize(column)
+        features.add(f"{name}|{kind}")
+        features.update(f"w:{word}" for word in name.split("_") if word)
+    return features
+
+
+def _hash(feature):
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _mix(values):
+    # splitmix64 finalizer: every input bit affects every output bit, so no feature wins most permutations
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def minhash(features):
+    """MinHash signature of a set of features (NUM_PERMUTATIONS values)."""
+    if not features:
+        return np.full(NUM_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+    hashes = np.array([_hash(feature) for feature in features], dtype=np.uint64)
+    return _mix(np.bitwise_xor.outer(hashes, _SEEDS)).min(axis=0)
+
+
+def _schema_path(path):
+    return os.path.splitext(path)[0] + ".schema.json"
+
+
+def _data_schemas(corpus_dir):
+    # Schemas of the CSVs kept next to a corpus's dashboards, e.g. Generated_Dashboards/data.csv
+    schemas = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.csv"))):
+        try:
+            schemas.append(data_schema(pd.read_csv(path, nrows=DATA_SAMPLE_ROWS)))
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read {path}: {str(e)}")
+    return schemas
+
+
+def checked_schema(code, inferred, actual):
+    """Check the schema inferred from a dashboard's code against real data's schema.
+
+    Returns:
+        dict: The inferred columns with their kinds in the data, or None if a
+            column is missing or of another kind, or the code fails the local
+            check against the data's columns
+    """
+    if any(actual.get(column) != kind for column, kind in inferred.items()):
+        return None
+    if verify_dashboard_code(code, list(actual)):
+        return None
+    return {column: actual[column] for column in inferred}
+
+
+def _dashboard_schema(path, data_schemas=()):
+    # The schema saved with the dashboard, or the columns its code reads checked against data kept next to it;
+    # otherwise the columns its code reads, which only the upload's own columns can check
+    if os.path.exists(_schema_path(path)):
+        with open(_schema_path(path), encoding="utf-8") as f:
+            return json.load(f), True
+    with open(path, encoding="utf-8") as f:
+        code = f.read()
+    inferred = code_schema(code)
+    for actual in data_schemas if inferred else ():
+        schema = checked_schema(code, inferred, actual)
+        if schema is not None:
+            return schema, True
+    return inferred, False
+
+
+def _index_entry(path, data_schemas=()):
+    schema, verified = _dashboard_schema(path, data_schemas)
+    if not schema:
+        return None
+    with open(path, encoding="utf-8") as f:
+        code = f.read()
+    # Dashboards that fail the check even against the columns they read are not worth showing or adapting
+    if verify_dashboard_code(code, list(schema)):
+        return None
+    features = shingles(schema)
+    return {"path": path, "mtime": os.path.getmtime(path), "schema": schema, "verified": verified,
+            "size": len(features), "signature": minhash(features).tolist()}
+
+
+def _corpus_files(corpus_dirs):
+    return sorted(path for corpus_dir in corpus_dirs for path in glob.glob(os.path.join(corpus_dir, "*.py")))
+
+
+def build_index(corpus_dirs=CORPUS_DIRS, index_path=INDEX_PATH):
+    """Fingerprint the dashboards stored in `corpus_dirs`.
+
+    Entries of unchanged files are taken from the index file; new or changed
+    files are parsed and verified. Files that do not parse or fail
+    verification get an entry without a schema so they are not parsed again.
+
+    A dashboard saved with a `.schema.json` of the data it was verified on is
+    marked verified, and so is one whose inferred schema checks out against
+    a CSV in its directory. Other dashboards keep the schema inferred from
+    their code, unverified: they are only adapted once the adapted code
+    passes the check against the upload's columns.
+
+    Returns:
+        list: Index entries with 'path', 'mtime', 'schema', 'verified',
+            'size' (number of schema features) and 'signature'
+    """
+    cached = {}
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                cached = {entry["path"]: entry for entry in json.load(f)}
+        except (OSError, ValueError) as e:
+            logging.error(f"Ignoring unreadable schema index: {str(e)}")
+
+    entries = []
+    changed = False
+    data_schemas = {}
+    for path in _corpus_files(corpus_dirs):
+        entry = cached.get(path)
+        # Entries written before the 'verified' flag existed, or since given a saved schema, are indexed again
+        if entry is None or entry["mtime"] != os.path.getmtime(path) or (entry["schema"] and "verified" not in entry) \
+                or (not entry.get("verified") and os.path.exists(_schema_path(path))):
+            corpus_dir = os.path.dirname(path)
+            if corpus_dir not in data_schemas:
+                data_schemas[corpus_dir] = _data_schemas(corpus_dir)
+            try:
+                entry = _index_entry(path, data_schemas[corpus_dir]) or {"path": path, "mtime": os.path.getmtime(path),
+                                                                         "schema": None}
+            except (OSError, ValueError) as e:
+                logging.error(f"Could not index {path}: {str(e)}")
+                continue
+            changed = True
+        entries.append(entry)
+    if changed or len(entries) != len(cached):
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            with open(index_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+        except OSError as e:
+            logging.error(f"Could not write schema index: {str(e)}")
+    return [entry for entry in entries if entry["schema"]]
+
+
+def _load_index():
+    # Rebuilt when a dashboard is added, removed or changed; kept in memory otherwise
+    stamp = tuple((path, os.path.getmtime(path), os.path.exists(_schema_path(path))) for path in _corpus_files(CORPUS_DIRS))
+    with _index_lock:
+        if _index["stamp"] != stamp:
+            start = time.perf_counter()
+            entries = build_index()
+            _index["entries"] = entries
+            _index["signatures"] = np.array([entry["signature"] for entry in entries], dtype=np.uint64) \
+                .reshape(len(entries), NUM_PERMUTATIONS)
+            _index["stamp"] = stamp
+            logging.info(f"Schema index of {len(entries)} dashboard(s) loaded in {time.perf_counter() - start:.2f}s")
+        return _index["entries"], _index["signatures"]
+
+
+def containment(jaccard, size, other_size):
+    """Share of a set of `size` features found in another of `other_size`, given their Jaccard similarity."""
+    if not size:
+        return 0.0
+    # |A & B| = J * |A | B| = J * (|A| + |B|) / (1 + J)
+    return min(1.0, jaccard * (size + other_size) / ((1 + jaccard) * size))
+
+
+def similar_dashboards(data, limit=3, verified_only=False):
+    """Stored dashboards whose schemas are the most contained in the data's.
+
+    The similarity is the estimated share of a stored schema's features that
+    the data also has, so a dashboard for a subset of the data's columns
+    scores as high as one for exactly its columns. The Jaccard similarity is
+    estimated from the MinHash signatures and converted with the set sizes.
+
+    Args:
+        data (pd.DataFrame): Data to match
+        limit (int): Maximum number of matches
+        verified_only (bool): Skip dashboards without a saved schema
+
+    Returns:
+        list: (estimated containment, index entry) pairs, most similar first
+    """
+    entries, signatures = _load_index()
+    if not entries:
+        return []
+    features = shingles(data_schema(data))
+    jaccard = (signatures == minhash(features)).mean(axis=1)
+    similarities = np.array([
+        containment(j, entry["size"], len(features)) if entry["verified"] or not verified_only else -1.0
+        for j, entry in zip(jaccard, entries)
+    ])
+    best = [i for i in np.argsort(-similarities, kind="stable")[:limit] if similarities[i] >= 0]
+    return [(float(similarities[i]), entries[i]) for i in best]
+
+
+def column_mapping(stored, target):
+    """Map each stored column to a distinct target column of the same kind with the most similar name.
+
+    Args:
+        stored (dict): Column -> kind the stored dashboard reads
+        target (dict): Column -> kind of the new data
+
+    Returns:
+        dict: Stored column -> target column, or None if a stored column has no match
+    """
+    pairs = []
+    for old, kind in stored.items():
+        for new, new_kind in target.items():
+            if kind != new_kind:
+                continue
+            if old == new:
+                score = 2.0
+            else:
+                score = difflib.SequenceMatcher(None, _normalize(old), _normalize(new)).ratio()
+            if score >= MIN_NAME_SIMILARITY:
+                pairs.append((score, old, new))
+    mapping = {}
+    used = set()
+    for score, old, new in sorted(pairs, key=lambda pair: -pair[0]):
+        if old not in mapping and new not in used:
+            mapping[old] = new
+            used.add(new)
+    return mapping if len(mapping) == len(stored) else None
+
+
+def _literal(name, quote):
+    if quote in "'\"" and quote not in name and "\\" not in name:
+        return quote + name + quote
+    return repr(name)
+
+
+def remap_columns(code, mapping):
+    """Rename the mapped columns in dashboard code.
+
+    String literals naming a mapped column, including those inside f-string
+    expressions, are replaced, and so are attribute reads such as
+    `df.salary` (written `df['Annual Salary']` when the new name is not an
+    identifier).
+    """
+    lines = code.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    quoted = re.compile("|".join(rf"(['\"]){re.escape(old)}\{i + 1}" for i, old in enumerate(mapping))) if mapping else None
+
+    replacements = []
+    previous = []
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if token.type in (tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT):
+            continue
+        start = offsets[token.start[0] - 1] + token.start[1]
+        end = offsets[token.end[0] - 1] + token.end[1]
+        if token.type == tokenize.STRING:
+            prefix = token.string[:len(token.string) - len(token.string.lstrip("rRbBuUfF"))]
+            if "f" in prefix.lower() and quoted is not None:
+                def replace(match):
+                    old = match.group(0)[1:-1]
+                    return _literal(mapping[old], match.group(0)[0])
+                replacements.append((start, end, quoted.sub(replace, token.string)))
+            elif not prefix:
+                value = ast.literal_eval(token.string)
+                if mapping.get(value, value) != value:
+                    quote = token.string[0] if token.string[:3] != token.string[0] * 3 else ""
+                    replacements.append((start, end, _literal(mapping[value], quote)))
+        elif token.type == tokenize.NAME and token.string in mapping and len(previous) == 2 \
+                and previous[1].string == "." and previous[0].type == tokenize.NAME and FRAME_NAME.match(previous[0].string):
+            new = mapping[token.string]
+            dot = offsets[previous[1].start[0] - 1] + previous[1].start[1]
+            replacements.append((dot, end, f".{new}" if new.isidentifier() else f"[{_literal(new, chr(39))}]"))
+        previous = (previous + [token])[-2:]
+    for start, end, text in reversed(replacements):
+        code = code[:start] + text + code[end:]
+    return code
+
+
+def enabled():
+    """False when $SCHEMA_INDEX_DISABLED is set, so stored dashboards are neither reused nor used as examples."""
+    return not os.getenv(DISABLE_ENV)
+
+
+def find_reusable_dashboard(data, threshold=None):
+    """Adapt a stored dashboard to the data without an LLM, if one is similar enough.
+
+    Dashboards above the similarity threshold are tried most similar first;
+    the first whose columns all map to data columns of the same kind, and
+    whose remapped code passes the local verification against the data's
+    columns, is returned. This check against the upload is what lets
+    dashboards with only an inferred schema, such as most of the
+    Generated_Dashboards corpus, be reused.
+
+    Args:
+        data (pd.DataFrame): Data the dashboard is built for
+        threshold (float): Minimum estimated containment; $SCHEMA_REUSE_THRESHOLD
+            or DEFAULT_THRESHOLD when None
+
+    Returns:
+        dict: 'code', 'path', 'similarity' and 'mapping', or None if no
+            stored dashboard can be adapted
+    """
+    if not enabled():
+        return None
+    threshold = float(os.getenv(THRESHOLD_ENV, DEFAULT_THRESHOLD)) if threshold is None else threshold
+    target = data_schema(data)
+    for similarity, entry in similar_dashboards(data):
+        if similarity < threshold:
+            break
+        mapping = column_mapping(entry["schema"], target)
+        if mapping is None:
+            continue
+        with open(entry["path"], encoding="utf-8") as f:
+            code = remap_columns(f.read(), mapping)
+        if verify_dashboard_code(code, list(data.columns)):
+            continue
+        logging.info(f"Adapting {entry['path']} (schema similarity {similarity:.2f})")
+        return {"code": code, "path": entry["path"], "similarity": similarity, "mapping": mapping}
+    return None
+
+
+def closest_example(data, min_similarity=MIN_EXAMPLE_SIMILARITY):
+    """The stored dashboard with the schema most similar to the data's, as a few-shot example.
+
+    Only dashboards with a schema from real data are candidates: a schema
+    inferred from the dashboard's own code says nothing about how well the
+    code fits. Among equally similar dashboards the shortest is used, since
+    it costs the fewest prompt tokens.
+
+    Returns:
+        dict: 'code', 'path', 'schema' and 'similarity', or None if no verified
+            dashboard is similar enough
+    """
+    matches = [(similarity, entry) for similarity, entry in similar_dashboards(data, EXAMPLE_CANDIDATES, verified_only=True)
+               if similarity >= min_similarity]
+    if not matches:
+        return None
+    similarity = matches[0][0]
+    entry = min((entry for s, entry in matches if s == similarity), key=lambda entry: os.path.getsize(entry["path"]))
+    return _example(entry, similarity)
+
+
+def _example(entry, similarity):
+    with open(entry["path"], encoding="utf-8") as f:
+        code = f.read()
+    return {"code": code, "path": entry["path"], "schema": entry["schema"], "similarity": similarity}
+
+
+def _pin_path(data, pin_dir):
+    # The prompt only depends on the column names and dtypes
+    schema = json.dumps([[str(col), str(dtype)] for col, dtype in data.dtypes.items()])
+    return os.path.join(pin_dir, f"{hashlib.sha256(schema.encode('utf-8')).hexdigest()[:16]}.json")
+
+
+def pinned_example(data, pin_dir=PIN_DIR):
+    """`closest_example` for the data, chosen once per schema and reused afterwards.
+
+    Dashboards stored later would otherwise change the example, and with it
+    the prompt and every cache keyed on it, for data that was already seen.
+    The choice, including "no example", is kept in `pin_dir`; it is made
+    again only if the pinned dashboard has been deleted, no longer passes
+    the index, or would not be chosen under the current requirements.
+
+    Returns:
+        dict: As `closest_example`, or None
+    """
+    if not enabled():
+        return None
+    path = _pin_path(data, pin_dir)
+    try:
+        with open(path, encoding="utf-8") as f:
+            pin = json.load(f)
+        if pin["path"] is None:
+            return None
+        entry = next((entry for entry in _load_index()[0] if entry["path"] == pin["path"]), None)
+        if entry is not None and entry["verified"] and pin["similarity"] >= MIN_EXAMPLE_SIMILARITY:
+            return _example(entry, pin["similarity"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    example = closest_example(data)
+    os.makedirs(pin_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"path": example and example["path"], "similarity": example and example["similarity"]}, f)
+    os.replace(tmp_path, path)
+    return example
+
+
+def add_dashboard(code, data, store_dir=STORE_DIR):
+    """Store a verified dashboard with its data's schema so later uploads can reuse it.
+
+    Dashboards go to an untracked cache directory, named after a hash of
+    their code: the same code (e.g. a cached LLM response) is stored once,
+    with the schema it was first verified on.
+
+    Returns:
+        str: Path of the stored dashboard
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, f"dashboard_{hashlib.sha256(code.encode('utf-8')).hexdigest()[:16]}.py")
+    if os.path.exists(path):
+        return path
+    # The schema first, since the index treats a dashboard without one as unverified
+    for target, content in ((_schema_path(path), json.dumps(data_schema(data))), (path, code)):
+        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, target)
+    return path
+
+
+def save_schema(path, data):
+    """Save the schema of the data a corpus dashboard was built for, once its code checks out against it.
+
+    Returns:
+        dict: The saved schema, or None if the dashboard does not match the data
+    """
+    with open(path, encoding="utf-8") as f:
+        code = f.read()
+    schema = checked_schema(code, code_schema(code) or {}, data_schema(data))
+    if schema:
+        with open(_schema_path(path), "w", encoding="utf-8") as f:
+            json.dump(schema, f)
+    return schema or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the stored dashboard closest to a CSV's schema")
+    parser.add_argument("data", help="CSV to match")
+    parser.add_argument("--save-schema", metavar="DASHBOARD",
+                        help="Instead, check a corpus dashboard against the CSV it was built for and save its schema")
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data)
+    if args.save_schema:
+        schema = save_schema(args.save_schema, data)
+        if schema is None:
+            parser.error(f"{args.save_schema} reads columns that are missing from {args.data} or of another kind")
+        print(f"Saved {_schema_path(args.save_schema)}: {', '.join(schema)}")
+        return
+    start = time.perf_counter()
+    matches = similar_dashboards(data)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(matches)} match(es) in {elapsed_ms:.1f} ms")
+    for similarity, entry in matches:
+        note = "" if entry["verified"] else " (unverified)"
+        print(f"  {similarity:.2f}  {entry['path']}{note}  {', '.join(entry['schema'])}")
+    reusable = find_reusable_dashboard(data)
+    if reusable:
+        print(f"Reusable: {reusable['path']} with {reusable['mapping']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import hashlib
+import logging
+from collections import OrderedDict
+
+MEMO_KEY = "_stage_memo"
+# Results kept per stage, so toggling an option back and forth stays instant
+MAX_ENTRIES_PER_STAGE = 4
+
+
+def content_hash(*parts):
+    """Hash bytes or strings (e.g. an uploaded file's buffer or a prompt) into a short key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, (bytes, memoryview)) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _entries(state, stage):
+    memo = state.setdefault(MEMO_KEY, {})
+    return memo.setdefault(stage, OrderedDict())
+
+
+def is_fresh(state, stage, key):
+    """Return True if `stage` already has a result for `key` in this session."""
+    return key in _entries(state, stage)
+
+
+def memoize(state, stage, key, fn):
+    """Return the stored result of `stage` for `key`, computing it with `fn` on a miss.
+
+    Args:
+        state: Per-session mapping, i.e. `st.session_state`
+        stage (str): Pipeline stage name
+        key (hashable): Identity of the stage's inputs
+        fn (callable): Zero-argument function computing the stage
+
+    Returns:
+        The stage's result
+    """
+    entries = _entries(state, stage)
+    if key in entries:
+        entries.move_to_end(key)
+        logging.info(f"Reusing {stage} result from this session")
+        return entries[key]
+    value = fn()
+    entries[key] = value
+    while len(entries) > MAX_ENTRIES_PER_STAGE:
+        entries.popitem(last=False)
+    return value
+
+
+def forget(state, stage, key):
+    """Drop the stored result of `stage` for `key`, e.g. after it turned out to be a failure."""
+    _entries(state, stage).pop(key, None)
@@ -0,0 +1,46 @@
+import logging
+import threading
+from concurrent.futures import Future
+
+# Process-wide: Streamlit serves every session from threads of one process
+_lock = threading.Lock()
+_in_flight = {}
+
+
+def do(key, fn):
+    """Run `fn` once for all concurrent callers that use the same key.
+
+    The first caller runs `fn`; callers arriving while it is in flight wait
+    for and share its result (or exception). Nothing is kept once it
+    completes, so later callers run `fn` again.
+
+    Args:
+        key (str): Identity of the request, e.g. a hash of model and prompt
+        fn (callable): Zero-argument function performing the request
+
+    Returns:
+        The result of `fn`
+        bool: True if the result was shared from another caller's request
+    """
+    with _lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _in_flight[key] = future
+
+    if not leader:
+        logging.info(f"Joining in-flight request {key[:12]}")
+        return future.result(), True
+
+    try:
+        result = fn()
+        future.set_result(result)
+        return result, False
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+
@@ -0,0 +1,205 @@
+import ast
+import logging
+import re
+import time
+
+from src.cancellation import Cancelled, is_cancelled
+
+MAX_ATTEMPTS = 3
+# Complete lines we wait for before deciding the model is writing prose, not code
+PROSE_LINES = 5
+UPDATE_INTERVAL_SECONDS = 0.25
+WRONG_FRAMEWORKS = ("streamlit", "flask", "gradio", "tkinter", "bokeh", "panel", "matplotlib")
+
+CODE_LINE = re.compile(r"^\s*(import |from |#|def |class |@|if |for |while |try:|with |return |\w+(\.\w+)*\s*(\[.*\])?\s*=|\w+\()")
+FRAMEWORK_IMPORT = re.compile(r"^\s*(?:import|from)\s+(" + "|".join(WRONG_FRAMEWORKS) + r")\b", re.MULTILINE)
+
+
+class StreamAborted(Exception):
+    """Raised when every streamed attempt went off track."""
+
+
+class StreamCancelled(Exception):
+    """Raised when the caller cancelled the stream, e.g. because a hedged request won."""
+
+
+INCOMPLETE_ERRORS = ("never closed", "unterminated", "unexpected EOF", "expected an indented block")
+
+
+def _strip_fence(text):
+    # Keep only what follows an opening ``` fence, up to the closing one
+    fence = re.search(r"^[ \t]*```[\w-]*[ \t]*(\n|$)", text, re.MULTILINE)
+    if fence is None:
+        return text
+    text = text[fence.end():]
+    closing = text.find("```")
+    return text if closing == -1 else text[:closing]
+
+
+class IncrementalCodeChecker:
+    """Checks a growing LLM response and reports as soon as it is unusable.
+
+    Only the complete top-level statements are parsed, and only when a new
+    one has started, so each token costs next to nothing.
+    """
+
+    def __init__(self):
+        self.checked_upto = 0
+
+    def feed(self, text):
+        """Check the response received so far.
+
+        Args:
+            text (str): Full response text so far
+
+        Returns:
+            str: Reason to abort, or None if the response still looks fine
+        """
+        lines = text.split("\n")[:-1]  # the last line may still be growing
+        non_empty = [line for line in lines if line.strip()]
+        fenced = any(line.lstrip().startswith("```") for line in non_empty)
+        if not fenced and len(non_empty) >= PROSE_LINES and not any(CODE_LINE.match(line) for line in non_empty):
+            return "response is prose instead of code"
+
+        code = _strip_fence(text)
+        match = FRAMEWORK_IMPORT.search(code)
+        if match:
+            return f"response uses {match.group(1)} instead of Dash"
+
+        # Everything before the last line starting at column 0 is a run of complete statements
+        complete_upto = 0
+        offset = 0
+        after_decorator = False
+        for line in code.split("\n")[:-1]:
+            if line and not line[0].isspace() and not line.startswith((")", "]", "}", "#", "else", "elif", "except", "finally")):
+                if not after_decorator:
+                    complete_upto = offset
+                after_decorator = line.startswith("@")
+            offset += len(line) + 1
+        if complete_upto > self.checked_upto:
+            self.checked_upto = complete_upto
+            try:
+                ast.parse(code[:complete_upto])
+            except SyntaxError as e:
+                # A statement spanning the cut (e.g. a multi-line string) is not an error yet
+                if not any(marker in e.msg for marker in INCOMPLETE_ERRORS):
+                    return f"syntax error at line {e.lineno}: {e.msg}"
+        return None
+
+
+def _chunk_text(chunk):
+    content = chunk.content if hasattr(chunk, "content") else chunk
+    if isinstance(content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return str(content)
+
+
+def _add_usage(stats, chunk):
+    usage = getattr(chunk, "usage_metadata", None) or {}
+    for name in ("input_tokens", "output_tokens"):
+        if usage.get(name):
+            stats[name] = stats.get(name, 0) + usage[name]
+    # Prompt cache reads and writes, which are part of input_tokens
+    for name, count in (usage.get("input_token_details") or {}).items():
+        if name in ("cache_read", "cache_creation") and count:
+            stats[name] = stats.get(name, 0) + count
+
+
+def _with_note(prompt, note):
+    """Append a note to a prompt, either a string or a list of messages."""
+    if isinstance(prompt, str):
+        return f"{prompt}\n\n{note}"
+    return [*prompt, ("user", note)]
+
+
+def stream_text(llm, prompt, stats=None):
+    """Stream a response without checking it, stopping as soon as the run is superseded.
+
+    Used instead of `invoke` so a cancelled call drops its connection rather
+    than running to completion.
+
+    Args:
+        llm: Chat model with a `stream` method
+        prompt (str or list): Prompt or messages to send
+        stats (dict): If given, receives 'ttft', the reported 'input_tokens'/'output_tokens'
+            and the 'cache_read'/'cache_creation' part of the input
+
+    Returns:
+        str: The complete response
+    """
+    start = time.time()
+    text = ""
+    stream = llm.stream(prompt)
+    try:
+        for chunk in stream:
+            if is_cancelled():
+                raise Cancelled(f"Run superseded after {len(text)} characters")
+            if stats is not None:
+                stats.setdefault("ttft", time.time() - start)
+                _add_usage(stats, chunk)
+            text += _chunk_text(chunk)
+    finally:
+        if hasattr(stream, "close"):
+            stream.close()
+    return text
+
+
+def stream_code(llm, prompt, on_update=None, max_attempts=MAX_ATTEMPTS, stats=None, cancel_event=None):
+    """Stream generated code, aborting and retrying as soon as it goes off track.
+
+    Args:
+        llm: Chat model with a `stream` method
+        prompt (str or list): Prompt or messages expected to produce Python code
+        on_update (callable): Called with the text received so far, at most
+            every UPDATE_INTERVAL_SECONDS and once at the end
+        max_attempts (int): Attempts before giving up
+        stats (dict): If given, receives 'ttft' (seconds to the first chunk), the
+            'input_tokens'/'output_tokens' reported over all attempts and the
+            'cache_read'/'cache_creation' part of the input
+        cancel_event (threading.Event): Stops the stream as soon as it is set
+
+    Returns:
+        str: The complete response of the first attempt that stayed on track
+        int: Number of attempts used
+    """
+    attempt_prompt = prompt
+    start = time.time()
+    if stats is not None:
+        stats.setdefault("ttft", None)
+    for attempt in range(1, max_attempts + 1):
+        checker = IncrementalCodeChecker()
+        text = ""
+        reason = None
+        last_update = 0.0
+        stream = llm.stream(attempt_prompt)
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise StreamCancelled(f"Stream cancelled after {len(text)} characters")
+                if is_cancelled():
+                    raise Cancelled(f"Run superseded after {len(text)} characters")
+                if stats is not None:
+                    if stats["ttft"] is None:
+                        stats["ttft"] = time.time() - start
+                    _add_usage(stats, chunk)
+                text += _chunk_text(chunk)
+                if on_update is not None and time.time() - last_update >= UPDATE_INTERVAL_SECONDS:
+                    on_update(text)
+                    last_update = time.time()
+                reason = checker.feed(text)
+                if reason:
+                    break
+        finally:
+            # Closing the generator drops the HTTP stream, so an aborted attempt stops costing tokens
+            if hasattr(stream, "close"):
+                stream.close()
+
+        if reason is None:
+            if on_update is not None:
+                on_update(text)
+            return text, attempt
+
+        logging.warning(f"Aborted streamed attempt {attempt} after {len(text)} characters: {reason}")
+        attempt_prompt = _with_note(prompt, f"A previous attempt was rejected ({reason}). "
+                                            "Respond with only the Python code of the Dash app.")
+    raise StreamAborted(f"All {max_attempts} streamed attempts went off track; last: {reason}")
@@ -0,0 +1,150 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.llm_backend import STUB_CHUNK_CHARS, StubLLM, _estimate_tokens, _prompt_text
+
+DEFAULT_PORT = 8765
+
+
+class StubAnthropicHandler(BaseHTTPRequestHandler):
+    """Speaks enough of the Anthropic Messages API to run the app against StubLLM responses.
+
+    Keep-alive is supported, and every new TCP connection is counted, so
+    `GET /stats` shows whether clients reuse their connections. Prompt caching
+    (`cache_control` blocks) is simulated and reported in the usage.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.stats["connections"] += 1
+
+    def _count_request(self):
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_event(self, event, payload):
+        self._write_chunk(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+    def do_HEAD(self):
+        self._count_request()
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self._count_request()
+        if self.path == "/stats":
+            with self.server.stats_lock:
+                self._send_json(200, dict(self.server.stats))
+        elif self.path.startswith("/v1/models"):
+            self._send_json(200, {"data": [], "has_more": False})
+        else:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def do_POST(self):
+        self._count_request()
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.startswith("/v1/messages"):
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+
+        messages = [(message["role"], message["content"]) for message in request.get("messages", [])]
+        content = self.server.llm.respond(messages)
+        cache_read, cache_write = self.server.llm.cache_usage(messages)
+        # The API's input_tokens excludes the tokens read from or written to the prompt cache
+        usage = {
+            "input_tokens": max(0, _estimate_tokens(_prompt_text(messages)) - cache_read - cache_write),
+            "cache_read_input_tokens": cache_read,
+            "cache_creation_input_tokens": cache_write,
+        }
+        output_tokens = _estimate_tokens(content)
+        message = {
+            "id": "msg_stub", "type": "message", "role": "assistant", "model": request.get("model", "stub"),
+            "stop_reason": None, "stop_sequence": None,
+            "usage": {**usage, "output_tokens": 0},
+        }
+        latency = self.server.llm.latency
+        if not request.get("stream"):
+            time.sleep(latency)
+            message.update(content=[{"type": "text", "text": content}], stop_reason="end_turn",
+                           usage={**usage, "output_tokens": output_tokens})
+            self._send_json(200, message)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunks = [content[i:i + STUB_CHUNK_CHARS] for i in range(0, len(content), STUB_CHUNK_CHARS)] or [""]
+        time.sleep(latency / 4)
+        self._send_event("message_start", {"type": "message_start", "message": {**message, "content": []}})
+        self._send_event("content_block_start", {"type": "content_block_start", "index": 0,
+                                                 "content_block": {"type": "text", "text": ""}})
+        for chunk in chunks:
+            time.sleep(latency * 3 / 4 / len(chunks))
+            self._send_event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                     "delta": {"type": "text_delta", "text": chunk}})
+        self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._send_event("message_delta", {"type": "message_delta",
+                                           "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                           "usage": {**usage, "output_tokens": output_tokens}})
+        self._send_event("message_stop", {"type": "message_stop"})
+        self._write_chunk(b"")
+
+    def log_message(self, format, *args):
+        logging.debug(f"Stub server: {format % args}")
+
+
+def start_server(port=DEFAULT_PORT, latency=0.0):
+    """Start the stub server in a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call `shutdown()` to stop it
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubAnthropicHandler)
+    server.llm = StubLLM(latency=latency)
+    server.stats = {"connections": 0, "requests": 0}
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True, name="autodash-stub-server").start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve StubLLM responses over the Anthropic Messages API; "
+                    "run the app with LLM_BASE_URL=http://127.0.0.1:PORT and any ANTHROPIC_API_KEY")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per response")
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency)
+    print(f"Stub LLM server on http://127.0.0.1:{args.port} (connection counts at /stats)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import logging
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from src.llm_cache import model_signature
+from src.prompt_builder import estimate_tokens
+
+DB_PATH = os.path.join(".cache", "telemetry.db")
+# USD per million input and output tokens
+PRICES = {
+    "claude-3-5-sonnet-20240620": (3.00, 15.00),
+    "claude-3-haiku-20240307": (0.25, 1.25),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "stub": (0.0, 0.0),
+    "stub-fast": (0.0, 0.0),
+}
+# Prompt cache reads and writes, relative to the input price
+CACHE_READ_PRICE_FACTOR = 0.1
+CACHE_WRITE_PRICE_FACTOR = 1.25
+
+COLUMNS = ("ts", "stage", "model", "input_tokens", "output_tokens", "ttft", "seconds",
+           "attempts", "cache_hit", "coalesced", "cost", "cache_read_tokens", "cache_write_tokens")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    ts REAL NOT NULL,
+    stage TEXT NOT NULL,
+    model TEXT NOT NULL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    ttft REAL,
+    seconds REAL NOT NULL,
+    attempts INTEGER,
+    cache_hit INTEGER,
+    coalesced INTEGER,
+    cost REAL,
+    cache_read_tokens INTEGER,
+    cache_write_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS llm_calls_stage_model ON llm_calls (stage, model, ts);
+CREATE TABLE IF NOT EXISTS routing_decisions (
+    ts REAL NOT NULL,
+    stage TEXT NOT NULL,
+    model TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    latency REAL,
+    cost REAL
+);
+"""
+ROUTE_COLUMNS = ("ts", "stage", "model", "reason", "latency", "cost")
+
+
+def estimate_cost(model, input_tokens, output_tokens, cache_read_tokens=0, cache_write_tokens=0):
+    """Estimated USD cost of a call; None for models without a known price.
+
+    `input_tokens` includes the tokens read from and written to the prompt cache.
+    """
+    price = PRICES.get(model)
+    if price is None:
+        return None
+    uncached = max(0, input_tokens - cache_read_tokens - cache_write_tokens)
+    input_cost = price[0] * (uncached + CACHE_READ_PRICE_FACTOR * cache_read_tokens
+                             + CACHE_WRITE_PRICE_FACTOR * cache_write_tokens)
+    return round((input_cost + output_tokens * price[1]) / 1e6, 6)
+
+
+def usage_tokens(usage):
+    """Input and output token counts from a LangChain `usage_metadata` dict (None if missing)."""
+    if not usage:
+        return None, None
+    return usage.get("input_tokens"), usage.get("output_tokens")
+
+
+def cache_tokens(usage):
+    """Prompt cache read and write token counts from usage stats or `usage_metadata` (0 if missing)."""
+    usage = usage or {}
+    details = usage.get("input_token_details") or usage
+    return details.get("cache_read") or 0, details.get("cache_creation") or 0
+
+
+def call_entry(stage, llm, prompt, content, seconds, usage=None, ttft=None, attempts=1, cache_hit=False, coalesced=False):
+    """Build the telemetry entry for one LLM call.
+
+    Token counts come from the provider's usage metadata when available and
+    are estimated from the text otherwise. Cache hits and coalesced calls
+    cost nothing.
+
+    Returns:
+        dict: Entry with the fields in COLUMNS
+    """
+    model, _ = model_signature(llm)
+    input_tokens, output_tokens = usage_tokens(usage)
+    if input_tokens is None:
+        input_tokens = estimate_tokens(prompt if isinstance(prompt, str) else str(prompt))
+    if output_tokens is None:
+        output_tokens = estimate_tokens(content or "")
+    cache_read_tokens, cache_write_tokens = cache_tokens(usage)
+    free = cache_hit or coalesced
+    return {
+        "ts": time.time(),
+        "stage": stage,
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "ttft": None if ttft is None else round(ttft, 3),
+        "seconds": round(seconds, 3),
+        "attempts": attempts,
+        "cache_hit": cache_hit,
+        "coalesced": coalesced,
+        "cost": 0.0 if free else estimate_cost(model, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens),
+        "cache_read_tokens": cache_read_tokens,
+        "cache_write_tokens": cache_write_tokens,
+    }
+
+
+def _connect(db_path):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _insert(table, columns, entry, db_path):
+    try:
+        conn = _connect(db_path)
+        try:
+            with conn:
+                conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                             tuple(entry.get(column) for column in columns))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.error(f"Could not record LLM telemetry: {str(e)}")
+
+
+def record(entry, db_path=DB_PATH):
+    """Persist a call entry. Failures are logged, never raised: telemetry must not break a run."""
+    _insert("llm_calls", COLUMNS, entry, db_path)
+
+
+def record_route(decision, db_path=DB_PATH):
+    """Persist a model routing decision (fields in ROUTE_COLUMNS), logging rather than raising failures."""
+    _insert("routing_decisions", ROUTE_COLUMNS, decision, db_path)
+
+
+def load_routes(db_path=DB_PATH, since=None):
+    """Return the recorded routing decisions as a DataFrame, optionally only those after `since`."""
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=ROUTE_COLUMNS)
+    conn = _connect(db_path)
+    try:
+        return pd.read_sql_query("SELECT * FROM routing_decisions WHERE ts >= ?", conn, params=(since or 0,))
+    finally:
+        conn.close()
+
+
+def load_calls(db_path=DB_PATH, since=None):
+    """Return the recorded calls as a DataFrame, optionally only those after `since` (epoch seconds)."""
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=COLUMNS)
+    conn = _connect(db_path)
+    try:
+        return pd.read_sql_query("SELECT * FROM llm_calls WHERE ts >= ?", conn, params=(since or 0,))
+    finally:
+        conn.close()
+
+
+def latency_percentile(stage, model, q, min_samples=20, recent=200, db_path=DB_PATH):
+    """Latency percentile `q` (0-1) of recent uncached calls for a stage and model (any model if None).
+
+    Returns:
+        float: Seconds, or None with fewer than `min_samples` recorded calls
+    """
+    if not os.path.exists(db_path):
+        return None
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT seconds FROM llm_calls WHERE stage = ? AND (? IS NULL OR model = ?) "
+            "AND NOT cache_hit AND NOT coalesced ORDER BY ts DESC LIMIT ?",
+            (stage, model, model, recent),
+        ).fetchall()
+    finally:
+        conn.close()
+    if len(rows) < min_samples:
+        return None
+    return float(pd.Series([row[0] for row in rows]).quantile(q))
+
+
+def mean_cost(stage, model, min_samples=5, recent=200, db_path=DB_PATH):
+    """Mean estimated cost (USD) of recent uncached calls for a stage and model.
+
+    Returns:
+        float: USD per call, or None with fewer than `min_samples` priced calls
+    """
+    if not os.path.exists(db_path):
+        return None
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT cost FROM llm_calls WHERE stage = ? AND model = ? AND NOT cache_hit AND NOT coalesced "
+            "AND cost IS NOT NULL ORDER BY ts DESC LIMIT ?",
+            (stage, model, recent),
+        ).fetchall()
+    finally:
+        conn.close()
+    if len(rows) < min_samples:
+        return None
+    return sum(row[0] for row in rows) / len(rows)
+
+
+def stage_cost(stage, since, db_path=DB_PATH):
+    """Total estimated cost (USD) recorded for a stage since `since` (epoch seconds)."""
+    if not os.path.exists(db_path):
+        return 0.0
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT COALESCE(SUM(cost), 0) FROM llm_calls WHERE stage = ? AND ts >= ?",
+                           (stage, since)).fetchone()
+    finally:
+        conn.close()
+    return float(row[0])
+
+
+def summarize(calls):
+    """Summarize calls per stage and model.
+
+    Args:
+        calls (pd.DataFrame): Output of `load_calls`
+
+    Returns:
+        pd.DataFrame: Call count, p50/p95 latency and time to first token,
+            mean tokens, cache hit rate, share of input read from the prompt
+            cache and total cost per stage and model
+    """
+    if calls.empty:
+        return pd.DataFrame()
+    # ttft is NULL for calls that were not streamed, which leaves an all-None column object-typed
+    grouped = calls.assign(ttft=pd.to_numeric(calls["ttft"])).groupby(["stage", "model"])
+    summary = pd.DataFrame({
+        "calls": grouped.size(),
+        "p50_seconds": grouped["seconds"].quantile(0.5),
+        "p95_seconds": grouped["seconds"].quantile(0.95),
+        "p50_ttft": grouped["ttft"].quantile(0.5),
+        "p95_ttft": grouped["ttft"].quantile(0.95),
+        "mean_input_tokens": grouped["input_tokens"].mean(),
+        "mean_output_tokens": grouped["output_tokens"].mean(),
+        "cache_hit_rate": grouped["cache_hit"].mean(),
+        "prompt_cache_share": grouped["cache_read_tokens"].sum() / grouped["input_tokens"].sum().where(lambda total: total > 0),
+        "total_cost": grouped["cost"].sum(),
+    })
+    return summary.round(3).sort_values("p95_seconds", ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize recorded LLM calls per stage and model")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--days", type=float, default=None, help="Only include the last N days")
+    parser.add_argument("--routes", action="store_true", help="Count the model routing decisions instead")
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days else None
+    if args.routes:
+        routes = load_routes(args.db, since)
+        if routes.empty:
+            print("No routing decisions recorded yet")
+        else:
+            print(routes.groupby(["stage", "model", "reason"]).size().rename("decisions").to_string())
+        return
+    summary = summarize(load_calls(args.db, since))
+    if summary.empty:
+        print("No LLM calls recorded yet")
+    else:
+        print(summary.to_string())
+
+
+if __name__ == "__main__":
+    main()
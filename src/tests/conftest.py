@@ -0,0 +1,2 @@
+# test_app.py is a script that builds a Dash app at import time, not a pytest module
+collect_ignore = ["test_app.py"]
@@ -17,15 +17,14 @@ import logging
 from datetime import timedelta
 from dotenv import load_dotenv
 import dash_bootstrap_components as dbc
-from langchain_google_genai import ChatGoogleGenerativeAI
+from src.llm_backend import get_llm
 from prompt_template import generate_prompt
 from datetime import datetime
 import json
 load_dotenv()
 file_path=os.environ.get('FILE_PATH')
-os.environ["GOOGLE_API_KEY"]=os.environ.get('GEMINI_API_KEY')
 
-llm = ChatGoogleGenerativeAI(
+llm = get_llm(
     model="gemini-1.5-pro",
     temperature=0,
     max_tokens=None,
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from src.baseline_dashboard import build_baseline_dashboard
+from src.code_verifier import validate_dashboard_code, verify_dashboard_code
+
+DATASETS = {
+    "sales": pd.DataFrame({
+        "order_date": pd.date_range("2024-01-01", periods=4, freq="MS"),
+        "region": ["north", "south", "east", "west"],
+        "revenue": [10.0, 20.0, 30.0, 40.0],
+        "discount_rate": [0.1, 0.2, 0.0, 0.05],
+    }),
+    "numbers only": pd.DataFrame({"x": [1, 2, 3], "y": [4.0, 5.0, 6.0]}),
+    "text only": pd.DataFrame({"city": ["a", "b", "a"], "team": ["x", "y", "z"]}),
+    "awkward names": pd.DataFrame({"Unit Price ($)": [1.0, 2.0], "Store's Name": ["n", "s"], "class": ["a", "b"]}),
+    "text dates": pd.DataFrame({"signup_date": ["2024-01-05", "2024-02-11", "2024-03-20"], "plan": ["free", "pro", "free"],
+                                "seats": [1, 5, 2]}),
+}
+
+
+@pytest.mark.parametrize("name", DATASETS)
+def test_baseline_passes_the_local_checks(name):
+    data = DATASETS[name]
+    code = build_baseline_dashboard(data)
+
+    compile(code, "gendb.py", "exec")
+    assert verify_dashboard_code(code, data.columns) == []
+    assert validate_dashboard_code(code, list(data.columns)) == []
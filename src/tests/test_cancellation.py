@@ -0,0 +1,76 @@
+import contextvars
+import multiprocessing
+import time
+
+import pytest
+
+from src import cancellation
+
+
+def in_new_context(fn, *args):
+    return contextvars.copy_context().run(fn, *args)
+
+
+def test_new_run_cancels_the_previous_one():
+    def runs():
+        first = cancellation.start_run("session-a")
+        other = cancellation.start_run("session-b")
+        second = cancellation.start_run("session-a")
+        return first, other, second, cancellation.is_cancelled()
+
+    first, other, second, current_cancelled = in_new_context(runs)
+    assert first.cancelled
+    assert not other.cancelled and not second.cancelled
+    assert not current_cancelled
+
+
+def test_child_token_is_cancelled_with_its_parent_only():
+    parent = cancellation.CancelToken()
+    child = cancellation.CancelToken(parent=parent)
+    child.cancel()
+    assert child.cancelled and not parent.cancelled
+
+    child = cancellation.CancelToken(parent=parent)
+    parent.cancel()
+    assert child.cancelled
+
+
+def test_check_raises_in_a_cancelled_run():
+    token = cancellation.CancelToken()
+    assert in_new_context(cancellation.run_with_token, token, cancellation.is_cancelled) is False
+    token.cancel()
+    with pytest.raises(cancellation.Cancelled):
+        in_new_context(cancellation.run_with_token, token, cancellation.check)
+
+
+def test_cancelled_is_not_caught_as_an_exception():
+    with pytest.raises(cancellation.Cancelled):
+        try:
+            raise cancellation.Cancelled("superseded")
+        except Exception:
+            pass
+
+
+def test_join_process_terminates_the_process_of_a_cancelled_run():
+    process = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(30,))
+    process.start()
+    token = cancellation.CancelToken()
+    token.cancel()
+    start = time.time()
+
+    with pytest.raises(cancellation.Cancelled):
+        in_new_context(cancellation.run_with_token, token, cancellation.join_process, process)
+
+    assert not process.is_alive()
+    assert time.time() - start < 10
+
+
+def test_join_process_times_out_without_terminating():
+    process = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(30,))
+    process.start()
+    try:
+        in_new_context(cancellation.join_process, process, 0.3)
+        assert process.is_alive()
+    finally:
+        process.terminate()
+        process.join()
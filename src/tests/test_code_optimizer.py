@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.code_optimizer import extract_code, optimize_feature_code
+
+
+def sample_data():
+    return pd.DataFrame({
+        "price": [5.0, 12.0, 30.0, 8.0],
+        "quantity": [1, 0, 3, 2],
+        "first_name": ["Ann", "Bob", "Cy", "Di"],
+        "last_name": ["Lee", "Ray", "Orr", "Fox"],
+        "segment": ["retail", "wholesale", "retail", "online"],
+        "date": pd.to_datetime(["2024-01-05", "2024-02-10", "2024-03-15", "2024-04-20"]),
+        "note": ["a", None, "c", np.nan],
+    }, index=[10, 11, 12, 13])
+
+
+def run(code):
+    df = sample_data()
+    exec(code, {"pd": pd, "np": np, "df": df})
+    return df
+
+
+def rewrite(code):
+    optimized, findings = optimize_feature_code(code)
+    assert findings and all(finding["rewritten"] for finding in findings), findings
+    assert "lambda" not in optimized
+    return optimized
+
+
+@pytest.mark.parametrize("code", [
+    "df['total'] = df.apply(lambda row: row['price'] * row['quantity'], axis=1)",
+    "df['full_name'] = df.apply(lambda row: row['first_name'] + ' ' + row['last_name'], axis=1)",
+    "df['month'] = df['date'].apply(lambda d: d.month)",
+    "df['size'] = df['price'].apply(lambda p: 'large' if p > 10 else 'small')",
+    "df['label'] = df['segment'].map(lambda s: s.upper())",
+    "df['bulk'] = df.apply(lambda row: 'yes' if row['quantity'] > 1 and row['price'] < 10 else 'no', axis=1)",
+    "df['flag'] = df.apply(lambda row: 'x' if row['quantity'] == 0 or row['price'] > 20 else 'y', axis=1)",
+    "df['cheap'] = df.apply(lambda row: 1 if not row['price'] > 10 else 0, axis=1)",
+    # Series methods chained after a rewritten conditional
+    "df['shout'] = df['price'].apply(lambda p: 'hi' if p > 10 else 'lo').str.upper()",
+    "df['tag'] = df.apply(lambda row: f\"{row['note']}-{row['quantity']}\", axis=1)",
+])
+def test_rewrite_matches_original(code):
+    optimized = rewrite(code)
+    pd.testing.assert_frame_equal(run(optimized), run(code), check_dtype=False)
+
+
+@pytest.mark.parametrize("code", [
+    # and/or/not on values rather than conditions would become bitwise operations
+    "df['any'] = df.apply(lambda row: row['quantity'] or row['price'], axis=1)",
+    "df['both'] = df.apply(lambda row: 'a' if row['quantity'] and row['price'] else 'b', axis=1)",
+    "df['none'] = df.apply(lambda row: 'a' if not row['quantity'] else 'b', axis=1)",
+])
+def test_bool_ops_on_values_are_not_rewritten(code):
+    optimized, findings = optimize_feature_code(code)
+    assert [finding["rewritten"] for finding in findings] == [False]
+    assert optimized == code
+
+
+def test_unvectorizable_patterns_are_flagged_with_cost():
+    code = "for i in range(len(df)):\n    df.loc[i, 'x'] = df.loc[i, 'price'] * 2\nfor _, row in df.iterrows():\n    pass"
+    optimized, findings = optimize_feature_code(code, n_rows=1_000_000)
+    assert optimized == code
+    assert sorted(finding["pattern"] for finding in findings) == ["iterrows", "python_loop"]
+    assert all(finding["estimated_seconds"] > 0 for finding in findings)
+
+
+def test_extract_code_joins_fenced_blocks():
+    text = "Sure:\n```python\nx = 1\n```\nand\n```\ny = 2\n```"
+    assert extract_code(text) == "x = 1\n\ny = 2"
+    assert extract_code("  z = 3\n") == "z = 3"
@@ -0,0 +1,47 @@
+import pytest
+
+from src.code_patch import PatchError, apply_edits, parse_edits
+
+FENCED = """```python
+import pandas as pd
+
+def total(df):
+    return df['revenue'].sum()
+```"""
+
+
+def edit(search, replace):
+    return "\n".join(["<<<<<<< SEARCH", search, "=======", *([replace] if replace else []), ">>>>>>> REPLACE"])
+
+
+def test_parse_edits_in_order():
+    response = "Fix:\n" + edit("a = 1", "a = 2") + "\nand\n" + edit("b = 1", "")
+    assert parse_edits(response) == [("a = 1\n", "a = 2\n"), ("b = 1\n", "")]
+
+
+def test_patch_fenced_code():
+    edits = parse_edits(edit("    return df['revenue'].sum()", "    return df['sales'].sum()"))
+    patched = apply_edits(FENCED, edits)
+    assert patched == FENCED.replace("revenue", "sales")
+
+
+def test_trailing_whitespace_is_tolerated():
+    edits = [("def total(df):   \n    return df['revenue'].sum()  \n", "def total(df):\n    return 0\n")]
+    patched = apply_edits(FENCED, edits)
+    assert "    return 0\n```" in patched
+
+
+def test_syntax_error_inside_fence_is_rejected():
+    edits = parse_edits(edit("    return df['revenue'].sum()", "    return df['revenue'.sum("))
+    with pytest.raises(PatchError, match="syntax error"):
+        apply_edits(FENCED, edits)
+
+
+@pytest.mark.parametrize("edits, message", [
+    ([], "no edits"),
+    ([("    return df['profit'].sum()\n", "")], "not found"),
+    ([("df", "frame")], "matches 2 places"),
+])
+def test_unusable_edits_are_rejected(edits, message):
+    with pytest.raises(PatchError, match=message):
+        apply_edits(FENCED, edits)
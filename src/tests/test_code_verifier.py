@@ -0,0 +1,111 @@
+import pytest
+
+from src.code_verifier import validate_dashboard_code, verify_dashboard_code
+
+LAYOUT = """
+app.layout = html.Div([
+    dcc.Dropdown(id='region-filter', options=[], value=['ALL'], multi=True),
+    html.Button('Reset Filters', id='reset-button'),
+    dcc.Graph(id='sales-chart'),
+])
+"""
+
+CALLBACK = """
+@app.callback(Output('sales-chart', 'figure'), Input('region-filter', 'value'), Input('reset-button', 'n_clicks'))
+def update_chart(regions, n_clicks):
+    dff = df[df['region'].isin(regions)]
+    return px.bar(dff, x='region', y='revenue')
+"""
+
+
+def test_valid_dashboard_has_no_findings():
+    assert verify_dashboard_code(LAYOUT + CALLBACK, ["region", "revenue"]) == []
+
+
+def test_missing_column_is_flagged():
+    errors = validate_dashboard_code(LAYOUT + CALLBACK, ["region", "sales"])
+    assert errors == ["Line 10: column 'revenue' does not exist in the DataFrame"]
+
+
+def test_fenced_code_is_checked():
+    code = f"Here is your dashboard:\n```python\n{LAYOUT + CALLBACK}```\n"
+    assert validate_dashboard_code(code, ["region"]) == ["Line 10: column 'revenue' does not exist in the DataFrame"]
+
+
+def test_attribute_reads_are_columns():
+    code = "options = df.territory.unique()\nrows = df.shape[0]"
+    assert validate_dashboard_code(code, ["region"]) == ["Line 1: column 'territory' does not exist in the DataFrame"]
+
+
+def test_created_columns_are_known():
+    code = """
+df['month'] = df['date'].dt.month
+totals = df.groupby('month').agg(total=('revenue', 'sum')).reset_index()
+fig = px.line(totals, x='month', y='total')
+counts = df['region'].value_counts().reset_index()
+fig = px.pie(counts, names='region', values='count')
+"""
+    assert validate_dashboard_code(code, ["date", "revenue", "region"]) == []
+
+
+def test_px_literal_values_are_not_columns():
+    code = "fig = px.pie(names=['North', 'South'], values=[3, 4])\nfig = px.bar(x=['A', 'B'], y=[1, 2])"
+    assert validate_dashboard_code(code, ["region"]) == []
+
+
+def test_px_keywords_on_loaded_data_are_checked():
+    code = "fig = px.scatter(data_frame=dff, x='revenue', y='profit', color='segment')"
+    errors = validate_dashboard_code(code, ["revenue", "segment"])
+    assert errors == ["Line 1: column 'profit' does not exist in the DataFrame"]
+
+
+def test_locally_built_frames_are_skipped():
+    code = """
+summary_df = pd.DataFrame({'metric': ['a', 'b'], 'amount': [1, 2]})
+fig = px.bar(summary_df, x='metric', y='amount')
+labels = summary_df['metric']
+"""
+    assert validate_dashboard_code(code, ["region"]) == []
+
+
+def test_callback_wiring_is_checked():
+    code = LAYOUT + CALLBACK.replace("'sales-chart'", "'profit-chart'")
+    errors = validate_dashboard_code(code, ["region", "revenue"])
+    assert errors == ["Line 8: callback Output('profit-chart', 'figure') refers to an id that is not in the layout"]
+
+
+def test_dashboard_requirements():
+    code = LAYOUT.replace("value=['ALL']", "value=[]") + CALLBACK.replace(", Input('reset-button', 'n_clicks')", "")
+    code = code.replace("def update_chart(regions, n_clicks)", "def update_chart(regions)")
+    findings = verify_dashboard_code(code, ["region", "revenue"])
+    assert findings == [
+        "Reset button 'reset-button' is not an Input of any callback",
+        "Line 2: filter 'region-filter' has no default value; it should select all by default",
+    ]
+
+
+@pytest.mark.parametrize("options, value", [
+    ("[]", "'All'"),
+    ("[{'label': 'Select All', 'value': 'ALL'}]", "['ALL']"),
+    ("['north', 'south']", "['south', 'north']"),
+    ("[{'label': 'North', 'value': 'north'}, {'label': 'South', 'value': 'south'}]", "['north', 'south']"),
+    ("[{'label': r, 'value': r} for r in df['region'].unique()]", "df['region'].unique().tolist()"),
+    ("regions", "regions"),
+])
+def test_dropdown_defaulting_to_all_options(options, value):
+    code = LAYOUT.replace("options=[], value=['ALL']", f"options={options}, value={value}") + CALLBACK
+    assert verify_dashboard_code(code, ["region", "revenue"]) == []
+
+
+@pytest.mark.parametrize("options, value", [
+    ("['north', 'south']", "['north']"),
+    ("[{'label': r, 'value': r} for r in df['region'].unique()]", "['north', 'south']"),
+    ("[{'label': r, 'value': r} for r in df.region.unique()]", "[df.region.unique()[0]]"),
+    ("[{'label': r, 'value': r} for r in df.region.unique()]", "[df.region.iloc[0]]"),
+    ("[{'label': r, 'value': r} for r in df.region.unique()]", "df.region.unique()[:2]"),
+])
+def test_dropdown_defaulting_to_some_options(options, value):
+    code = LAYOUT.replace("options=[], value=['ALL']", f"options={options}, value={value}") + CALLBACK
+    findings = verify_dashboard_code(code, ["region", "revenue"])
+    assert len(findings) == 1
+    assert findings[0].startswith("Line 2: filter 'region-filter' defaults to ")
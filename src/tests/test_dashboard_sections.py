@@ -0,0 +1,90 @@
+import threading
+
+import pandas as pd
+
+from src import cancellation, dashboard_sections
+from src.code_verifier import validate_dashboard_code
+
+LAYOUT = """
+def build_layout(df):
+    return html.Div([
+        html.H1("Sales"),
+        dcc.DatePickerRange(id="date-range", start_date=df["order_date"].min(), end_date=df["order_date"].max()),
+        dcc.Dropdown(id="filter-region", multi=True, value=["ALL"],
+                     options=[{"label": "Select All", "value": "ALL"}] + [{"label": r, "value": r} for r in df["region"].unique()]),
+        html.Button("Reset Filters", id="reset-button"),
+        html.Div(id="kpi-revenue"),
+        dcc.Graph(id="chart-1"), dcc.Graph(id="chart-2"), dcc.Graph(id="chart-3"), dcc.Graph(id="chart-4"),
+    ])
+"""
+
+KPIS = """
+def register_kpi_callbacks(app, df):
+    @app.callback(Output("kpi-revenue", "children"), Input("date-range", "start_date"),
+                  Input("date-range", "end_date"), Input("filter-region", "value"))
+    def update_kpis(start_date, end_date, regions):
+        return f"{filter_data(df, start_date, end_date, regions)['revenue'].sum():,.0f}"
+"""
+
+CHARTS = "\n".join(f"""
+    @app.callback(Output("chart-{i}", "figure"), Input("date-range", "start_date"),
+                  Input("date-range", "end_date"), Input("filter-region", "value"))
+    def update_chart_{i}(start_date, end_date, regions):
+        return px.bar(filter_data(df, start_date, end_date, regions), x="region", y="revenue")
+""" for i in range(1, 5))
+CHARTS = "\ndef register_chart_callbacks(app, df):" + CHARTS
+
+RESPONSES = {"layout": LAYOUT, "kpis": KPIS, "charts": CHARTS}
+
+
+def sales_data():
+    return pd.DataFrame({
+        "order_date": ["2024-01-05", "2024-02-11", "2024-03-20"],
+        "region": ["north", "south", "north"],
+        "revenue": [10.0, 20.0, 30.0],
+        "customer_id": [1, 2, 3],
+    })
+
+
+def test_contract_picks_date_filters_and_kpis():
+    contract = dashboard_sections.build_contract(sales_data())
+    assert contract["date_column"] == "order_date"
+    assert contract["filters"] == [{"id": "filter-region", "column": "region"}]
+    assert contract["kpis"] == [{"id": "kpi-revenue", "column": "revenue"}]
+    assert contract["inputs"] == [["date-range", "start_date"], ["date-range", "end_date"], ["filter-region", "value"]]
+
+
+def test_text_is_not_a_date_column_without_date_values():
+    data = pd.DataFrame({"update_date": ["soon", "later", "never"], "revenue": [1.0, 2.0, 3.0]})
+    assert dashboard_sections.build_contract(data)["date_column"] is None
+
+
+def test_sections_are_stitched_into_valid_code():
+    code = dashboard_sections.generate_sections(lambda prompt, stage: RESPONSES[stage.split(": ")[1]], sales_data())
+    assert code is not None
+    assert validate_dashboard_code(code, list(sales_data().columns)) == []
+
+
+def test_stitched_code_that_does_not_validate_is_rejected():
+    # The charts section updates a graph the layout does not have
+    responses = {**RESPONSES, "charts": CHARTS.replace('"chart-4"', '"chart-5"')}
+    assert dashboard_sections.generate_sections(lambda prompt, stage: responses[stage.split(": ")[1]], sales_data()) is None
+
+
+def test_unusable_section_stops_the_others():
+    stopped = threading.Event()
+
+    def invoke(prompt, stage):
+        section = stage.split(": ")[1]
+        if section == "layout":
+            return "Sorry, I cannot help with that."
+        # A slow call that, like a streamed LLM call, checks the run's token
+        for _ in range(100):
+            if cancellation.is_cancelled():
+                stopped.set()
+                raise cancellation.Cancelled("stopped")
+            threading.Event().wait(0.05)
+        return RESPONSES[section]
+
+    assert dashboard_sections.generate_sections(invoke, sales_data()) is None
+    assert stopped.wait(2)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fe_benchmark import benchmark_feature_code, fit_scaling, profile_schema, synthesize_frame
+
+
+def sample_data():
+    return pd.DataFrame({
+        "price": [1.5, 2.5, 10.0],
+        "units": [1, 5, 3],
+        "member": [True, False, True],
+        "city": ["Oslo", "Lima", "Oslo"],
+        "day": pd.to_datetime(["2024-01-01", "2024-03-01", "2024-02-01"]),
+        "blank": [np.nan, np.nan, np.nan],
+    })
+
+
+def test_synthetic_frame_matches_the_schema():
+    data = sample_data()
+    frame = synthesize_frame(profile_schema(data), 500)
+
+    assert list(frame.columns) == list(data.columns)
+    assert len(frame) == 500
+    assert frame["units"].between(1, 5).all() and pd.api.types.is_integer_dtype(frame["units"])
+    assert frame["price"].between(1.5, 10.0).all()
+    assert pd.api.types.is_bool_dtype(frame["member"])
+    assert set(frame["city"]) <= {"Oslo", "Lima"}
+    assert frame["day"].between(data["day"].min(), data["day"].max()).all()
+    assert frame["blank"].isna().all()
+
+
+def test_synthetic_frame_is_reproducible():
+    profile = profile_schema(sample_data())
+    pd.testing.assert_frame_equal(synthesize_frame(profile, 100), synthesize_frame(profile, 100))
+
+
+def test_fit_scaling_recovers_the_exponent():
+    rows = [1e3, 1e4, 1e5]
+    exponent, coefficient = fit_scaling(rows, [2e-6 * r ** 1.5 for r in rows])
+    assert exponent == pytest.approx(1.5)
+    assert coefficient == pytest.approx(2e-6)
+
+
+def test_linear_code_is_accepted():
+    report = benchmark_feature_code("df['total'] = df['price'] * df['units']", sample_data(),
+                                    sizes=(10_000, 100_000, 1_000_000))
+    assert [size["rows"] for size in report["sizes"]] == [10_000, 100_000, 1_000_000]
+    assert report["accepted"], report["reason"]
+    assert report["projected_seconds"] is not None
+
+
+def test_failing_code_is_rejected():
+    report = benchmark_feature_code("df['x'] = df['missing'] + 1", sample_data(), sizes=(100, 1000))
+    assert not report["accepted"]
+    assert report["reason"].startswith("Failed on 100 rows")
+    assert len(report["sizes"]) == 1
+
+
+def test_slow_code_times_out():
+    report = benchmark_feature_code("import time\ntime.sleep(30)", sample_data(), sizes=(100, 1000), timeout=1)
+    assert not report["accepted"]
+    assert report["reason"] == "Timed out on 100 rows"
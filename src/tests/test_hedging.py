@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from src import hedging
+from src.stream_guard import StreamCancelled
+
+
+def slow_primary(primary_result="primary", hedge_result="hedge", primary_seconds=5):
+    """A request whose first copy answers after `primary_seconds` unless cancelled, and whose hedge answers at once."""
+    def run(cancel_event, primary):
+        if not primary:
+            return hedge_result
+        if cancel_event.wait(primary_seconds):
+            raise StreamCancelled("cancelled")
+        return primary_result
+    return run
+
+
+def test_hedging_is_off_unless_enabled(monkeypatch):
+    monkeypatch.delenv(hedging.HEDGING_ENV, raising=False)
+    assert hedging.stage_config("generation") is None
+
+    monkeypatch.setenv(hedging.HEDGING_ENV, '{"generation": {"enabled": true, "percentile": 0.95}}')
+    assert hedging.stage_config("generation")["percentile"] == 0.95
+    assert hedging.stage_config("correction") is None
+
+
+def test_fast_primary_is_not_hedged():
+    calls = []
+
+    def run(cancel_event, primary):
+        calls.append(primary)
+        return "primary"
+
+    assert hedging.run_hedged(run, hedge_after=5) == ("primary", False)
+    assert calls == [True]
+
+
+def test_hedge_wins_and_cancels_the_slow_primary():
+    assert hedging.run_hedged(slow_primary(), hedge_after=0.05) == ("hedge", True)
+
+
+def test_hedge_is_not_sent_when_not_allowed():
+    run = slow_primary(primary_seconds=0.2)
+    assert hedging.run_hedged(run, hedge_after=0.05, allow_hedge=lambda: False) == ("primary", False)
+
+
+def test_invalid_result_falls_back_to_the_other_request():
+    run = slow_primary(primary_seconds=0.2, hedge_result="")
+    assert hedging.run_hedged(run, hedge_after=0.05, validate=bool) == ("primary", False)
+
+
+def test_both_requests_cancelled_raises_cancelled():
+    def run(cancel_event, primary):
+        if primary:
+            threading.Event().wait(0.1)
+        raise StreamCancelled("cancelled")
+
+    with pytest.raises(StreamCancelled):
+        hedging.run_hedged(run, hedge_after=0.05)
+
+
+def test_error_is_raised_when_both_requests_fail():
+    def run(cancel_event, primary):
+        if primary:
+            threading.Event().wait(0.1)
+            raise ValueError("primary failed")
+        raise StreamCancelled("cancelled")
+
+    with pytest.raises(ValueError, match="primary failed"):
+        hedging.run_hedged(run, hedge_after=0.05)
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from src import job_queue
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+def test_jobs_are_claimed_oldest_first(db):
+    first = job_queue.enqueue("dashboard", {"n": 1}, db_path=db)
+    second = job_queue.enqueue("dashboard", {"n": 2}, db_path=db)
+    assert job_queue.queue_position(second, db) == 1
+
+    job = job_queue.claim("w1", db)
+    assert (job["id"], job["payload"], job["status"], job["attempts"]) == (first, {"n": 1}, "running", 1)
+    assert job_queue.queue_position(second, db) == 0
+    assert job_queue.claim("w2", db)["id"] == second
+    assert job_queue.claim("w3", db) is None
+
+
+def test_finish_and_fail(db):
+    done = job_queue.enqueue("dashboard", {}, db_path=db)
+    failed = job_queue.enqueue("dashboard", {}, db_path=db)
+    job_queue.claim("w", db)
+    job_queue.claim("w", db)
+
+    assert job_queue.finish(done, {"code": "x"}, db)
+    job_queue.fail(failed, ValueError("boom"), db)
+
+    assert job_queue.wait(done, db_path=db)["result"] == {"code": "x"}
+    assert (job_queue.get_job(failed, db)["status"], job_queue.get_job(failed, db)["error"]) == ("failed", "boom")
+
+
+def test_cancelled_job_stays_cancelled(db):
+    job_id = job_queue.enqueue("dashboard", {}, db_path=db)
+    job_queue.claim("w", db)
+
+    assert job_queue.cancel(job_id, db)
+    assert not job_queue.finish(job_id, {"code": "x"}, db)
+    assert not job_queue.beat(job_id, db)
+    assert not job_queue.cancel(job_id, db)
+    assert job_queue.get_job(job_id, db)["status"] == "cancelled"
+
+
+def test_job_without_heartbeat_is_requeued(db):
+    job_id = job_queue.enqueue("dashboard", {}, db_path=db)
+    job_queue.claim("dead", db)
+    time.sleep(0.05)
+
+    job = job_queue.claim("alive", db, stale_seconds=0.01)
+
+    assert (job["id"], job["worker"], job["attempts"]) == (job_id, "alive", 2)
+
+
+def test_beating_job_is_not_requeued_however_long_it_runs(db):
+    job_id = job_queue.enqueue("dashboard", {}, db_path=db)
+    job_queue.claim("slow", db)
+    time.sleep(0.05)
+    assert job_queue.beat(job_id, db)
+
+    assert job_queue.claim("other", db, stale_seconds=0.04) is None
+    assert job_queue.get_job(job_id, db)["worker"] == "slow"
+
+
+def test_job_whose_workers_keep_dying_fails(db):
+    job_id = job_queue.enqueue("dashboard", {}, db_path=db)
+    for _ in range(job_queue.MAX_JOB_ATTEMPTS):
+        job_queue.claim("dead", db, stale_seconds=0.01)
+        time.sleep(0.05)
+
+    assert job_queue.claim("alive", db, stale_seconds=0.01) is None
+    job = job_queue.get_job(job_id, db)
+    assert (job["status"], job["error"]) == ("failed", "worker died repeatedly")
+
+
+def test_worker_beats_while_the_job_runs(db):
+    pytest.importorskip("langchain_experimental")
+    from src.cancellation import CancelToken
+    from src.worker import _watch_job
+
+    job_id = job_queue.enqueue("dashboard", {}, db_path=db)
+    claimed = job_queue.claim("w", db)["heartbeat"]
+    token, stop = CancelToken(), threading.Event()
+    watcher = threading.Thread(target=_watch_job, args=(job_id, token, stop, db, 0.01, 0.02))
+    watcher.start()
+    time.sleep(0.2)
+    heartbeat = job_queue.get_job(job_id, db)["heartbeat"]
+    job_queue.cancel(job_id, db)
+    watcher.join(5)
+    stop.set()
+
+    assert heartbeat > claimed
+    assert token.cancelled
@@ -0,0 +1,48 @@
+import time
+
+import pandas as pd
+import pytest
+
+from src import latency_budget
+from src.latency_budget import SAMPLED_PROFILE, SKIPPED_FEATURE_ENGINEERING, LatencyBudget
+
+
+@pytest.fixture(autouse=True)
+def no_history(tmp_path, monkeypatch):
+    # No recorded calls, so every stage takes its DEFAULT_STAGE_SECONDS
+    monkeypatch.chdir(tmp_path)
+
+
+def test_unlimited_budget_allows_everything():
+    budget = LatencyBudget(0)
+    assert budget.remaining() is None
+    assert budget.allow(SKIPPED_FEATURE_ENGINEERING, "feature engineering", "generation", "correction (patch)")
+    assert budget.degradations == []
+
+
+def test_step_that_does_not_fit_is_recorded_once():
+    budget = LatencyBudget(50)
+    assert budget.allow(SKIPPED_FEATURE_ENGINEERING, "generation", "correction (patch)")
+    assert not budget.allow(SKIPPED_FEATURE_ENGINEERING, "feature engineering", "generation", "correction (patch)")
+    assert not budget.allow(SKIPPED_FEATURE_ENGINEERING, "feature engineering", "generation", "correction (patch)")
+    assert budget.degradations == [SKIPPED_FEATURE_ENGINEERING]
+
+
+def test_time_already_spent_counts_against_the_budget():
+    # E.g. the upload happened several reruns ago
+    budget = LatencyBudget(60, start=time.time() - 30)
+    assert budget.remaining() == pytest.approx(30, abs=1)
+    assert not budget.fits("feature engineering", "generation", "correction (patch)")
+    assert LatencyBudget(60).fits("feature engineering", "generation", "correction (patch)")
+
+
+def test_large_data_is_profiled_on_a_sample_only_when_at_risk(monkeypatch):
+    monkeypatch.setattr(latency_budget, "PROFILE_SAMPLE_ROWS", 10)
+    data = pd.DataFrame({"value": range(100)})
+
+    assert LatencyBudget(0).profile_data(data) is data
+    budget = LatencyBudget(20)
+    sample = budget.profile_data(data)
+    assert len(sample) == 10
+    assert sample.index.equals(LatencyBudget(20).profile_data(data).index)
+    assert budget.degradations == [SAMPLED_PROFILE]
@@ -0,0 +1,57 @@
+import hashlib
+
+import pytest
+
+from src import llm_backend
+from src.code_verifier import validate_dashboard_code
+
+
+def test_clients_are_pooled_per_backend_model_and_params(monkeypatch):
+    monkeypatch.setenv(llm_backend.BACKEND_ENV, "stub")
+    monkeypatch.delenv(llm_backend.MODEL_ENV, raising=False)
+    llm = llm_backend.get_llm(temperature=0)
+
+    assert llm_backend.get_llm("stub", "stub", temperature=0) is llm
+    assert llm_backend.get_llm("stub", "stub", temperature=0.5) is not llm
+    assert llm_backend.get_llm("stub", "stub-fast", temperature=0) is not llm
+    assert llm_backend.pooled_config(llm) == ("stub", "stub", {"temperature": 0})
+    assert llm_backend.pooled_config(llm_backend.StubLLM()) is None
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown LLM backend"):
+        llm_backend.get_llm("openai")
+
+
+def test_stub_answers_from_its_responses_dir(tmp_path):
+    prompt = "Build a dashboard"
+    (tmp_path / f"{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]}.txt").write_text("canned", encoding="utf-8")
+    llm = llm_backend.StubLLM(responses_dir=str(tmp_path))
+
+    assert llm.invoke(prompt).content == "canned"
+    assert llm.invoke("Another prompt").content == "pass"
+
+
+def test_stub_dashboard_is_valid_and_streams_the_same_text():
+    prompt = "The DataFrame 'df' contains the following columns and their respective data types:\n" \
+             "- region: object\n- revenue: float64\n\nWrite the dashboard."
+    llm = llm_backend.StubLLM()
+    message = llm.invoke(prompt)
+
+    assert validate_dashboard_code(message.content, ["region", "revenue"]) == []
+    chunks = list(llm.stream(prompt))
+    assert "".join(chunk.content for chunk in chunks) == message.content
+    assert chunks[-1].usage_metadata["output_tokens"] == message.usage_metadata["output_tokens"]
+
+
+def test_stub_reads_a_cached_prefix_on_the_next_call():
+    prefix = " ".join(f"column_{i}" for i in range(600))
+    prompt = [("user", llm_backend.cacheable_text(prefix)), ("user", "first question")]
+    llm = llm_backend.StubLLM(model="stub-prompt-cache-test")
+
+    first = llm.invoke(prompt).usage_metadata["input_token_details"]
+    second = llm.invoke(prompt[:1] + [("user", "second question")]).usage_metadata["input_token_details"]
+
+    assert first["cache_read"] == 0 and first["cache_creation"] >= llm_backend.MIN_CACHEABLE_TOKENS
+    assert second == {"cache_read": first["cache_creation"], "cache_creation": 0}
+    assert llm_backend.supports_prompt_caching(llm)
@@ -0,0 +1,54 @@
+import os
+import time
+
+from src import llm_cache
+from src.llm_backend import StubLLM
+
+
+def test_key_depends_on_model_params_and_prompt():
+    key = llm_cache.cache_key("m", {"temperature": 0}, "prompt")
+    assert key == llm_cache.cache_key("m", {"temperature": 0}, "prompt")
+    assert key != llm_cache.cache_key("other", {"temperature": 0}, "prompt")
+    assert key != llm_cache.cache_key("m", {"temperature": 0, "max_tokens": 10}, "prompt")
+    assert key != llm_cache.cache_key("m", {"temperature": 0}, [("user", "prompt")])
+
+
+def test_put_and_get(tmp_path):
+    assert llm_cache.get("ab" * 32, cache_dir=tmp_path) is None
+    llm_cache.put("ab" * 32, "response", cache_dir=tmp_path)
+    assert llm_cache.get("ab" * 32, cache_dir=tmp_path) == "response"
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    llm_cache.put("cd" * 32, "old", cache_dir=tmp_path)
+    assert llm_cache.get("cd" * 32, cache_dir=tmp_path, max_age=-1) is None
+    assert not any(files for _, _, files in os.walk(tmp_path))
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    now = time.time()
+    for age, key in zip((30, 20, 10), keys):
+        llm_cache.put(key, "x" * 1000, cache_dir=tmp_path)
+        path = llm_cache._path(key, tmp_path)
+        os.utime(path, (now - age, now - age))
+    # Reading the oldest entry makes it the most recently used
+    assert llm_cache.get(keys[0], cache_dir=tmp_path) is not None
+    total = sum(os.path.getsize(llm_cache._path(key, tmp_path)) for key in keys)
+
+    assert llm_cache.evict(tmp_path, max_bytes=total - 1) == 1
+    assert llm_cache.get(keys[1], cache_dir=tmp_path) is None
+    assert llm_cache.get(keys[0], cache_dir=tmp_path) is not None
+    assert llm_cache.get(keys[2], cache_dir=tmp_path) is not None
+
+
+def test_only_deterministic_calls_are_cached(tmp_path, monkeypatch):
+    # The cache directory is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    deterministic, sampled = StubLLM(temperature=0), StubLLM(temperature=0.7)
+
+    llm_cache.store(deterministic, "prompt", "answer")
+    llm_cache.store(sampled, "prompt", "answer")
+    assert llm_cache.lookup(deterministic, "prompt") == "answer"
+    assert llm_cache.lookup(sampled, "prompt") is None
+    assert llm_cache.lookup(StubLLM(model="other", temperature=0), "prompt") is None
@@ -0,0 +1,52 @@
+import pytest
+
+from src import model_router, telemetry
+from src.llm_backend import get_llm
+
+
+@pytest.fixture
+def no_history(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(model_router.ROUTING_ENV, raising=False)
+    monkeypatch.setattr(telemetry, "latency_percentile", lambda stage, model, q, **kwargs: None)
+    monkeypatch.setattr(telemetry, "mean_cost", lambda stage, model, **kwargs: None)
+
+
+def with_history(monkeypatch, latencies, costs=None):
+    monkeypatch.setattr(telemetry, "latency_percentile", lambda stage, model, q, **kwargs: latencies.get(model))
+    monkeypatch.setattr(telemetry, "mean_cost", lambda stage, model, **kwargs: (costs or {}).get(model))
+
+
+def test_stage_config_defaults_and_overrides(no_history, monkeypatch):
+    assert model_router.stage_config("generation") is None
+    assert model_router.stage_config("generation: layout") is None
+    assert model_router.stage_config("feature engineering")["tiers"] == ["fast", "strong"]
+
+    monkeypatch.setenv(model_router.ROUTING_ENV, '{"generation": {"enabled": true}, "generation: charts": {"enabled": false}}')
+    assert model_router.stage_config("generation: layout")["enabled"]
+    assert model_router.stage_config("generation: charts") is None
+
+
+def test_preferred_model_is_used_while_within_budget(no_history, monkeypatch):
+    config = {**model_router.DEFAULT_CONFIG, "explore": 0}
+    assert model_router.choose_model("s", ["strong", "fast"], config)["model"] == "strong"
+
+    with_history(monkeypatch, {"strong": 90.0, "fast": 10.0})
+    decision = model_router.choose_model("s", ["strong", "fast"], config)
+    assert (decision["model"], decision["reason"]) == ("fast", "preferred tier over budget")
+
+    with_history(monkeypatch, {"strong": 90.0, "fast": 70.0})
+    assert model_router.choose_model("s", ["strong", "fast"], config)["reason"] == "all over budget, fastest"
+
+    with_history(monkeypatch, {"strong": 10.0}, {"strong": 1.0})
+    assert model_router.choose_model("s", ["strong", "fast"], config)["model"] == "fast"
+
+
+def test_route_keeps_the_backend_and_caps_the_fast_model(no_history):
+    llm = get_llm("stub", "stub", temperature=0, max_tokens=100000)
+
+    routed = model_router.route("feature engineering", llm)
+
+    assert routed is get_llm("stub", "stub-fast", temperature=0, max_tokens=2048)
+    assert model_router.route("generation", llm) is llm
+    assert telemetry.load_routes()["model"].tolist() == ["stub-fast"]
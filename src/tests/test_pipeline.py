@@ -0,0 +1,115 @@
+import hashlib
+import time
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("langchain_experimental")
+
+from src import cancellation, pipeline
+from src.baseline_dashboard import build_baseline_dashboard
+from src.cancellation import CancelToken
+from src.llm_backend import StubLLM, get_llm
+from src.prompt_builder import prompt_generator
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # The response cache, telemetry and stored dashboards all live under the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("LLM_ROUTING", raising=False)
+    return tmp_path
+
+
+def test_stored_generation_is_found_again(workdir):
+    llm = get_llm("stub", "stub", temperature=0)
+    data = pd.DataFrame({"region": ["north", "south"], "revenue": [10.0, 20.0]})
+    assert pipeline.lookup_generation(llm, data) is None
+
+    code = pipeline.generate_dashboard_code(llm, data)
+
+    assert pipeline.lookup_generation(llm, data) == code
+
+
+def test_discarded_draft_stops_its_llm_call(workdir):
+    llm = StubLLM(latency=3)
+    data = pd.DataFrame({"region": ["north", "south"], "revenue": [10.0, 20.0]})
+    run = CancelToken()
+    reset = cancellation.current_token.set(run)
+    try:
+        start = time.time()
+        draft = pipeline.start_speculative_generation(llm, data)
+        time.sleep(0.2)
+
+        # E.g. feature engineering added a measure, so the draft is regenerated
+        pipeline.cancel_speculative_generation(draft)
+        with pytest.raises(cancellation.Cancelled):
+            draft.result(timeout=5)
+        assert time.time() - start < 2
+        assert not run.cancelled
+    finally:
+        cancellation.current_token.reset(reset)
+
+
+class FailingLLM:
+    """A model that must not be called."""
+
+    model = "unused"
+    temperature = 0
+
+    def stream(self, prompt):
+        raise AssertionError("the LLM was called")
+
+    invoke = stream
+
+
+def test_correction_is_skipped_when_the_local_check_passes(workdir):
+    data = pd.DataFrame({"region": ["north", "south"], "revenue": [10.0, 20.0]})
+    code = build_baseline_dashboard(data)
+    run_log = []
+
+    corrected, findings = pipeline.correct_dashboard_code(FailingLLM(), data, code, run_log)
+
+    assert (corrected, findings) == (code, [])
+    assert [entry["stage"] for entry in run_log] == ["verification"]
+
+
+def test_correction_continuing_the_generation_stays_on_its_model(workdir, monkeypatch):
+    # The router would send every patch request to the fast model
+    monkeypatch.setenv("LLM_ROUTING", '{"correction (patch)": {"tiers": ["fast"], "explore": 0}}')
+    llm = get_llm("stub", "stub", temperature=0)
+    data = pd.DataFrame({"region": ["north", "south"], "revenue": [10.0, 20.0]})
+    code = build_baseline_dashboard(data).replace("value=['ALL']", "value=[]")
+
+    run_log = []
+    pipeline.correct_dashboard_code(llm, data, code, run_log)
+    assert run_log[0]["model"] == "stub-fast"
+
+    pipeline._remember_context(code, "generation prompt", data.columns, llm)
+    run_log = []
+    pipeline.correct_dashboard_code(llm, data, code, run_log)
+    assert {entry["model"] for entry in run_log} == {"stub"}
+
+
+def test_correction_reads_the_generation_prompt_from_the_prompt_cache(workdir):
+    data = pd.DataFrame({"region": ["north", "south"], "revenue": [10.0, 20.0]})
+    faulty = build_baseline_dashboard(data).replace("value=['ALL']", "value=[]")
+    # The stub answers the generation prompt with the faulty dashboard
+    prompt = prompt_generator(data)
+    (workdir / f"{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]}.txt").write_text(faulty, encoding="utf-8")
+    llm = StubLLM(model="stub-context-test", responses_dir=str(workdir))
+    run_log = []
+
+    assert pipeline.generate_dashboard_code(llm, data, run_log) == faulty
+    pipeline.correct_dashboard_code(llm, data, faulty, run_log)
+
+    generation, patch = run_log[:2]
+    assert (generation["stage"], patch["stage"]) == ("generation", "correction (patch)")
+    assert generation["cache_write_tokens"] > 0
+    assert patch["cache_read_tokens"] >= generation["cache_write_tokens"]
+
+
+def test_followups_only_list_the_columns_when_they_changed():
+    findings = ["Line 3: column 'profit' is not in the data"]
+    assert "now contains" not in pipeline.build_patch_followup(findings)
+    assert "region, revenue" in pipeline.build_correction_followup(findings, ["region", "revenue"])
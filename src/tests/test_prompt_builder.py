@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.prompt_builder import build_prompt, estimate_tokens, group_columns, low_value_columns
+
+
+@pytest.fixture(autouse=True)
+def empty_corpus(tmp_path, monkeypatch):
+    # No stored dashboards, so the built-in example is used
+    monkeypatch.chdir(tmp_path)
+
+
+def narrow_data():
+    return pd.DataFrame({"region": ["north", "south", "north"], "revenue": [1.0, 2.0, 3.0]})
+
+
+def wide_data(n_years=40):
+    columns = {"customer_id": [f"c{i}" for i in range(5)], "constant": ["x"] * 5}
+    for year in range(2000, 2000 + n_years):
+        columns[f"sales_{year}"] = np.arange(5, dtype=float)
+        columns[f"profit_{year}"] = np.arange(5, dtype=float)
+    return pd.DataFrame(columns)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("df['revenue']") == 7
+    assert estimate_tokens("a b c") == 3
+
+
+def test_low_value_columns():
+    data = pd.DataFrame({"id": ["a", "b", "c"], "same": [1, 1, 1], "price": [1.5, 2.5, 3.5], "city": ["x", "y", "x"]})
+    assert low_value_columns(data) == ["id", "same"]
+
+
+def test_group_columns_collapses_numbered_runs():
+    lines = group_columns([("sales_2019", "float64"), ("sales_2020", "float64"), ("sales_2021", "float64"),
+                           ("region", "object")])
+    assert lines == "- sales_#: float64 (3 columns, # in sales_2019 ... sales_2021)\n- region: object"
+
+
+def test_small_schema_is_not_compressed():
+    prompt, report = build_prompt(narrow_data())
+    assert report["steps"] == []
+    assert report["example"] == "built-in"
+    assert report["tokens"] == estimate_tokens(prompt)
+    assert "- revenue: float64" in prompt
+
+
+def test_wide_schema_is_compressed_to_the_budget():
+    data = wide_data()
+    _, full = build_prompt(data, token_budget=None)
+    prompt, report = build_prompt(data, token_budget=1500)
+
+    assert full["steps"] == []
+    assert report["tokens"] <= 1500 < full["tokens"]
+    # Only as many steps as needed
+    assert report["steps"] == ["deduplicate column list", "compact example", "group columns"]
+    assert report["example"] == "compact"
+    assert "- sales_#: float64 (40 columns, # in sales_2000 ... sales_2039)" in prompt
+
+
+def test_steps_are_applied_in_order_until_the_budget_fits():
+    prompt, report = build_prompt(wide_data(), token_budget=1)
+    assert report["steps"] == ["deduplicate column list", "compact example", "group columns",
+                               "drop low-value columns", "drop example"]
+    assert report["dropped_columns"] == ["customer_id", "constant"]
+    assert report["example"] is None
+    assert "Ignore these low-value columns: customer_id, constant" in prompt
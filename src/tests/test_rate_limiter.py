@@ -0,0 +1,75 @@
+import threading
+import time
+
+from src.rate_limiter import FairLimiter
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_sessions_take_turns():
+    limiter = FairLimiter(max_concurrent=1, tokens_per_minute=0)
+    limiter.acquire("holder", 0)
+    served = []
+    threads = []
+
+    def call(session, name):
+        limiter.acquire(session, 0)
+        served.append(name)
+        limiter.release(0, 0)
+
+    # One session queues three calls before another queues its only call
+    for session, name in [("busy", "busy-1"), ("busy", "busy-2"), ("busy", "busy-3"), ("other", "other-1")]:
+        queued = len(limiter._queues.get(session, ()))
+        thread = threading.Thread(target=call, args=(session, name))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: len(limiter._queues.get(session, ())) == queued + 1)
+
+    assert limiter.position("busy") == 0
+    assert limiter.position("other") == 1
+    assert limiter.position("idle") is None
+
+    limiter.release(0, 0)
+    for thread in threads:
+        thread.join(5)
+    assert served == ["busy-1", "other-1", "busy-2", "busy-3"]
+
+
+def test_waiting_call_reports_its_position():
+    limiter = FairLimiter(max_concurrent=1, tokens_per_minute=0)
+    limiter.acquire("holder", 0)
+    positions = []
+    thread = threading.Thread(target=limiter.acquire, args=("waiter", 0, positions.append))
+    thread.start()
+    wait_until(lambda: positions)
+    limiter.release(0, 0)
+    thread.join(5)
+    assert positions[0] == 0
+    assert positions[-1] is None
+
+
+def test_token_budget_blocks_until_refilled():
+    limiter = FairLimiter(max_concurrent=4, tokens_per_minute=60_000)
+    limiter.acquire("a", 60_000)
+    limiter.release(60_000, 60_000)
+    assert not limiter._can_start(1_000)
+    limiter._refilled -= 1.5
+    limiter._refill()
+    assert limiter._can_start(1_000)
+
+
+def test_rate_limits_halve_concurrency_and_successes_restore_it():
+    limiter = FairLimiter(max_concurrent=8, tokens_per_minute=0)
+    for _ in range(2):
+        limiter.acquire("a", 0)
+        limiter.release(0, 0, rate_limited=True)
+    assert int(limiter.limit) == 2
+    for _ in range(40):
+        limiter.acquire("a", 0)
+        limiter.release(0, 0)
+    assert limiter.limit == 8
@@ -0,0 +1,174 @@
+import os
+import random
+
+import pandas as pd
+import pytest
+
+from src import schema_index
+from src.baseline_dashboard import build_baseline_dashboard
+from src.code_verifier import verify_dashboard_code
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    # The corpus, the store and the index are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(schema_index._index, "stamp", None)
+    monkeypatch.delenv(schema_index.THRESHOLD_ENV, raising=False)
+    monkeypatch.delenv(schema_index.DISABLE_ENV, raising=False)
+    return tmp_path
+
+
+def sales_data():
+    return pd.DataFrame({
+        "order_date": pd.date_range("2024-01-01", periods=6, freq="MS"),
+        "region": ["north", "south", "east", "north", "south", "east"],
+        "revenue": [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+        "units": [1, 2, 3, 4, 5, 6],
+    })
+
+
+def other_data():
+    return pd.DataFrame({
+        "patient_id": ["p1", "p2", "p3"],
+        "diagnosis": ["flu", "cold", "flu"],
+        "temperature": [38.5, 37.2, 39.0],
+    })
+
+
+def test_minhash_estimates_jaccard():
+    rng = random.Random(0)
+    errors = []
+    for _ in range(100):
+        a = {f"f{rng.randint(0, 60)}" for _ in range(25)}
+        b = {f"f{rng.randint(0, 60)}" for _ in range(25)}
+        estimate = (schema_index.minhash(a) == schema_index.minhash(b)).mean()
+        errors.append(estimate - len(a & b) / len(a | b))
+    assert abs(sum(errors) / len(errors)) < 0.02
+    assert max(map(abs, errors)) < 0.15
+
+
+def test_containment_of_a_subset_is_full():
+    assert schema_index.containment(1.0, 10, 10) == 1.0
+    # 10 features all found among 20: Jaccard 10 / 20
+    assert schema_index.containment(0.5, 10, 20) == pytest.approx(1.0)
+    assert schema_index.containment(0.0, 10, 20) == 0.0
+
+
+def test_stored_dashboard_is_reused_for_its_own_data(corpus):
+    data = sales_data()
+    schema_index.add_dashboard(build_baseline_dashboard(data), data)
+
+    reused = schema_index.find_reusable_dashboard(data)
+    assert reused["similarity"] == 1.0
+    assert reused["mapping"] == {column: column for column in data.columns}
+
+
+def test_extra_and_renamed_columns_are_adapted(corpus):
+    data = sales_data()
+    path = schema_index.add_dashboard(build_baseline_dashboard(data), data)
+    upload = data.rename(columns={"revenue": "Revenue", "units": "units_sold"}).assign(channel="web")
+
+    reused = schema_index.find_reusable_dashboard(upload)
+    assert reused["path"] == path
+    assert reused["similarity"] >= schema_index.DEFAULT_THRESHOLD
+    assert reused["mapping"]["revenue"] == "Revenue" and reused["mapping"]["units"] == "units_sold"
+    assert verify_dashboard_code(reused["code"], list(upload.columns)) == []
+
+
+def test_threshold(corpus, monkeypatch):
+    data = sales_data()
+    schema_index.add_dashboard(build_baseline_dashboard(data), data)
+
+    assert schema_index.find_reusable_dashboard(other_data()) is None
+    assert schema_index.find_reusable_dashboard(data, threshold=1.01) is None
+    monkeypatch.setenv(schema_index.THRESHOLD_ENV, "1.01")
+    assert schema_index.find_reusable_dashboard(data) is None
+
+
+def write_corpus_dashboard(code, name="generated_dashboard.py"):
+    os.makedirs(schema_index.CORPUS_DIR, exist_ok=True)
+    path = os.path.join(schema_index.CORPUS_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(code)
+    return path
+
+
+def test_corpus_dashboard_is_adapted_once_it_passes_the_check_against_the_upload(corpus):
+    data = sales_data()
+    path = write_corpus_dashboard(build_baseline_dashboard(data))
+    assert [entry["verified"] for _, entry in schema_index.similar_dashboards(data)] == [False]
+
+    upload = data.rename(columns={"revenue": "Revenue"})
+    assert schema_index.find_reusable_dashboard(upload)["path"] == path
+    # Same names, but revenue is text in this upload
+    assert schema_index.find_reusable_dashboard(data.assign(revenue=data["revenue"].map(str))) is None
+
+
+def test_corpus_schema_is_checked_against_a_csv_next_to_it(corpus):
+    data = sales_data()
+    write_corpus_dashboard(build_baseline_dashboard(data))
+    write_corpus_dashboard(build_baseline_dashboard(other_data()), "other_dashboard.py")
+    data.assign(extra=1).to_csv(os.path.join(schema_index.CORPUS_DIR, "data.csv"), index=False)
+
+    entries = {os.path.basename(entry["path"]): entry for entry in schema_index.build_index()}
+
+    assert entries["generated_dashboard.py"]["verified"]
+    assert entries["generated_dashboard.py"]["schema"] == schema_index.data_schema(data)
+    assert not entries["other_dashboard.py"]["verified"]
+
+
+def test_save_schema_for_a_corpus_dashboard(corpus):
+    data = sales_data()
+    path = write_corpus_dashboard(build_baseline_dashboard(data))
+
+    assert schema_index.save_schema(path, other_data()) is None
+    assert schema_index.save_schema(path, data) == schema_index.data_schema(data)
+    assert [entry["verified"] for _, entry in schema_index.similar_dashboards(data)] == [True]
+
+
+def test_same_code_is_stored_once(corpus):
+    data = sales_data()
+    code = build_baseline_dashboard(data)
+    path = schema_index.add_dashboard(code, data)
+
+    assert schema_index.add_dashboard(code, data.drop(columns="units")) == path
+    assert schema_index.add_dashboard(code + "\n", data) != path
+    assert len(os.listdir(schema_index.STORE_DIR)) == 4
+
+
+def test_pinned_example_does_not_change(corpus):
+    data = sales_data()
+    first = schema_index.add_dashboard(build_baseline_dashboard(data), data)
+    assert schema_index.pinned_example(data)["path"] == first
+
+    # A shorter dashboard for the same schema is now the closest example
+    shorter = schema_index.add_dashboard(build_baseline_dashboard(data.drop(columns="units")), data)
+    assert schema_index.closest_example(data)["path"] == shorter
+    assert schema_index.pinned_example(data)["path"] == first
+
+    os.remove(first)
+    assert schema_index.pinned_example(data)["path"] == shorter
+
+
+def hotel_data():
+    return pd.DataFrame({
+        "booking_date": pd.date_range("2024-01-01", periods=3),
+        "region": ["north", "south", "east"],
+        "room_type": ["single", "double", "suite"],
+        "total_price": [120.0, 180.0, 400.0],
+        "nights": [1, 2, 3],
+    })
+
+
+def test_only_closely_matching_verified_dashboards_are_examples(corpus):
+    data = sales_data()
+    schema_index.add_dashboard(build_baseline_dashboard(data), data)
+    # Shares a date, the region and a measure with the sales data, but is another domain
+    assert schema_index.closest_example(hotel_data()) is None
+    assert schema_index.closest_example(data.assign(channel="web"))["similarity"] >= schema_index.MIN_EXAMPLE_SIMILARITY
+
+    # Inferred from its own code only
+    write_corpus_dashboard(build_baseline_dashboard(other_data()))
+    assert schema_index.closest_example(other_data()) is None
+
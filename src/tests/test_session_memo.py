@@ -0,0 +1,40 @@
+from src import session_memo
+
+
+def test_content_hash_separates_parts():
+    assert session_memo.content_hash(b"ab", "c") == session_memo.content_hash("ab", b"c")
+    assert session_memo.content_hash("ab", "c") != session_memo.content_hash("a", "bc")
+    assert len(session_memo.content_hash("x")) == 16
+
+
+def test_result_is_computed_once_per_key():
+    state, calls = {}, []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert session_memo.memoize(state, "clean", "k1", compute) == 1
+    assert session_memo.memoize(state, "clean", "k1", compute) == 1
+    assert session_memo.is_fresh(state, "clean", "k1")
+    assert not session_memo.is_fresh(state, "generate", "k1")
+    assert session_memo.memoize(state, "clean", "k2", compute) == 2
+
+
+def test_least_recently_used_key_is_dropped():
+    state = {}
+    for i in range(session_memo.MAX_ENTRIES_PER_STAGE):
+        session_memo.memoize(state, "stage", i, lambda: i)
+    # Touch the oldest, so the second oldest is the one to go
+    session_memo.memoize(state, "stage", 0, lambda: None)
+    session_memo.memoize(state, "stage", "new", lambda: "new")
+    assert session_memo.is_fresh(state, "stage", 0)
+    assert not session_memo.is_fresh(state, "stage", 1)
+
+
+def test_forget():
+    state = {}
+    session_memo.memoize(state, "stage", "k", lambda: "failed")
+    session_memo.forget(state, "stage", "k")
+    session_memo.forget(state, "stage", "missing")
+    assert session_memo.memoize(state, "stage", "k", lambda: "retried") == "retried"
@@ -0,0 +1,49 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import single_flight
+
+
+def run_concurrently(key, fn, callers=3):
+    """Call `do` from several threads while the first call is still running."""
+    started, release = threading.Event(), threading.Event()
+
+    def leader():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    with ThreadPoolExecutor(callers) as pool:
+        first = pool.submit(single_flight.do, key, leader)
+        started.wait(5)
+        others = [pool.submit(single_flight.do, key, pytest.fail) for _ in range(callers - 1)]
+        # Give the followers time to find the request in flight
+        time.sleep(0.2)
+        release.set()
+        return [first] + others
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+    futures = run_concurrently("same", lambda: calls.append(1) or "result")
+    assert [future.result() for future in futures] == [("result", False), ("result", True), ("result", True)]
+    assert len(calls) == 1
+
+
+def test_exception_reaches_every_caller():
+    def fail():
+        raise ValueError("boom")
+
+    futures = run_concurrently("failing", fail)
+    for future in futures:
+        with pytest.raises(ValueError, match="boom"):
+            future.result()
+
+
+def test_nothing_is_kept_after_completion():
+    assert single_flight.do("later", lambda: 1) == (1, False)
+    assert single_flight.do("later", lambda: 2) == (2, False)
+    assert not single_flight._in_flight
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from src.stream_guard import IncrementalCodeChecker, StreamAborted, StreamCancelled, stream_code, stream_text
+
+GOOD = "```python\nimport dash\n\napp = dash.Dash(__name__)\n\nif __name__ == '__main__':\n    app.run()\n```\n"
+PROSE = "Sure! Here is how you could build it.\nFirst you load the data.\nThen you pick charts.\n" \
+        "After that you add filters.\nFinally you style it.\nHope this helps.\n" + GOOD
+
+
+class ScriptedLLM:
+    """Streams one scripted response per call, line by line, and records how much of each was read."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+        self.read = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        lines = self.responses.pop(0).splitlines(keepends=True)
+        self.read.append(0)
+        for line in lines:
+            self.read[-1] += 1
+            yield line
+
+
+def test_checker_waits_for_complete_statements():
+    checker = IncrementalCodeChecker()
+    assert checker.feed("x = (1,\n") is None
+    assert checker.feed("x = (1,\n     2)\ny = 3\n") is None
+    assert checker.feed("x = (1,\n     2)\ny = = 3\nz = 1\n").startswith("syntax error at line 3")
+
+
+def test_good_code_streams_through():
+    updates = []
+    llm = ScriptedLLM(GOOD)
+    text, attempts = stream_code(llm, "prompt", on_update=updates.append)
+    assert (text, attempts) == (GOOD, 1)
+    assert updates[-1] == GOOD
+
+
+@pytest.mark.parametrize("bad, reason", [
+    (PROSE, "rejected"),
+    ("import streamlit as st\n" + "st.title('x')\n" * 20, "streamlit"),
+    ("import dash\nx = = 1\ny = 2\n" + "z = 3\n" * 20, "syntax error"),
+])
+def test_off_track_attempt_is_aborted_early_and_retried(bad, reason):
+    llm = ScriptedLLM(bad, GOOD)
+    text, attempts = stream_code(llm, "prompt")
+    assert (text, attempts) == (GOOD, 2)
+    assert llm.read[0] < len(bad.splitlines())
+    assert reason in llm.prompts[1]
+
+
+def test_gives_up_after_max_attempts():
+    llm = ScriptedLLM(PROSE, PROSE)
+    with pytest.raises(StreamAborted, match="All 2 streamed attempts"):
+        stream_code(llm, "prompt", max_attempts=2)
+
+
+def test_retry_note_is_added_to_message_lists():
+    llm = ScriptedLLM(PROSE, GOOD)
+    stream_code(llm, [("user", "prompt")])
+    assert llm.prompts[1][0] == ("user", "prompt") and llm.prompts[1][1][0] == "user"
+
+
+def test_cancel_event_stops_the_stream():
+    event = threading.Event()
+    event.set()
+    with pytest.raises(StreamCancelled):
+        stream_code(ScriptedLLM(GOOD), "prompt", cancel_event=event)
+
+
+def test_stream_text_returns_the_whole_response():
+    assert stream_text(ScriptedLLM("no checks\non plain text\n"), "prompt") == "no checks\non plain text\n"
@@ -0,0 +1,55 @@
+import pytest
+
+from src import telemetry
+from src.llm_backend import StubLLM
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "telemetry.db")
+
+
+def test_estimate_cost_prices_cached_input():
+    # 1M uncached input tokens and 1M output tokens at list price
+    assert telemetry.estimate_cost("claude-3-5-sonnet-20240620", 1_000_000, 1_000_000) == 18.0
+    assert telemetry.estimate_cost("claude-3-5-sonnet-20240620", 1_000_000, 0, cache_read_tokens=1_000_000) == 0.3
+    assert telemetry.estimate_cost("claude-3-5-sonnet-20240620", 1_000_000, 0, cache_write_tokens=1_000_000) == 3.75
+    assert telemetry.estimate_cost("unknown-model", 10, 10) is None
+
+
+def test_cache_tokens():
+    assert telemetry.cache_tokens(None) == (0, 0)
+    assert telemetry.cache_tokens({"input_token_details": {"cache_read": 5, "cache_creation": 7}}) == (5, 7)
+    assert telemetry.cache_tokens({"cache_read": 3}) == (3, 0)
+
+
+def test_call_entry_uses_usage_and_frees_cache_hits():
+    llm = StubLLM(model="claude-3-haiku-20240307")
+    entry = telemetry.call_entry("generation", llm, "prompt", "code", 1.23456, usage={"input_tokens": 1000, "output_tokens": 200})
+    assert (entry["model"], entry["input_tokens"], entry["output_tokens"], entry["seconds"]) == \
+        ("claude-3-haiku-20240307", 1000, 200, 1.235)
+    assert entry["cost"] == telemetry.estimate_cost("claude-3-haiku-20240307", 1000, 200)
+    assert telemetry.call_entry("generation", llm, "prompt", "code", 0.0, cache_hit=True)["cost"] == 0.0
+
+
+def test_recorded_calls_are_loaded_and_summarized(db):
+    llm = StubLLM()
+    for seconds in (1.0, 2.0, 3.0):
+        telemetry.record(telemetry.call_entry("generation", llm, "prompt", "code", seconds), db)
+    telemetry.record(telemetry.call_entry("generation", llm, "prompt", "code", 0.0, cache_hit=True), db)
+
+    calls = telemetry.load_calls(db)
+    assert list(calls.columns) == list(telemetry.COLUMNS)
+    assert len(calls) == 4
+    assert telemetry.latency_percentile("generation", "stub", 0.5, min_samples=3, db_path=db) == 2.0
+    assert telemetry.latency_percentile("generation", "stub", 0.5, min_samples=4, db_path=db) is None
+
+    summary = telemetry.summarize(calls)
+    assert summary.loc[("generation", "stub"), "calls"] == 4
+    assert summary.loc[("generation", "stub"), "cache_hit_rate"] == 0.25
+
+
+def test_missing_database_reads_as_empty(db):
+    assert telemetry.load_calls(db).empty
+    assert telemetry.latency_percentile("generation", None, 0.5, db_path=db) is None
+    assert telemetry.stage_cost("generation", 0, db_path=db) == 0.0
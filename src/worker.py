@@ -0,0 +1,221 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from src import job_queue
+from src.cancellation import Cancelled, CancelToken, current_token
+from src.feature_eng import feature_engineering
+from src.latency_budget import SKIPPED_FEATURE_ENGINEERING, LatencyBudget
+from src.pipeline import correct_dashboard_code, get_dashboard_llm, resolve_dashboard_code, start_speculative_generation
+
+JOB_DATA_DIR = os.path.join("Staging_Data", "jobs")
+# Worker processes the app starts; set AUTODASH_WORKERS=0 when running them with `python -m src.worker`
+WORKERS_ENV = "AUTODASH_WORKERS"
+DEFAULT_WORKERS = 2
+
+_processes = []
+_processes_lock = threading.Lock()
+
+
+def submit_dashboard_job(cleaned_data, perform_fe=False, benchmark=False, sectioned=False, budget_seconds=None,
+                         db_path=job_queue.DB_PATH):
+    """Queue a dashboard job for the cleaned data.
+
+    The data is pickled next to the queue so the worker sees the same dtypes.
+    The latency budget, if given, counts from submission, so time spent queued
+    is part of it.
+
+    Returns:
+        str: Job id
+    """
+    os.makedirs(JOB_DATA_DIR, exist_ok=True)
+    data_path = os.path.join(JOB_DATA_DIR, f"{uuid.uuid4().hex}.pkl")
+    cleaned_data.to_pickle(data_path)
+    return job_queue.enqueue("dashboard", {
+        "data_path": data_path,
+        "feature_engineering": perform_fe,
+        "benchmark": benchmark,
+        "sectioned": sectioned,
+        "budget_seconds": budget_seconds,
+        "submitted": time.time(),
+    }, db_path=db_path)
+
+
+def run_dashboard_job(payload, progress):
+    """Run feature engineering, generation, correction and validation for one job.
+
+    Args:
+        payload (dict): Job arguments from `submit_dashboard_job`
+        progress (callable): Called with a short message as each stage starts
+
+    Returns:
+        dict: JSON-serializable result for the UI
+    """
+    cleaned_data = pd.read_pickle(payload["data_path"])
+    llm = get_dashboard_llm()
+    run_log = []
+    speculative_future = None
+    engineered_data = cleaned_data
+    generated_code = None
+    benchmark_report = None
+    budget = LatencyBudget(payload.get("budget_seconds"), payload.get("submitted"))
+
+    if payload["feature_engineering"] and budget.allow(SKIPPED_FEATURE_ENGINEERING, "feature engineering", "generation",
+                                                       "correction (patch)"):
+        progress("Engineering features")
+        speculative_future = start_speculative_generation(llm, cleaned_data, run_log, sectioned=payload.get("sectioned", False),
+                                                          budget=budget)
+        engineered_data, generated_code, benchmark_report = feature_engineering(cleaned_data, benchmark=payload["benchmark"], run_log=run_log)
+        if not generated_code:
+            engineered_data = cleaned_data
+
+    progress("Generating dashboard")
+    dashboard_code, reused_draft = resolve_dashboard_code(llm, engineered_data, cleaned_data, speculative_future, run_log,
+                                                         sectioned=payload.get("sectioned", False), budget=budget)
+    progress("Checking dashboard")
+    corrected_code, findings = correct_dashboard_code(llm, engineered_data, dashboard_code, run_log, budget=budget)
+
+    engineered_path = payload["data_path"].replace(".pkl", ".engineered.pkl")
+    engineered_data.to_pickle(engineered_path)
+    return {
+        "engineered_path": engineered_path,
+        "generated_code": generated_code,
+        "benchmark_report": benchmark_report,
+        "reused_draft": reused_draft,
+        "code": corrected_code,
+        "findings": findings,
+        "run_log": run_log,
+        "degradations": budget.degradations,
+    }
+
+
+def load_job_data(result):
+    """Read a finished job's engineered data and delete its pickle.
+
+    Returns:
+        pd.DataFrame: The data, or None if it was already read and deleted
+    """
+    path = result["engineered_path"]
+    if not os.path.exists(path):
+        return None
+    data = pd.read_pickle(path)
+    os.remove(path)
+    return data
+
+
+def _remove(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+HANDLERS = {
+    "dashboard": run_dashboard_job,
+}
+
+
+def _watch_job(job_id, token, stop, db_path, poll_interval, heartbeat_interval=job_queue.HEARTBEAT_SECONDS):
+    # Beats while the job runs, so a long stage is not taken for a dead worker, and cancels
+    # the job's token once the job is cancelled in the queue, e.g. by a newer upload
+    last_beat = time.time()
+    while not stop.wait(poll_interval):
+        if time.time() - last_beat >= heartbeat_interval:
+            job_queue.beat(job_id, db_path)
+            last_beat = time.time()
+        job = job_queue.get_job(job_id, db_path)
+        if job is None or job["status"] == "cancelled":
+            token.cancel()
+            return
+
+
+def worker_loop(name=None, db_path=job_queue.DB_PATH, poll_interval=job_queue.POLL_INTERVAL_SECONDS, max_jobs=None):
+    """Claim and run jobs until `max_jobs` have run (forever if None)."""
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    logging.info(f"Worker {name} started")
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = job_queue.claim(name, db_path)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        logging.info(f"Worker {name} running {job['kind']} job {job['id']}")
+        token = CancelToken()
+        current_token.set(token)
+        stop = threading.Event()
+        threading.Thread(target=_watch_job, args=(job["id"], token, stop, db_path, poll_interval),
+                         daemon=True, name="autodash-job-watch").start()
+        try:
+            handler = HANDLERS[job["kind"]]
+            result = handler(job["payload"], lambda message: job_queue.set_progress(job["id"], message, db_path))
+            if not job_queue.finish(job["id"], result, db_path):
+                # Cancelled while it ran: nobody will read its output
+                _remove(result.get("engineered_path"))
+        except Cancelled:
+            logging.info(f"Job {job['id']} cancelled")
+        except Exception as e:
+            logging.error(f"Job {job['id']} failed: {str(e)}")
+            job_queue.fail(job["id"], e, db_path)
+        finally:
+            stop.set()
+            # A job that finished, failed or was cancelled is not run again, so its input is no longer needed
+            _remove(job["payload"].get("data_path"))
+        done += 1
+
+
+def start_workers(count, db_path=job_queue.DB_PATH):
+    """Start `count` worker processes.
+
+    Returns:
+        list: The started processes
+    """
+    # Spawn rather than fork: the parent (e.g. Streamlit) runs threads
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(count):
+        process = context.Process(target=worker_loop, kwargs={"name": f"worker-{os.getpid()}-{i}", "db_path": db_path},
+                                  name=f"autodash-worker-{i}")
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def ensure_workers(count=None):
+    """Keep `count` worker processes alive for this process (the Streamlit server).
+
+    Safe to call on every rerun: dead workers are replaced and live ones kept.
+
+    Returns:
+        int: Number of live workers
+    """
+    count = int(os.getenv(WORKERS_ENV, DEFAULT_WORKERS)) if count is None else count
+    with _processes_lock:
+        _processes[:] = [process for process in _processes if process.is_alive()]
+        missing = count - len(_processes)
+        if missing > 0:
+            _processes.extend(start_workers(missing))
+        return len(_processes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run AUTO-DASH job workers")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--db", default=job_queue.DB_PATH, help="Queue database")
+    args = parser.parse_args()
+
+    processes = start_workers(args.workers, args.db)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()